@@ -0,0 +1,187 @@
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+from io import StringIO
+from pathlib import Path
+
+from func.runtime import execute
+from func.compiler import compile_, BUILTINS
+from func.analyser import analyse
+from func.parser import parse
+from func.tokeniser import tokenise
+
+from .generators import GENERATORS
+
+
+def main():
+    options = parse_command_line_arguments()
+    results = run_benchmarks(options.repeat)
+    print_results(results)
+    if (output := options.output) is not None:
+        save_results(results, output)
+    if (baseline := options.baseline) is not None:
+        baseline = load_results(baseline)
+        regressions = compare(results, baseline, options.tolerance)
+        for _ in range(options.confirm):
+            if not regressions:
+                break
+            # Load elsewhere on the machine can come and go faster than
+            # the calibration notices, so only regressions that persist
+            # through fresh measurements are reported.
+            names = {name for name, *_ in regressions}
+            retried = run_benchmarks(options.repeat, names)
+            regressions = compare(retried, baseline, options.tolerance)
+        print_regressions(regressions)
+        if regressions:
+            sys.exit(1)
+
+def parse_command_line_arguments():
+    parser = argparse.ArgumentParser(prog='benchmarks')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', type=Path)
+    parser.add_argument('--baseline', type=Path)
+    parser.add_argument('--tolerance', type=float, default=0.5)
+    parser.add_argument('--confirm', type=int, default=3)
+    return parser.parse_args()
+
+def run_benchmarks(repeat, names=None):
+    calibration = measure_calibration(repeat)
+    benchmarks = {}
+    for name, source in _programs():
+        if names is None or name in names:
+            benchmarks[name] = measure_stages(source, repeat)
+    calibration = min(calibration, measure_calibration(repeat))
+    return {
+        'python': platform.python_version(),
+        'repeat': repeat,
+        'calibration': calibration,
+        'benchmarks': benchmarks,
+    }
+
+def _programs():
+    for path in sorted(_EXAMPLES.glob('*.func')):
+        yield f'examples/{path.stem}', path.read_text()
+    for name, sizes in SIZES.items():
+        generate = GENERATORS[name]
+        for size in sizes:
+            yield f'{name}[{size}]', generate(size)
+
+_EXAMPLES = Path(__file__).parent.parent / 'tests' / 'examples'
+
+SIZES = {
+    'many_bindings': [100, 1000],
+    'deep_nesting': [10, 50],
+    'long_strings': [100, 10000],
+    'long_application_chains': [10, 100],
+}
+
+def measure_stages(source, repeat):
+    timings = dict.fromkeys(STAGES, float('inf'))
+    for _ in range(repeat):
+        for stage, seconds in run_stages(source, timed):
+            timings[stage] = min(timings[stage], seconds)
+    return timings
+
+STAGES = ['tokenise', 'parse', 'analyse', 'compile', 'execute']
+
+def run_stages(source, measure):
+    """Run a source through each stage, yielding the stage and what the
+    measure returned alongside that stage's result."""
+    tokens, value = measure(lambda: list(tokenise(source)))
+    yield 'tokenise', value
+    syntax, value = measure(lambda: parse(iter(tokens)))
+    yield 'parse', value
+    module, value = measure(lambda: analyse(syntax, BUILTINS))
+    yield 'analyse', value
+    program, value = measure(lambda: compile_(module))
+    yield 'compile', value
+    _, value = measure(lambda: execute(program, StringIO()))
+    yield 'execute', value
+
+def measure_calibration(repeat):
+    """Time a fixed workload that does not use Func, to tell how fast the
+    machine is running compared to when a baseline was recorded."""
+    return min(timed(_calibration_workload)[1] for _ in range(repeat))
+
+def _calibration_workload():
+    counts = {}
+    for index in range(_CALIBRATION_SIZE):
+        key = str(index % 97)
+        counts[key] = counts.get(key, 0) + len(key)
+    return counts
+
+_CALIBRATION_SIZE = 20000
+
+def timed(function):
+    """Call a function, returning its result and how long it took.
+
+    The garbage collector is paused while timing, as timeit does. Otherwise
+    collections triggered by earlier allocations are charged to whichever
+    stage happens to run next, and grow with the number of live objects.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        result = function()
+        return result, time.perf_counter() - start
+    finally:
+        if enabled:
+            gc.enable()
+
+def compare(results, baseline, tolerance):
+    """Find the stages slower than the baseline by more than the tolerance.
+
+    If both were calibrated, the baseline is first scaled by how much faster
+    or slower the machine is running now.
+    """
+    regressions = []
+    baseline_benchmarks = baseline['benchmarks']
+    scale = 1
+    if 'calibration' in results and 'calibration' in baseline:
+        scale = results['calibration'] / baseline['calibration']
+    for name, timings in results['benchmarks'].items():
+        baseline_timings = baseline_benchmarks.get(name, {})
+        for stage, seconds in timings.items():
+            if (baseline_seconds := baseline_timings.get(stage)) is None:
+                continue
+            expected = baseline_seconds * scale
+            limit = max(expected * (1 + tolerance),
+                expected + _NOISE_FLOOR_SECONDS)
+            if seconds > limit:
+                regressions.append((name, stage, expected, seconds))
+    return regressions
+
+_NOISE_FLOOR_SECONDS = 50e-6
+
+def print_results(results):
+    print(f"{'benchmark':<32}" + ''.join(f'{stage:>12}' for stage in STAGES))
+    for name, timings in results['benchmarks'].items():
+        columns = ''.join(f'{_format(timings[stage]):>12}' for stage in STAGES)
+        print(f'{name:<32}{columns}')
+
+def print_regressions(regressions):
+    for name, stage, baseline_seconds, seconds in regressions:
+        print(f'Regression: {name} {stage}: '
+            f'{_format(baseline_seconds)} -> {_format(seconds)}')
+    if not regressions:
+        print('No regressions')
+
+def _format(seconds):
+    return f'{seconds * 1e6:.0f} µs'
+
+def save_results(results, path):
+    with open(path, 'w') as file:
+        json.dump(results, file, indent=4)
+        file.write('\n')
+
+def load_results(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import argparse
+from io import StringIO
+
+from func.engines import ENGINES
+from func.compiler import BUILTINS
+from func.analyser import analyse
+from func.parser import parse
+from func.stats import Statistics
+from func.tokeniser import tokenise
+
+from .__main__ import _programs, timed
+
+
+def main():
+    options = parse_command_line_arguments()
+    results = compare_engines(options.repeat)
+    print_comparison(results)
+
+def parse_command_line_arguments():
+    parser = argparse.ArgumentParser(prog='benchmarks.engines')
+    parser.add_argument('--repeat', type=int, default=5)
+    return parser.parse_args()
+
+def compare_engines(repeat):
+    results = {}
+    for name, source in _programs():
+        module = analyse(parse(tokenise(source)), BUILTINS)
+        results[name] = {engine: measure_engine(module, engine, repeat)
+            for engine in ENGINES}
+    return results
+
+def measure_engine(module, engine, repeat):
+    engine = ENGINES[engine]
+    program = engine.compile(module)
+    statistics = Statistics()
+    engine.execute(program.copy(), StringIO(), statistics)
+    seconds = min(
+        timed(lambda: engine.execute(program.copy(), StringIO()))[1]
+        for _ in range(repeat))
+    return {
+        'instructions': statistics.instructions,
+        'seconds': seconds,
+    }
+
+def print_comparison(results):
+    print(f"{'benchmark':<32}{'stack':>10}{'register':>10}{'ratio':>8}"
+        f"{'stack':>12}{'register':>12}")
+    for name, engines in results.items():
+        stack = engines['stack']
+        register = engines['register']
+        ratio = register['instructions'] / stack['instructions']
+        print(f"{name:<32}{stack['instructions']:>10}"
+            f"{register['instructions']:>10}{ratio:>8.2f}"
+            f"{_format(stack['seconds']):>12}"
+            f"{_format(register['seconds']):>12}")
+
+def _format(seconds):
+    return f'{seconds * 1e6:.0f} µs'
+
+
+if __name__ == '__main__':
+    main()
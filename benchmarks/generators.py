@@ -0,0 +1,44 @@
+def many_bindings(count):
+    lines = [f'value{index} = add {index} 1' for index in range(count)]
+    last = count - 1
+    return '\n'.join([
+        f'main = print (integer_to_string value{last})',
+        *lines,
+    ])
+
+def deep_nesting(depth):
+    expression = '0'
+    for _ in range(depth):
+        expression = f'add 1 ({expression})'
+    return f'main = print (integer_to_string ({expression}))'
+
+def long_strings(length):
+    text = 'abcdefghij' * (length // 10)
+    return '\n'.join([
+        "main = print '\\(first)\\(second)'",
+        f"first = '{text}'",
+        f"second = '{text}'",
+    ])
+
+def long_application_chains(length):
+    identities = ' '.join(['identity'] * length)
+    return '\n'.join([
+        f'main = print (integer_to_string ({identities} 7))',
+        'identity = \\x -> x',
+    ])
+
+def many_literals(count):
+    lines = [f"text{index} = 'literal {index}'" for index in range(count)]
+    parts = ''.join(f'\\(text{index})' for index in range(count))
+    return '\n'.join([
+        f"main = print '{parts}'",
+        *lines,
+    ])
+
+GENERATORS = {
+    'many_bindings': many_bindings,
+    'deep_nesting': deep_nesting,
+    'long_strings': long_strings,
+    'long_application_chains': long_application_chains,
+    'many_literals': many_literals,
+}
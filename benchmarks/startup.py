@@ -0,0 +1,46 @@
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+BUDGET_SECONDS = 0.120
+
+def main():
+    options = parse_command_line_arguments()
+    overhead = measure_overhead(options.runs)
+    print(f'Startup overhead: {overhead * 1000:.1f} ms '
+        f'(budget: {BUDGET_SECONDS * 1000:.0f} ms)')
+    if overhead > BUDGET_SECONDS:
+        sys.exit('Startup budget exceeded')
+
+def parse_command_line_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=20)
+    return parser.parse_args()
+
+def measure_overhead(runs):
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory, 'hello.func')
+        path.write_text("main = print 'Hello'")
+        baseline = _median_time([sys.executable, '-c', 'pass'], runs)
+        command = [sys.executable, '-m', 'func', '--file', str(path)]
+        startup = _median_time(command, runs)
+    return startup - baseline
+
+def _median_time(command, runs):
+    root = Path(__file__).parent.parent
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=root, check=True,
+            stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import math
+import sys
+import tracemalloc
+
+from .__main__ import run_stages, timed, STAGES
+from .generators import GENERATORS
+
+
+def main():
+    options = parse_command_line_arguments()
+    exponents = measure_exponents(options.doublings, options.repeat)
+    violations = check(exponents, BOUNDS, options.slack)
+    print_exponents(exponents)
+    print_violations(violations)
+    if violations:
+        sys.exit(1)
+
+def parse_command_line_arguments():
+    parser = argparse.ArgumentParser(prog='benchmarks.stress')
+    parser.add_argument('--doublings', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=5)
+    # How far a fitted exponent may exceed its bound, to absorb timing noise.
+    parser.add_argument('--slack', type=float, default=0.3)
+    return parser.parse_args()
+
+# Sizes start at a point where fixed per-run costs no longer dominate.
+BASE_SIZES = {
+    'many_bindings': 250,
+    'deep_nesting': 8,
+    'long_strings': 10000,
+    'long_application_chains': 25,
+    'many_literals': 250,
+}
+
+# Declared complexity bounds, as the exponent k in O(n^k). Stages not listed
+# are expected to be linear.
+BOUNDS = {
+    # Code is emitted through nested generators, so each instruction passes
+    # through one `yield from` per enclosing expression.
+    ('deep_nesting', 'compile', 'time'): 2.0,
+}
+
+_LINEAR = 1.0
+
+def measure_exponents(doublings, repeat):
+    exponents = {}
+    for name, base_size in BASE_SIZES.items():
+        sizes = [base_size << doubling for doubling in range(doublings + 1)]
+        sources = [GENERATORS[name](size) for size in sizes]
+        measurements = [measure(source, repeat=1) for source in sources]
+        # Repeats go round all the sizes in turn, so that a slow spell on a
+        # busy machine affects every size rather than skewing one of them.
+        for _ in range(repeat - 1):
+            for source, measurement in zip(sources, measurements):
+                _time_stages(source, measurement)
+        for stage in STAGES:
+            for metric in METRICS:
+                values = [measurement[stage][metric]
+                    for measurement in measurements]
+                exponents[name, stage, metric] = fit_exponent(sizes, values)
+    return exponents
+
+METRICS = ['time', 'memory']
+
+def measure(source, repeat):
+    measurement = {stage: {'time': float('inf')} for stage in STAGES}
+    for _ in range(repeat):
+        _time_stages(source, measurement)
+    for stage, peak in run_stages(source, _traced):
+        measurement[stage]['memory'] = peak
+    return measurement
+
+def _time_stages(source, measurement):
+    # Each stage keeps the fastest of its timings.
+    for stage, seconds in run_stages(source, timed):
+        timings = measurement[stage]
+        timings['time'] = min(timings['time'], seconds)
+
+def _traced(function):
+    tracemalloc.start()
+    try:
+        result = function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+def fit_exponent(sizes, values):
+    """Fit values = c * sizes^k by least squares in log-log space."""
+    points = [(math.log(size), math.log(max(value, _EPSILON)))
+        for size, value in zip(sizes, values)]
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    return covariance / variance
+
+_EPSILON = 1e-9
+
+def check(exponents, bounds, slack):
+    violations = []
+    for key, exponent in exponents.items():
+        bound = bounds.get(key, _LINEAR)
+        if exponent > bound + slack:
+            violations.append((*key, bound, exponent))
+    return violations
+
+def print_exponents(exponents):
+    print(f"{'benchmark':<28}{'stage':<12}{'time':>8}{'memory':>8}")
+    for name in BASE_SIZES:
+        for stage in STAGES:
+            columns = ''.join(f'{exponents[name, stage, metric]:>8.2f}'
+                for metric in METRICS)
+            print(f'{name:<28}{stage:<12}{columns}')
+
+def print_violations(violations):
+    for name, stage, metric, bound, exponent in violations:
+        print(f'Violation: {name} {stage} {metric}: '
+            f'O(n^{exponent:.2f}) exceeds O(n^{bound:g})')
+    if not violations:
+        print('No violations')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,83 @@
-from .repl import repl
-from .runtime import execute
+import importlib
+
+from .natives import register_native
+from .runtime import (
+    execute,
+    execute_async,
+    execute_registers,
+    preinitialise,
+    resume,
+)
+from .modules import compile_file, load_program, ModuleCache
+from .engines import get_engine, ENGINES
 from .compiler import compile_, BUILTINS
 from .analyser import analyse
 from .parser import parse
 from .tokeniser import tokenise
 
 
-def run_file(path):
-    with open(path) as file:
-        source = file.read()
-        run_source(source)
+def run_file(path, output=None, cache=None, engine='stack',
+        branch_profile=None):
+    compiled = load_program(path, cache, engine=engine,
+        branch_profile=branch_profile)
+    get_engine(engine).execute(compiled.runnable(), output)
+
+def run_source(source, output=None, engine='stack'):
+    program = compile_source(source, engine)
+    get_engine(engine).execute(program, output)
+
+def snapshot_file(path, image_path, cache=None):
+    from .image import save_image
+    program = compile_file(path, cache)
+    image = preinitialise(program)
+    save_image(image, image_path)
 
-def run_source(source):
+def run_image(path, output=None):
+    from .image import load_image
+    image = load_image(path)
+    resume(image, output)
+
+def compile_source(source, engine='stack'):
     tokens = tokenise(source)
     syntax = parse(tokens)
     module = analyse(syntax, BUILTINS)
-    program = compile_(module)
-    execute(program)
+    return get_engine(engine).compile(module)
+
+def __getattr__(name):
+    try:
+        module_name = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError(
+            f'module {__name__!r} has no attribute {name!r}') from None
+    module = importlib.import_module(module_name, __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+_LAZY_ATTRIBUTES = {
+    'compile_registers': '.register_compiler',
+    'Interpreter': '.interpreter',
+    'Batch': '.batch',
+    'execute_many': '.batch',
+    'run_files': '.batch',
+    'save_image': '.image',
+    'load_image': '.image',
+    'repl': '.repl',
+    'run_batch': '.repl',
+    'serve': '.daemon',
+    'run_remote': '.daemon',
+    'Statistics': '.stats',
+    'measure_file': '.stats',
+    'measure_source': '.stats',
+    'format_statistics': '.stats',
+    'disassemble': '.disassembler',
+    'disassemble_file': '.disassembler',
+    'profile_heap': '.profiler',
+    'profile_heap_file': '.profiler',
+    'format_heap_profile': '.profiler',
+    'record_branches': '.profiler',
+    'record_branches_file': '.profiler',
+    'BranchProfile': '.branches',
+    'load_branch_profile': '.branches',
+    'save_branch_profile': '.branches',
+}
@@ -2,7 +2,8 @@ import argparse
 import sys
 from pathlib import Path
 
-from . import repl, run_file, __name__ as program_name
+from . import run_file, run_image, snapshot_file, __name__ as program_name
+from .modules import ModuleCache
 
 
 def main():
@@ -13,16 +14,133 @@ def main():
 def parse_command_line_arguments():
     parser = argparse.ArgumentParser(prog=program_name)
     parser.add_argument('--file', type=Path)
-    return parser.parse_args()
+    parser.add_argument('--snapshot', type=Path, metavar='IMAGE')
+    parser.add_argument('--image', type=Path)
+    parser.add_argument('--batch', action='store_true')
+    parser.add_argument('--cache', type=Path, metavar='DIRECTORY')
+    parser.add_argument('--serve', type=Path, metavar='SOCKET')
+    parser.add_argument('--connect', type=Path, metavar='SOCKET')
+    parser.add_argument('--stats', nargs='?', const='text',
+        choices=['text', 'json'])
+    parser.add_argument('--engine', choices=['stack', 'register'])
+    parser.add_argument('--disassemble', action='store_true')
+    parser.add_argument('--profile-heap', nargs='?', const='-', type=Path,
+        metavar='REPORT')
+    parser.add_argument('--record-branches', type=Path, metavar='PROFILE')
+    parser.add_argument('--branch-profile', type=Path, metavar='PROFILE')
+    options = parser.parse_args()
+    if options.image is not None and options.file is not None:
+        parser.error('--image cannot be combined with --file')
+    if options.snapshot is not None and options.file is None:
+        parser.error('--snapshot requires --file')
+    if options.snapshot is not None and options.engine not in (None, 'stack'):
+        parser.error('--snapshot supports only the stack engine')
+    if options.stats is not None and options.file is None:
+        parser.error('--stats requires --file')
+    if options.connect is not None and options.file is None:
+        parser.error('--connect requires --file')
+    if options.connect is not None and options.engine not in (None, 'stack'):
+        parser.error('--connect supports only the stack engine')
+    if options.cache is not None and options.connect is not None:
+        # The daemon compiles with its own cache.
+        parser.error('--cache cannot be combined with --connect')
+    if options.cache is not None and options.image is not None:
+        parser.error('--cache cannot be combined with --image')
+    if options.disassemble and options.file is None:
+        parser.error('--disassemble requires --file')
+    if options.disassemble and options.engine not in (None, 'stack'):
+        parser.error('--disassemble supports only the stack engine')
+    if options.profile_heap is not None and options.file is None:
+        parser.error('--profile-heap requires --file')
+    if options.profile_heap is not None and options.engine not in (
+            None, 'stack'):
+        parser.error('--profile-heap supports only the stack engine')
+    if options.record_branches is not None and options.file is None:
+        parser.error('--record-branches requires --file')
+    if options.branch_profile is not None and options.file is None:
+        parser.error('--branch-profile requires --file')
+    if ((options.record_branches is not None
+            or options.branch_profile is not None)
+            and options.engine not in (None, 'stack')):
+        parser.error('branch profiles support only the stack engine')
+    if options.branch_profile is not None:
+        # These options run the file without laying it out, so the profile
+        # would be ignored.
+        ignored = [('--snapshot', options.snapshot is not None),
+            ('--connect', options.connect is not None),
+            ('--stats', options.stats is not None),
+            ('--disassemble', options.disassemble),
+            ('--profile-heap', options.profile_heap is not None),
+            ('--record-branches', options.record_branches is not None)]
+        for name, given in ignored:
+            if given:
+                parser.error(
+                    f'--branch-profile cannot be combined with {name}')
+    return options
 
 def run(options):
+    # Subsystems are imported only by the options that use them, to keep
+    # plain file runs fast to start.
+    if (socket_path := options.serve) is not None:
+        from .daemon import serve
+        cache = None if options.cache is None else ModuleCache(options.cache)
+        return run_safe(serve, socket_path, cache)
+    if (image := options.image) is not None:
+        return run_safe(run_image, image)
     if (file := options.file) is not None:
-        return run_file_safe(file)
-    repl()
+        if (socket_path := options.connect) is not None:
+            from .daemon import run_remote
+            return run_safe(run_remote, socket_path, file)
+        keywords = {}
+        if (cache := options.cache) is not None:
+            keywords['cache'] = ModuleCache(cache)
+        if (snapshot := options.snapshot) is not None:
+            return run_safe(snapshot_file, file, snapshot, **keywords)
+        if options.disassemble:
+            from .disassembler import disassemble_file
+            return run_safe(disassemble_file, file, **keywords)
+        if (report := options.profile_heap) is not None:
+            return run_safe(run_with_heap_profile, file, report, **keywords)
+        if (profile := options.record_branches) is not None:
+            from .profiler import record_branches_file
+            return run_safe(record_branches_file, file, profile, **keywords)
+        if (engine := options.engine) is not None:
+            keywords['engine'] = engine
+        if (format_ := options.stats) is not None:
+            return run_safe(run_with_statistics, file, format_, **keywords)
+        if (profile := options.branch_profile) is not None:
+            return run_safe(run_with_branch_profile, file, profile,
+                **keywords)
+        return run_safe(run_file, file, **keywords)
+    if options.batch or not sys.stdin.isatty():
+        from .repl import run_batch
+        run_batch()
+    else:
+        from .repl import repl
+        repl()
 
-def run_file_safe(file):
+def run_with_statistics(path, format_, **keywords):
+    from .stats import format_statistics, measure_file
+    statistics = measure_file(path, **keywords)
+    print(format_statistics(statistics, format_), file=sys.stderr)
+
+def run_with_heap_profile(path, report, **keywords):
+    from .profiler import format_heap_profile, profile_heap_file
+    profile = profile_heap_file(path, **keywords)
+    text = format_heap_profile(profile)
+    if report == Path('-'):
+        print(text, file=sys.stderr)
+    else:
+        report.write_text(f'{text}\n')
+
+def run_with_branch_profile(path, profile_path, **keywords):
+    from .branches import load_branch_profile
+    profile = load_branch_profile(profile_path)
+    run_file(path, branch_profile=profile, **keywords)
+
+def run_safe(function, *arguments, **keywords):
     try:
-        run_file(file)
+        function(*arguments, **keywords)
     except Exception as exception:
         return f'Error: {exception}'
 
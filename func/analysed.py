@@ -8,7 +8,9 @@ class Module:
     bindings: dict[str, Expression]
 
 class Expression:
-    pass
+    # A hash of the node's structure, cached by the analyser the first time
+    # it is needed.
+    structural_hash = None
 
 @dataclass
 class Reference(Expression):
@@ -1,7 +1,9 @@
 from .analysed import *
 from . import syntax
 
+from collections.abc import Container
 from contextlib import contextmanager
+from dataclasses import field
 
 
 class AnalysisError(Exception):
@@ -10,13 +12,13 @@ class AnalysisError(Exception):
 def analyse(module, additional_names=()):
     bindings = module.bindings
     scope = _make_scope(bindings, additional_names)
-    bindings = {binding.name: _analyse_expression(binding.value, scope)
+    bindings = {binding.name: _analyse(binding.value, scope)
         for binding in bindings}
     return Module(bindings)
 
 def analyse_expression(expression, additional_names=()):
     scope = _Scope.from_names(additional_names)
-    return _analyse_expression(expression, scope)
+    return _analyse(expression, scope)
 
 def _make_scope(bindings, additional_names):
     names = set(additional_names)
@@ -27,10 +29,22 @@ def _make_scope(bindings, additional_names):
         names.add(name)
     return _Scope.from_names(names)
 
+def _analyse(expression, scope):
+    node, _ = _analyse_expression(expression, scope)
+    return node
+
 def _analyse_expression(expression, scope):
+    """Analyse an expression, returning its node and the depth of the
+    outermost lambda whose parameter it uses without binding it, or _CLOSED
+    if it uses none.
+
+    Closed nodes are interned by their structure. A node that uses a
+    parameter of an enclosing lambda means something different in each
+    lambda, so it is not shared.
+    """
     match expression:
         case syntax.Integer(string):
-            return Integer(int(string))
+            return scope.intern_leaf(Integer, int(string)), _CLOSED
         case syntax.String(parts):
             return _analyse_string(parts, scope)
         case syntax.Identifier(name):
@@ -45,53 +59,167 @@ def _analyse_expression(expression, scope):
             raise TypeError(f'Unknown expression: {expression}')
 
 def _analyse_identifier(name, scope):
-    if name in scope.parameters:
-        return Parameter(name)
+    if (depth := scope.parameters.get(name)) is not None:
+        return Parameter(name), depth
     if name in scope.names:
-        return Reference(name)
+        return scope.intern_leaf(Reference, name), _CLOSED
     raise AnalysisError(f"Unbound name: '{name}'")
 
 def _analyse_call(callable_, argument, scope):
-    return Call(
-        _analyse_expression(callable_, scope),
-        _analyse_expression(argument, scope))
+    callable_, callable_depth = _analyse_expression(callable_, scope)
+    argument, argument_depth = _analyse_expression(argument, scope)
+    if (depth := min(callable_depth, argument_depth)) != _CLOSED:
+        return Call(callable_, argument), depth
+    hash_ = hash((Call, callable_.structural_hash, argument.structural_hash))
+    # Calls are the most common node. Their closed children are already
+    # shared, so a shared call can be found without building a new one.
+    existing = scope.nodes.get(hash_)
+    if (type(existing) is Call and existing.callable_ is callable_
+            and existing.argument is argument):
+        return existing, _CLOSED
+    return scope.intern(Call(callable_, argument), hash_), _CLOSED
 
 def _analyse_lambda(parameter, body, scope):
-    with scope.add_parameter(parameter):
-        return Lambda(parameter, _analyse_expression(body, scope))
+    with scope.add_parameter(parameter) as depth:
+        body, body_depth = _analyse_expression(body, scope)
+    node = Lambda(parameter, body)
+    # Lambdas nested in the body bind their own parameters, so the body can
+    # use none deeper than this lambda's.
+    if body_depth < depth:
+        return node, body_depth
+    hash_ = hash((Lambda, parameter, _hash_structure(body)))
+    return scope.intern(node, hash_), _CLOSED
 
 def _analyse_if_else(condition, true, false, scope):
-    return IfElse(
-        _analyse_expression(condition, scope),
-        _analyse_expression(true, scope),
-        _analyse_expression(false, scope))
+    condition, condition_depth = _analyse_expression(condition, scope)
+    true, true_depth = _analyse_expression(true, scope)
+    false, false_depth = _analyse_expression(false, scope)
+    node = IfElse(condition, true, false)
+    if (depth := min(condition_depth, true_depth, false_depth)) != _CLOSED:
+        return node, depth
+    hash_ = hash((IfElse, condition.structural_hash, true.structural_hash,
+        false.structural_hash))
+    return scope.intern(node, hash_), _CLOSED
 
 def _analyse_string(parts, scope):
-    parts = list(map(lambda part: _analyse_string_part(part, scope), parts))
-    return String(parts)
-
-def _analyse_string_part(part, scope):
-    match part:
-        case str() as string:
-            return string
-        case syntax.Expression() as expression:
-            return _analyse_expression(expression, scope)
-        case _:
-            raise TypeError(f'Unknown string part: {part}')
+    analysed_parts = []
+    depth = _CLOSED
+    for part in parts:
+        match part:
+            case str() as string:
+                analysed_parts.append(string)
+            case syntax.Expression() as expression:
+                part, part_depth = _analyse_expression(expression, scope)
+                analysed_parts.append(part)
+                depth = min(depth, part_depth)
+            case _:
+                raise TypeError(f'Unknown string part: {part}')
+    node = String(analysed_parts)
+    if depth != _CLOSED:
+        return node, depth
+    return scope.intern(node, hash(_string_fields(analysed_parts))), _CLOSED
+
+_CLOSED = float('inf')
 
 @dataclass
 class _Scope:
-    names: set[str]
-    parameters: set[str]
+    names: Container[str]
+    # The depth of the lambda binding each parameter in scope.
+    parameters: dict[str, int]
+    # Closed nodes by their structural hash, so that identical closed
+    # subexpressions share a node.
+    nodes: dict[int, Expression] = field(default_factory=dict)
+    # Integers and references by their type and value. They are compared
+    # exactly, so they are shared without being built first.
+    leaves: dict[tuple, Expression] = field(default_factory=dict)
+    depth: int = 0
 
     @classmethod
     def from_names(cls, names):
-        return cls(set(names), set())
+        return cls(names, {})
+
+    def intern(self, node, hash_):
+        """Return the shared node with the structure of a closed node, given
+        its structural hash."""
+        node.structural_hash = hash_
+        existing = self.nodes.setdefault(hash_, node)
+        if existing is node or (
+                type(existing) is type(node) and _same_fields(existing, node)):
+            return existing
+        # Nodes whose hashes collide are left unshared.
+        return node
+
+    def intern_leaf(self, type_, value):
+        key = type_, value
+        if (leaf := self.leaves.get(key)) is None:
+            leaf = self.leaves[key] = type_(value)
+            leaf.structural_hash = hash(key)
+        return leaf
 
     @contextmanager
     def add_parameter(self, name):
+        outer = self.parameters.get(name)
+        self.depth += 1
+        self.parameters[name] = self.depth
         try:
-            self.parameters.add(name)
-            yield
+            yield self.depth
         finally:
-            self.parameters.remove(name)
+            self.depth -= 1
+            if outer is None:
+                del self.parameters[name]
+            else:
+                self.parameters[name] = outer
+
+def _string_fields(parts):
+    return (String, *(part if isinstance(part, str) else _hash_structure(part)
+        for part in parts))
+
+def _hash_structure(node):
+    # Closed nodes are hashed as they are interned, so only the open nodes
+    # in the bodies of closed lambdas are hashed here.
+    if (hash_ := node.structural_hash) is not None:
+        return hash_
+    match node:
+        case Call(callable_, argument):
+            fields = (Call, _hash_structure(callable_),
+                _hash_structure(argument))
+        case Lambda(parameter, body):
+            fields = (Lambda, parameter, _hash_structure(body))
+        case IfElse(condition, true, false):
+            fields = (IfElse, _hash_structure(condition),
+                _hash_structure(true), _hash_structure(false))
+        case String(parts):
+            fields = _string_fields(parts)
+        case Parameter(name):
+            fields = (Parameter, name)
+    hash_ = node.structural_hash = hash(fields)
+    return hash_
+
+def _same_structure(first, second):
+    return first is second or (type(first) is type(second)
+        and _hash_structure(first) == _hash_structure(second)
+        and _same_fields(first, second))
+
+def _same_fields(first, second):
+    # Leaves are the most commonly shared nodes, so they are matched first.
+    match first:
+        case Reference(name) | Parameter(name):
+            return name == second.name
+        case Integer(value):
+            return value == second.value
+        case Call(callable_, argument):
+            return (_same_structure(callable_, second.callable_)
+                and _same_structure(argument, second.argument))
+        case Lambda(parameter, body):
+            return (parameter == second.parameter
+                and _same_structure(body, second.body))
+        case IfElse(condition, true, false):
+            return (_same_structure(condition, second.condition)
+                and _same_structure(true, second.true)
+                and _same_structure(false, second.false))
+        case String(parts):
+            return len(parts) == len(second.parts) and all(
+                part == other if isinstance(part, str)
+                else not isinstance(other, str)
+                    and _same_structure(part, other)
+                for part, other in zip(parts, second.parts))
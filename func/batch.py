@@ -0,0 +1,96 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+import os
+import threading
+
+from .interpreter import Interpreter
+
+
+@dataclass
+class JobResult:
+    output: str
+    error: Exception | None = None
+
+class Batch:
+    """A pool of worker processes that stay warm between batches.
+
+    Each worker keeps its interpreter, and so its caches, across every job
+    it runs, so a batch that is reused pays for starting processes and
+    compiling programs only once. Close the batch, or use it as a context
+    manager, to shut the workers down.
+    """
+
+    def __init__(self, *, workers=None):
+        self._workers = workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(self._workers)
+
+    def execute_many(self, sources):
+        return self._map(_run_source_job, sources)
+
+    def run_files(self, paths):
+        return self._map(_run_file_job, paths)
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def _map(self, job, inputs):
+        inputs = list(inputs)
+        chunk_size = max(1,
+            len(inputs) // (self._workers * _CHUNKS_PER_WORKER))
+        return list(self._executor.map(job, inputs, chunksize=chunk_size))
+
+_CHUNKS_PER_WORKER = 4
+
+def execute_many(sources, *, workers=None):
+    return _map_shared(Batch.execute_many, sources, workers)
+
+def run_files(paths, *, workers=None):
+    return _map_shared(Batch.run_files, paths, workers)
+
+def _map_shared(method, inputs, workers):
+    workers = workers or os.cpu_count() or 1
+    with _SHARED_LOCK:
+        if (batch := _SHARED_BATCHES.get(workers)) is None:
+            batch = _SHARED_BATCHES[workers] = Batch(workers=workers)
+    try:
+        return method(batch, inputs)
+    except BrokenProcessPool:
+        # A worker died, which leaves the whole pool unusable, so the next
+        # call starts a new one.
+        with _SHARED_LOCK:
+            if _SHARED_BATCHES.get(workers) is batch:
+                del _SHARED_BATCHES[workers]
+        raise
+
+# The batches behind the module functions, by number of workers. They are
+# shut down when the process exits.
+_SHARED_BATCHES = {}
+_SHARED_LOCK = threading.Lock()
+
+def _run_file_job(path):
+    return _run_job(_INTERPRETER.run_file, path)
+
+def _run_source_job(source):
+    return _run_job(_INTERPRETER.run_source, source)
+
+def _run_job(run, input_):
+    lines = []
+    try:
+        run(input_, lines.append)
+    except Exception as error:
+        return JobResult(_join_lines(lines), error)
+    return JobResult(_join_lines(lines))
+
+def _join_lines(lines):
+    return ''.join(f'{line}\n' for line in lines)
+
+# Each worker process keeps its interpreter, and so its caches and virtual
+# machines, across all the jobs it runs.
+_INTERPRETER = Interpreter()
@@ -0,0 +1,35 @@
+from dataclasses import dataclass, field
+
+
+@dataclass
+class BranchProfile:
+    """How often each if-else took its true and false branches.
+
+    Branches are keyed by the binding they are written in and their position
+    within it, so that a profile still applies after the program is laid
+    out differently.
+    """
+    counts: dict[str, list[int]] = field(default_factory=dict)
+
+    def record(self, key, condition):
+        counts = self.counts.setdefault(key, [0, 0])
+        counts[0 if condition else 1] += 1
+
+    def prefers_true(self, key):
+        """Return whether the true branch ran more often than the false one,
+        or None if neither did."""
+        true_count, false_count = self.counts.get(key, (0, 0))
+        if true_count == false_count:
+            return None
+        return true_count > false_count
+
+def load_branch_profile(path):
+    import json
+    with open(path) as file:
+        counts = json.load(file)
+    return BranchProfile({key: list(value) for key, value in counts.items()})
+
+def save_branch_profile(profile, path):
+    import json
+    with open(path, 'w') as file:
+        json.dump(profile.counts, file, indent=4, sort_keys=True)
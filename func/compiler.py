@@ -1,107 +1,525 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
 from .analysed import *
+from .functions import (
+    dereference,
+    get_arity,
+    get_main,
+    resolve_addresses,
+    unwind_call,
+    Builtin,
+    CompilationError,
+    Function,
+    Functions,
+)
 from .opcodes import Opcode
+from .typechecker import (
+    check_types,
+    function_type,
+    ARRAY,
+    INTEGER,
+    NOTHING,
+    STRING,
+)
+
+
+def compile_(module, branch_profile=None):
+    """Compile a module into a stack program.
+
+    If a branch profile is given, each if-else it has seen run places its
+    more frequent branch inline and moves the other to the end of the
+    function.
+    """
+    program, _, _ = _compile_module(module, branch_profile)
+    return program
+
+def compile_with_symbols(module, branch_profile=None):
+    """Compile a module, also naming the address where each function starts.
+
+    Functions are named after the binding they are the value of, and other
+    lambdas are named '<lambda>'. The main program starts at zero.
+    """
+    program, functions, _ = _compile_module(module, branch_profile)
+    return program, _name_functions(module, functions)
+
+def compile_with_ranges(module, branch_profile=None):
+    """Compile a module, naming its functions as compile_with_symbols()
+    does and also returning the range of units each inlined binding was
+    compiled into.
 
+    Bindings that are not functions are compiled inline wherever they are
+    used. Ranges are sorted by where they start, with ranges before those
+    nested in them.
+    """
+    program, functions, _ = _compile_module(
+        module, branch_profile, track_ranges=True)
+    ranges = sorted(functions.ranges,
+        key=lambda range_: (range_.start, -range_.end))
+    return program, _name_functions(module, functions), ranges
 
-def compile_(module):
+def attribute_units(length, symbols, ranges=()):
+    """Name the binding each unit of a program was compiled from.
+
+    Units belong to the function that starts at or before them, unless they
+    fall in the range of a binding inlined there, as returned by
+    compile_with_ranges().
+    """
+    names = [None] * length
+    starts = sorted(symbols)
+    for start, end in zip(starts, [*starts[1:], length]):
+        names[start:end] = [symbols[start]] * (end - start)
+    for range_ in ranges:
+        names[range_.start:range_.end] = (
+            [range_.name] * (range_.end - range_.start))
+    return names
+
+@dataclass(frozen=True)
+class BindingRange:
+    start: int
+    end: int
+    name: str
+
+def _name_functions(module, functions):
+    names = {id(value): name
+        for name, value in {**module.bindings, **BUILTINS}.items()}
+    symbols = {0: 'main'}
+    for function in functions:
+        symbols[function.address] = names.get(
+            id(function.expression), '<lambda>')
+    return symbols
+
+def compile_with_branches(module, branch_profile=None):
+    """Compile a module, also keying the address of each conditional jump
+    by the if-else it belongs to, for recording a branch profile."""
+    from .branches import BranchProfile
+    branch_profile = branch_profile or BranchProfile()
+    program, _, branches = _compile_module(module, branch_profile)
+    return program, branches
+
+def _compile_module(module, branch_profile, track_ranges=False):
+    check_types(module, BUILTINS)
     bindings = {**module.bindings, **BUILTINS}
-    main = _get_main(bindings)
-    units = _compile_expression(main, bindings)
-    return list(units)
+    main = get_main(bindings)
+    layout = None
+    if branch_profile is not None:
+        layout = _BranchLayout(_key_branches(module.bindings), branch_profile)
+    functions = _Functions(bindings, typed=True, layout=layout,
+        track_ranges=track_ranges)
+    context = _Context(bindings, {}, functions)
+    units = list(_compile_expression(main, context))
+    if functions or context.cold:
+        units.append(Opcode.RETURN)
+    units.extend(context.cold)
+    program = functions.link(units, [])
+    return program, functions, functions.branches
 
-def _get_main(bindings):
-    try:
-        return bindings['main']
-    except KeyError:
-        raise CompilationError('No main binding defined')
+class IncrementalCompiler:
+
+    def __init__(self, program):
+        self._program = program
+        self._bindings = BUILTINS.copy()
+        self._functions = _Functions(self._bindings)
 
-def _dereference_references(expression, bindings):
-    while isinstance(expression, Reference):
-        name = expression.name
+    @property
+    def names(self):
+        return self._bindings.keys()
+
+    def define(self, name, value):
+        self._bindings[name] = value
+        self._functions.invalidate(name)
+
+    def compile(self, expression):
+        address = len(self._program)
+        context = _Context(self._bindings, {}, self._functions)
         try:
-            expression = bindings[name]
-        except KeyError:
-            raise CompilationError(f'Undefined binding: {name}')
-    return expression
+            units = [*_compile_expression(expression, context), Opcode.RETURN]
+            self._functions.link(units, self._program)
+        except BaseException:
+            self._functions.discard_from(address, self._program)
+            raise
+        return address
 
-def _compile_expression(expression, bindings):
-    match _dereference_references(expression, bindings):
+def _compile_expression(expression, context):
+    if (isinstance(expression, Reference)
+            and context.functions.ranges is not None):
+        return _compile_reference(expression, context)
+    match dereference(expression, context.bindings, context.function):
         case Integer() as integer:
-            return _compile_integer(integer, bindings)
+            return _compile_integer(integer, context)
         case String() as string:
-            return _compile_string(string, bindings)
+            return _compile_string(string, context)
         case IfElse() as if_else:
-            return _compile_if_else(if_else, bindings)
+            return _compile_if_else(if_else, context)
         case Call() as call:
-            return _compile_call(call, bindings)
-        case Parameter():
-            return []
+            return _compile_call(call, context)
+        case Parameter() as parameter:
+            return _compile_parameter(parameter, context)
+        case Lambda() | Builtin() as function:
+            return _compile_function_value(function, context)
         case _:
             raise CompilationError(
                 f'Unsupported expression type: {expression}')
 
-def _compile_integer(integer, bindings):
+def _compile_reference(reference, context):
+    value = dereference(reference, context.bindings, context.function)
+    if isinstance(value, Lambda | Builtin):
+        # Functions are compiled once, not inlined where they are used.
+        yield from _compile_expression(value, context)
+        return
+    yield _RangeStart(_binding_name(reference, context.bindings))
+    yield from _compile_expression(value, context)
+    yield _RangeEnd()
+
+def _binding_name(reference, bindings):
+    while isinstance(value := bindings[reference.name], Reference):
+        reference = value
+    return reference.name
+
+def _compile_integer(integer, context):
     yield Opcode.PUSH
     yield integer.value
 
-def _compile_string(string, bindings):
-    value = _extract_string(string.parts)
+def _compile_string(string, context):
+    parts = string.parts
+    if all(isinstance(part, str) for part in parts):
+        return _compile_string_literal(''.join(parts))
+    return _compile_interpolation(parts, context)
+
+def _compile_string_literal(value):
     raw = value.encode('utf8')
     length = len(raw)
     yield Opcode.SET
     yield length
     yield from raw
 
-def _compile_if_else(if_else, bindings):
-    true_block = list(_compile_expression(if_else.true, bindings))
-    false_block = _compile_expression(if_else.false, bindings)
+def _compile_interpolation(parts, context):
+    for part in reversed(parts):
+        yield from _compile_string_part(part, context)
+    yield Opcode.CONCAT
+    yield len(parts)
+
+def _compile_string_part(part, context):
+    match part:
+        case str() as content:
+            return _compile_string_literal(content)
+        case Expression() as expression:
+            return _compile_expression(expression, context)
+        case _:
+            raise CompilationError(f'Unsupported string part: {part}')
+
+def _compile_if_else(if_else, context):
+    functions = context.functions
+    if (layout := functions.layout) is not None:
+        return _compile_laid_out_if_else(if_else, layout, context)
+    if functions.ranges is not None:
+        # Range markers take no space in the program, so jumps over them are
+        # resolved from labels.
+        return _compile_labelled_if_else(if_else, context)
+    return _compile_inline_if_else(if_else, context)
+
+def _compile_inline_if_else(if_else, context):
+    true_block = list(_compile_expression(if_else.true, context))
+    false_block = _compile_expression(if_else.false, context)
     false_block_with_jump = [*false_block, Opcode.JUMP, len(true_block)]
-    yield from _compile_expression(if_else.condition, bindings)
+    yield from _compile_expression(if_else.condition, context)
     yield Opcode.JUMP_IF
     yield len(false_block_with_jump)
     yield from false_block_with_jump
     yield from true_block
 
-def _compile_call(call, bindings):
-    argument = _dereference_references(call.argument, bindings)
-    yield from _compile_expression(argument, bindings)
-    callable_ = _dereference_references(call.callable_, bindings)
-    yield from _compile_callable(callable_, bindings)
-
-def _compile_callable(expression, bindings):
-    match _dereference_references(expression, bindings):
-        case list() as raw:
-            return raw
-        case Call():
-            return _compile_call(expression, bindings)
+def _compile_labelled_if_else(if_else, context):
+    yield from _compile_expression(if_else.condition, context)
+    yield from _compile_labelled_branches(if_else, context)
+
+def _compile_labelled_branches(if_else, context):
+    true_label, end_label = _Label(), _Label()
+    yield Opcode.JUMP_IF
+    yield _Offset(true_label)
+    yield from _compile_expression(if_else.false, context)
+    yield Opcode.JUMP
+    yield _Offset(end_label)
+    yield true_label
+    yield from _compile_expression(if_else.true, context)
+    yield end_label
+
+def _compile_laid_out_if_else(if_else, layout, context):
+    # Jump offsets are left as labels here and resolved once the whole
+    # function, including its out-of-line branches, has been compiled.
+    key = layout.keys[id(if_else)]
+    yield from _compile_expression(if_else.condition, context)
+    yield _BranchSite(key)
+    match layout.profile.prefers_true(key):
+        case None:
+            yield from _compile_labelled_branches(if_else, context)
+        case prefers_true:
+            hot, cold = if_else.true, if_else.false
+            jump = Opcode.JUMP_IF_NOT
+            if not prefers_true:
+                hot, cold = cold, hot
+                jump = Opcode.JUMP_IF
+            cold_label, resume_label = _Label(), _Label()
+            yield jump
+            yield _Offset(cold_label)
+            yield from _compile_expression(hot, context)
+            yield resume_label
+            cold_block = list(_compile_expression(cold, context))
+            context.cold.extend([cold_label, *cold_block,
+                Opcode.JUMP, _Offset(resume_label)])
+
+def _key_branches(bindings):
+    """Key every if-else by its binding and its position within it."""
+    keys = {}
+    for name, expression in bindings.items():
+        index = 0
+        pending = [expression]
+        while pending:
+            match pending.pop():
+                case IfElse(condition, true, false) as if_else:
+                    keys.setdefault(id(if_else), f'{name}:{index}')
+                    index += 1
+                    pending.extend((false, true, condition))
+                case Call(callable_, argument):
+                    pending.extend((argument, callable_))
+                case Lambda(_, body):
+                    pending.append(body)
+                case String(parts):
+                    pending.extend(part for part in reversed(parts)
+                        if isinstance(part, Expression))
+    return keys
+
+def _resolve_labels(units):
+    """Replace labels with jump offsets, returning the resolved units, the
+    offset of each conditional jump with its branch key and the offsets of
+    each binding range."""
+    positions = {}
+    branches = {}
+    starts = []
+    ranges = []
+    resolved = []
+    for unit in units:
+        match unit:
+            case _Label():
+                positions[unit] = len(resolved)
+            case _BranchSite(key):
+                branches[len(resolved)] = key
+            case _RangeStart(name):
+                starts.append((len(resolved), name))
+            case _RangeEnd():
+                start, name = starts.pop()
+                ranges.append((start, len(resolved), name))
+            case _:
+                resolved.append(unit)
+    for index, unit in enumerate(resolved):
+        if isinstance(unit, _Offset):
+            # Offsets are relative to the end of the jump instruction.
+            resolved[index] = positions[unit.label] - (index + 1)
+    return resolved, branches, ranges
+
+def _compile_call(call, context):
+    head, arguments = unwind_call(call, context.bindings, context.function)
+    arity = get_arity(head)
+    if arity is None or len(arguments) < arity:
+        return _compile_apply(head, arguments, context)
+    return _compile_saturated_call(
+        head, arguments[:arity], arguments[arity:], context)
+
+def _compile_saturated_call(head, arguments, extra, context):
+    yield from _compile_arguments(extra, context)
+    yield from _compile_arguments(arguments, context)
+    match head:
+        case Builtin(code, _, has_result):
+            yield from context.functions.specialise(code)
+            if not has_result:
+                # Calls are expressions, so they leave a value like any other.
+                yield Opcode.PUSH
+                yield 0
         case Lambda() as lambda_:
-            return _compile_lambda(lambda_, bindings)
-        case _:
-            raise CompilationError(f'Unsupported callable type: {expression}')
+            function = _get_function(lambda_, context)
+            yield from _compile_free_parameters(function, context)
+            yield Opcode.CALL
+            yield function
+            yield function.arity
+    if extra:
+        yield Opcode.APPLY
+        yield len(extra)
 
-def _compile_lambda(lambda_, bindings):
-    yield from _compile_expression(lambda_.body, bindings)
+def _compile_apply(head, arguments, context):
+    yield from _compile_arguments(arguments, context)
+    yield from _compile_expression(head, context)
+    yield Opcode.APPLY
+    yield len(arguments)
 
-def _extract_string(parts):
-    match parts:
-        case []:
-            return ''
-        case [str() as content]:
-            return content
-        case _:
-            raise CompilationError(
-                'String expression escapes are not supported')
+def _compile_arguments(arguments, context):
+    for argument in reversed(arguments):
+        yield from _compile_expression(argument, context)
+
+def _compile_parameter(parameter, context):
+    name = parameter.name
+    try:
+        index = context.environment[name]
+    except KeyError:
+        raise CompilationError(f'Unbound parameter: {name}')
+    yield Opcode.LOAD
+    yield index
+
+def _compile_function_value(expression, context):
+    function = _get_function(expression, context)
+    yield from _compile_free_parameters(function, context)
+    yield Opcode.FUNCTION
+    yield function
+    yield function.arity
+    if free_parameters := function.free_parameters:
+        yield Opcode.APPLY
+        yield len(free_parameters)
+
+def _get_function(expression, context):
+    return context.functions.get(expression, context.function)
+
+def _compile_free_parameters(function, context):
+    for name in reversed(function.free_parameters):
+        yield from _compile_parameter(Parameter(name), context)
+
+@dataclass
+class _Context:
+    bindings: dict
+    environment: dict[str, int]
+    functions: _Functions
+    function: Function | None = None
+    # Rarely taken branches, placed after the end of the function.
+    cold: list = field(default_factory=list)
+
+@dataclass(frozen=True)
+class _BranchLayout:
+    keys: dict[int, str]
+    profile: BranchProfile
+
+class _Label:
+    pass
+
+@dataclass(frozen=True)
+class _Offset:
+    label: _Label
+
+@dataclass(frozen=True)
+class _BranchSite:
+    key: str
+
+@dataclass(frozen=True)
+class _RangeStart:
+    name: str
+
+class _RangeEnd:
+    pass
+
+class _Functions(Functions):
+
+    def __init__(self, bindings, typed=False, layout=None,
+            track_ranges=False):
+        super().__init__()
+        self._bindings = bindings
+        self._typed = typed
+        self.layout = layout
+        self.branches = {}
+        self.ranges = [] if track_ranges else None
+        self._dependents = {}
+
+    def specialise(self, code):
+        # Well-typed programs never pass a builtin a value of the wrong
+        # type, so builtins can skip checking their arguments.
+        if not self._typed:
+            return code
+        return [_UNCHECKED_OPCODES.get(unit, unit) for unit in code]
+
+    def invalidate(self, name):
+        stale = list(self._dependents.pop(name, ()))
+        while stale:
+            function = stale.pop()
+            key = id(function.expression)
+            if self._functions.get(key) is function:
+                del self._functions[key]
+                stale.extend(function.callers)
+
+    def discard_from(self, address, program):
+        del program[address:]
+        self._pending.clear()
+        self._functions = {key: function
+            for key, function in self._functions.items()
+            if function.address is not None and function.address < address}
+
+    def link(self, units, program):
+        start = len(program)
+        program.extend(self._resolve(units, start))
+        while self._pending:
+            function = self._pending.popleft()
+            function.address = len(program)
+            body = self._compile_body(function)
+            program.extend(self._resolve(body, function.address))
+            for name in function.dependencies:
+                self._dependents.setdefault(name, set()).add(function)
+        program[start:] = resolve_addresses(program[start:])
+        return program
+
+    def _resolve(self, units, address):
+        if self.layout is None and self.ranges is None:
+            return units
+        units, branches, ranges = _resolve_labels(units)
+        for offset, key in branches.items():
+            self.branches[address + offset] = key
+        if self.ranges is not None:
+            self.ranges.extend(BindingRange(address + start, address + end,
+                name) for start, end, name in ranges)
+        return units
+
+    def _compile_body(self, function):
+        context = None
+        match function.expression:
+            case Builtin(code, arity, has_result):
+                for index in reversed(range(arity)):
+                    yield Opcode.LOAD
+                    yield index
+                yield from self.specialise(code)
+                if not has_result:
+                    # Every function returns exactly one value.
+                    yield Opcode.PUSH
+                    yield 0
+            case Lambda():
+                names = [*function.free_parameters, *function.parameters]
+                environment = {name: index for index, name in enumerate(names)}
+                context = _Context(
+                    self._bindings, environment, self, function)
+                yield from _compile_expression(function.body, context)
+        yield Opcode.RETURN
+        if context is not None:
+            yield from context.cold
+
+# The type of the functions that fold and zip_with apply to elements.
+_BINARY = function_type(INTEGER, INTEGER, INTEGER)
 
 BUILTINS = {
-    'print': [
-        Opcode.PRINT,
-    ],
-    'add': [
-        Opcode.ADD,
-    ],
-    'integer_to_string': [
-        Opcode.INTEGER_TO_STRING,
-    ],
+    'print': Builtin([Opcode.PRINT], 1, has_result=False,
+        type=function_type(STRING, NOTHING)),
+    'add': Builtin([Opcode.ADD], 2,
+        type=function_type(INTEGER, INTEGER, INTEGER)),
+    'integer_to_string': Builtin([Opcode.INTEGER_TO_STRING], 1,
+        type=function_type(INTEGER, STRING)),
+    'range': Builtin([Opcode.RANGE], 1,
+        type=function_type(INTEGER, ARRAY)),
+    'map_add': Builtin([Opcode.MAP_ADD], 2,
+        type=function_type(INTEGER, ARRAY, ARRAY)),
+    'zip_add': Builtin([Opcode.ZIP_ADD], 2,
+        type=function_type(ARRAY, ARRAY, ARRAY)),
+    'sum': Builtin([Opcode.SUM], 1,
+        type=function_type(ARRAY, INTEGER)),
+    'fold': Builtin([Opcode.FOLD], 3,
+        type=function_type(_BINARY, INTEGER, ARRAY, INTEGER)),
+    'zip_with': Builtin([Opcode.ZIP_WITH], 3,
+        type=function_type(_BINARY, ARRAY, ARRAY, ARRAY)),
 }
 
-class CompilationError(Exception):
-    pass
+_UNCHECKED_OPCODES = {
+    Opcode.MAP_ADD: Opcode.MAP_ADD_UNCHECKED,
+    Opcode.ZIP_ADD: Opcode.ZIP_ADD_UNCHECKED,
+    Opcode.SUM: Opcode.SUM_UNCHECKED,
+}
@@ -0,0 +1,95 @@
+import os
+from pathlib import Path
+import struct
+import sys
+
+from .runtime import execute
+from .modules import load_program, ModuleCache
+
+
+def serve(socket_path, cache=None):
+    import socketserver
+    cache = cache or ModuleCache()
+
+    class Handler(socketserver.BaseRequestHandler):
+
+        def handle(self):
+            _handle_connection(self.request, cache)
+
+    socket_path = Path(socket_path)
+    socket_path.unlink(missing_ok=True)
+    with socketserver.ThreadingUnixStreamServer(
+            str(socket_path), Handler) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            socket_path.unlink(missing_ok=True)
+
+def run_remote(socket_path, path, output=None):
+    import socket
+    output = sys.stdout if output is None else output
+    request = os.path.abspath(path).encode('utf8')
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(str(socket_path))
+        _send(connection, _REQUEST, request)
+        stream = connection.makefile('rb')
+        while (frame := _receive(stream)) is not None:
+            kind, payload = frame
+            if kind == _OUTPUT:
+                output.write(payload.decode('utf8'))
+                output.flush()
+            elif kind == _ERROR:
+                raise RemoteError(payload.decode('utf8'))
+            elif kind == _DONE:
+                return
+    raise RemoteError('Connection closed before the run finished')
+
+class RemoteError(Exception):
+    pass
+
+def _handle_connection(connection, cache):
+    stream = connection.makefile('rb')
+    frame = _receive(stream)
+    if frame is None or frame[0] != _REQUEST:
+        return
+    path = frame[1].decode('utf8')
+    output = _SocketOutput(connection)
+    try:
+        execute(load_program(path, cache).runnable(), output)
+    except Exception as exception:
+        _send(connection, _ERROR, str(exception).encode('utf8'))
+    else:
+        _send(connection, _DONE, b'')
+
+class _SocketOutput:
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def write(self, text):
+        _send(self._connection, _OUTPUT, text.encode('utf8'))
+        return len(text)
+
+    def flush(self):
+        pass
+
+def _send(connection, kind, payload):
+    connection.sendall(_FRAME.pack(kind, len(payload)) + payload)
+
+def _receive(stream):
+    header = stream.read(_FRAME.size)
+    if len(header) < _FRAME.size:
+        return None
+    kind, length = _FRAME.unpack(header)
+    return kind, stream.read(length)
+
+# Every message is a one byte kind and a payload length, followed by the
+# payload.
+_FRAME = struct.Struct('<cI')
+
+_REQUEST = b'R'
+_OUTPUT = b'O'
+_ERROR = b'E'
+_DONE = b'D'
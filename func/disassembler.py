@@ -0,0 +1,111 @@
+from collections import Counter
+from dataclasses import dataclass
+
+from .compiler import attribute_units, compile_with_ranges
+from .modules import load_module
+from .natives import NATIVES
+from .opcodes import Opcode, decode
+
+
+def disassemble_file(path, output=None, cache=None):
+    program, symbols, ranges = compile_with_ranges(load_module(path, cache))
+    print(disassemble(program, symbols), file=output)
+    print(file=output)
+    print(format_sizes(measure_sizes(program, symbols, ranges)), file=output)
+
+def disassemble(program, symbols=None):
+    """Return a listing of a stack program, one instruction per line.
+
+    Functions are labelled with their symbols and jump targets with their
+    addresses. Jumps and calls name their targets, and string literals are
+    decoded.
+    """
+    symbols = symbols or {0: 'main'}
+    instructions = list(decode(program))
+    labels = _find_labels(instructions, symbols)
+    lines = []
+    for address, opcode, operands in instructions:
+        if (label := labels.get(address)) is not None:
+            lines.append(f'{label}:')
+        text = ' '.join(_format_operands(
+            address, opcode, operands, labels, symbols))
+        lines.append(f'{address:>8}  {opcode.name:<20}{text}'.rstrip())
+    if (label := labels.get(len(program))) is not None:
+        lines.append(f'{label}:')
+    return '\n'.join(lines)
+
+@dataclass
+class Sizes:
+    """Program units by the binding they were compiled into and by opcode."""
+    bindings: Counter[str]
+    opcodes: Counter[str]
+    instructions: Counter[str]
+    total: int
+
+def measure_sizes(program, symbols=None, ranges=()):
+    """Measure a program by binding and by opcode.
+
+    Without the ranges of inlined bindings from compile_with_ranges(), code
+    is counted against the function it was inlined into.
+    """
+    names = attribute_units(len(program), symbols or {0: 'main'}, ranges)
+    bindings = Counter()
+    opcodes = Counter()
+    instructions = Counter()
+    for address, opcode, operands in decode(program):
+        size = 1 + len(operands)
+        bindings[names[address]] += size
+        opcodes[opcode.name] += size
+        instructions[opcode.name] += 1
+    return Sizes(bindings, opcodes, instructions, len(program))
+
+def format_sizes(sizes):
+    return '\n'.join(_format_sizes(sizes))
+
+def _format_sizes(sizes):
+    yield f'{"binding":<32}{"units":>10}{"share":>8}'
+    for name, units in sizes.bindings.most_common():
+        yield f'{name:<32}{units:>10}{_share(units, sizes):>8}'
+    yield ''
+    yield f'{"opcode":<22}{"count":>10}{"units":>10}{"share":>8}'
+    for name, units in sizes.opcodes.most_common():
+        count = sizes.instructions[name]
+        yield f'{name:<22}{count:>10}{units:>10}{_share(units, sizes):>8}'
+    yield ''
+    yield f'{"total":<32}{sizes.total:>10}'
+
+def _share(units, sizes):
+    return f'{units / sizes.total:.0%}'
+
+def _find_labels(instructions, symbols):
+    labels = {address: name for address, name in symbols.items()}
+    for address, opcode, operands in instructions:
+        if opcode in _JUMPS:
+            target = _jump_target(address, operands)
+            labels.setdefault(target, f'L{target}')
+    return labels
+
+def _jump_target(address, operands):
+    return address + 1 + len(operands) + operands[-1]
+
+_JUMPS = {
+    Opcode.JUMP,
+    Opcode.JUMP_IF,
+    Opcode.JUMP_IF_NOT,
+}
+
+def _format_operands(address, opcode, operands, labels, symbols):
+    match opcode, operands:
+        case Opcode.SET, [_, *raw]:
+            return [repr(bytes(raw).decode('utf8', errors='replace'))]
+        case Opcode.SET_CONSTANT, [constant, *_]:
+            return [repr(constant.string)]
+        case _ if opcode in _JUMPS:
+            return ['->', labels[_jump_target(address, operands)]]
+        case (Opcode.FUNCTION | Opcode.CALL), [target, arity]:
+            name = symbols.get(target, '?')
+            return [f'{name}@{target}', str(arity)]
+        case Opcode.CALL_NATIVE, [index, count] if 0 <= index < len(NATIVES):
+            return [NATIVES[index].name, str(count)]
+        case _:
+            return [str(operand) for operand in operands]
@@ -0,0 +1,28 @@
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from .runtime import execute, execute_registers
+from .compiler import compile_
+
+
+@dataclass(frozen=True)
+class Engine:
+    compile: Callable
+    execute: Callable
+
+def get_engine(name):
+    try:
+        return ENGINES[name]
+    except KeyError:
+        raise ValueError(f'Unknown engine: {name}') from None
+
+def _compile_registers(module):
+    # Most runs use the stack engine, so the register compiler is imported
+    # only when it is needed.
+    from .register_compiler import compile_registers
+    return compile_registers(module)
+
+ENGINES = {
+    'stack': Engine(compile_, execute),
+    'register': Engine(_compile_registers, execute_registers),
+}
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+
+from .analysed import *
+from .typechecker import Type
+
+
+@dataclass
+class Builtin:
+    code: list
+    arity: int
+    has_result: bool = True
+    type: Type | None = None
+
+class CompilationError(Exception):
+    pass
+
+def get_main(bindings):
+    try:
+        return bindings['main']
+    except KeyError:
+        raise CompilationError('No main binding defined')
+
+def dereference(expression, bindings, caller=None):
+    """Follow references to the expression they name.
+
+    Each name followed is recorded as a dependency of the calling function,
+    if there is one.
+    """
+    while isinstance(expression, Reference):
+        name = expression.name
+        try:
+            expression = bindings[name]
+        except KeyError:
+            raise CompilationError(f'Undefined binding: {name}')
+        if caller is not None:
+            caller.dependencies.add(name)
+    return expression
+
+def unwind_call(call, bindings, caller=None):
+    """Return the head of a curried call and all the arguments applied to
+    it, in order."""
+    arguments = []
+    expression = call
+    while isinstance(expression, Call):
+        arguments.append(expression.argument)
+        expression = dereference(expression.callable_, bindings, caller)
+    arguments.reverse()
+    return expression, arguments
+
+def get_arity(expression):
+    match expression:
+        case Builtin(_, arity):
+            return arity
+        case Lambda() as lambda_:
+            parameters, _ = _unwind_lambda(lambda_)
+            return len(parameters)
+        case _:
+            return None
+
+@dataclass(eq=False)
+class Function:
+    """A builtin or lambda compiled as a function of all its parameters.
+
+    Parameters of enclosing lambdas that the body uses are passed first, as
+    free parameters.
+    """
+    expression: Lambda | Builtin
+    parameters: list
+    free_parameters: list[str]
+    body: Expression | None
+    address: int | None = None
+    dependencies: set[str] = field(default_factory=set)
+    callers: set[Function] = field(default_factory=set)
+
+    @property
+    def arity(self):
+        return len(self.free_parameters) + len(self.parameters)
+
+def make_function(expression):
+    match expression:
+        case Builtin(_, arity):
+            return Function(expression, list(range(arity)), [], None)
+        case Lambda() as lambda_:
+            parameters, body = _unwind_lambda(lambda_)
+            free_parameters = _find_free_parameters(
+                body, set(parameters), [])
+            return Function(expression, parameters, free_parameters, body)
+
+class Functions:
+    """The functions of a program, each made once on first use.
+
+    Functions are keyed by the identity of their expression, and wait in a
+    queue until the compiler links their bodies into the program.
+    """
+
+    def __init__(self):
+        self._functions = {}
+        self._pending = deque()
+
+    def get(self, expression, caller=None):
+        key = id(expression)
+        if (function := self._functions.get(key)) is None:
+            function = make_function(expression)
+            self._functions[key] = function
+            self._pending.append(function)
+        if caller is not None:
+            function.callers.add(caller)
+        return function
+
+    def __bool__(self):
+        return bool(self._functions)
+
+    def __iter__(self):
+        return iter(self._functions.values())
+
+def resolve_addresses(units):
+    return [unit.address if isinstance(unit, Function) else unit
+        for unit in units]
+
+def _unwind_lambda(lambda_):
+    parameters = []
+    expression = lambda_
+    while isinstance(expression, Lambda):
+        parameters.append(expression.parameter)
+        expression = expression.body
+    return parameters, expression
+
+def _find_free_parameters(expression, bound, found):
+    match expression:
+        case Parameter(name):
+            if name not in bound and name not in found:
+                found.append(name)
+        case Call(callable_, argument):
+            _find_free_parameters(callable_, bound, found)
+            _find_free_parameters(argument, bound, found)
+        case IfElse(condition, true, false):
+            for child in (condition, true, false):
+                _find_free_parameters(child, bound, found)
+        case String(parts):
+            for part in parts:
+                _find_free_parameters(part, bound, found)
+        case Lambda(parameter, body):
+            _find_free_parameters(body, bound | {parameter}, found)
+    return found
@@ -0,0 +1,279 @@
+from array import array
+import mmap
+import os
+import struct
+
+from .natives import NATIVES
+from .opcodes import decode, Opcode
+from .runtime import (
+    ARRAY_TYPE,
+    Constant,
+    Frame,
+    Function,
+    Image,
+    PartialApplication,
+)
+from .verifier import verify, VerificationError
+
+
+def save_image(image, path):
+    heap = image.heap.tobytes()
+    writer = _Writer()
+    writer.write_integer(image.program_pointer)
+    writer.write_sequence(image.program, writer.write_unit)
+    writer.write_sequence(image.stack, writer.write_value)
+    writer.write_sequence(image.frames, writer.write_frame)
+    writer.write_sequence(image.natives, writer.write_string)
+    with open(path, 'wb') as file:
+        file.write(_HEADER.pack(_MAGIC, _VERSION, len(heap)))
+        file.write(heap)
+        file.write(writer.data)
+
+def load_image(path):
+    with open(path, 'rb') as file:
+        # Empty files cannot be mapped.
+        if os.fstat(file.fileno()).st_size == 0:
+            raise ImageError('Empty image')
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            return _read_image(view)
+
+def _read_image(view):
+    try:
+        magic, version, heap_length = _HEADER.unpack_from(view)
+    except struct.error:
+        raise ImageError('Truncated image header')
+    if magic != _MAGIC:
+        raise ImageError('Not a Func image')
+    if version != _VERSION:
+        raise ImageError(f'Unsupported image version: {version}')
+    heap_start = _HEADER.size
+    payload_start = heap_start + heap_length
+    if payload_start > len(view):
+        raise ImageError('Truncated image')
+    heap = array('B')
+    heap.frombytes(view[heap_start:payload_start])
+    reader = _Reader(view[payload_start:])
+    program_pointer = reader.read_integer()
+    program = reader.read_sequence(reader.read_unit)
+    stack = reader.read_sequence(reader.read_value)
+    frames = reader.read_sequence(reader.read_frame)
+    natives = reader.read_sequence(reader.read_string)
+    if not reader.at_end():
+        raise ImageError('Unexpected data at the end of the image')
+    _relink_natives(program, natives)
+    _verify(program, program_pointer, stack, frames)
+    return Image(program, program_pointer, stack, frames, heap,
+        [native.name for native in NATIVES])
+
+def _relink_natives(program, names):
+    """Point the CALL_NATIVE instructions of a program at the natives of this
+    process with the names they had when the image was taken."""
+    indices = {native.name: index for index, native in enumerate(NATIVES)}
+    try:
+        instructions = list(decode(program))
+    except ValueError as error:
+        raise ImageError(str(error)) from None
+    for address, opcode, operands in instructions:
+        if opcode != Opcode.CALL_NATIVE:
+            continue
+        index = operands[0]
+        if not 0 <= index < len(names):
+            raise ImageError(f'Unknown native index: {index}')
+        if (current := indices.get(names[index])) is None:
+            raise ImageError(f"Native not registered: '{names[index]}'")
+        program[address + 1] = current
+
+def _verify(program, program_pointer, stack, frames):
+    """Check that a restored program is well formed, and that the state
+    saved with it only points at its instructions."""
+    try:
+        verify(program)
+    except VerificationError as error:
+        raise ImageError(f'Invalid program: {error}') from None
+    addresses = {address for address, _, _ in decode(program)}
+    addresses.add(len(program))
+    if program_pointer not in addresses:
+        raise ImageError(
+            f'Program pointer is not an instruction: {program_pointer}')
+    values = list(stack)
+    for frame in frames:
+        if frame.return_address not in addresses:
+            raise ImageError('Return address is not an instruction: '
+                f'{frame.return_address}')
+        values += frame.arguments
+        values += frame.pending
+    while values:
+        value = values.pop()
+        if isinstance(value, PartialApplication):
+            values += value.arguments
+            value = value.function
+        if isinstance(value, Function) and value.address not in addresses:
+            raise ImageError(
+                f'Function address is not an instruction: {value.address}')
+
+class ImageError(Exception):
+    pass
+
+_HEADER = struct.Struct('<4sHQ')
+_MAGIC = b'FUNC'
+# Version 3 stores strings on the heap with four byte lengths. Version 4
+# replaces the pickled program, stack and frames with the format below, and
+# version 5 adds the names of natives.
+_VERSION = 5
+
+# After the heap, an image holds the program pointer, the program, the stack,
+# the frames and the names of natives. Sequences and byte strings are a count
+# followed by their items. Program units and values start with a one byte
+# tag: 'i' for an integer, 'o' for an opcode, 'c' for a quickened string
+# constant, 'f' for a function, 'p' for a partial application and 'a' for an
+# array.
+_COUNT = struct.Struct('<Q')
+_TAG = struct.Struct('<c')
+_FUNCTION = struct.Struct('<QQ')
+
+class _Writer:
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def write_sequence(self, items, write_item):
+        self.data += _COUNT.pack(len(items))
+        for item in items:
+            write_item(item)
+
+    def write_unit(self, unit):
+        match unit:
+            case Opcode():
+                self.data += b'o'
+                self.write_integer(unit.value)
+            case Constant(raw):
+                self.data += b'c'
+                self._write_bytes(raw)
+            case int():
+                self.data += b'i'
+                self.write_integer(unit)
+            case _:
+                raise ImageError(f'Cannot store program unit: {unit!r}')
+
+    def write_value(self, value):
+        match value:
+            case int():
+                self.data += b'i'
+                self.write_integer(value)
+            case Function(address, arity):
+                self.data += b'f'
+                self.data += _FUNCTION.pack(address, arity)
+            case PartialApplication(function, arguments):
+                self.data += b'p'
+                self.data += _FUNCTION.pack(function.address, function.arity)
+                self.write_sequence(arguments, self.write_value)
+            case array():
+                self.data += b'a'
+                self._write_bytes(value.tobytes())
+            case _:
+                raise ImageError(f'Cannot store value: {value!r}')
+
+    def write_frame(self, frame):
+        self.write_integer(frame.return_address)
+        self.write_sequence(frame.arguments, self.write_value)
+        self.write_sequence(frame.pending, self.write_value)
+
+    def write_string(self, string):
+        self._write_bytes(string.encode('utf8'))
+
+    def write_integer(self, value):
+        # Integers are signed and may be larger than a machine word.
+        self._write_bytes(value.to_bytes(
+            value.bit_length() // 8 + 1, 'little', signed=True))
+
+    def _write_bytes(self, data):
+        self.data += _COUNT.pack(len(data))
+        self.data += data
+
+class _Reader:
+
+    def __init__(self, data):
+        self._data = data
+        self._offset = 0
+
+    def at_end(self):
+        return self._offset == len(self._data)
+
+    def read_sequence(self, read_item):
+        count = self._unpack(_COUNT)[0]
+        return [read_item() for _ in range(count)]
+
+    def read_unit(self):
+        match tag := self._read_tag():
+            case b'o':
+                value = self.read_integer()
+                try:
+                    return Opcode(value)
+                except ValueError:
+                    raise ImageError(f'Unknown opcode: {value}') from None
+            case b'c':
+                raw = self._read_bytes()
+                return Constant(raw, self._decode(raw))
+            case b'i':
+                return self.read_integer()
+            case _:
+                raise ImageError(f'Unknown program unit: {tag!r}')
+
+    def read_value(self):
+        match tag := self._read_tag():
+            case b'i':
+                return self.read_integer()
+            case b'f':
+                return Function(*self._unpack(_FUNCTION))
+            case b'p':
+                function = Function(*self._unpack(_FUNCTION))
+                arguments = self.read_sequence(self.read_value)
+                return PartialApplication(function, arguments)
+            case b'a':
+                raw = self._read_bytes()
+                values = array(ARRAY_TYPE)
+                try:
+                    values.frombytes(raw)
+                except ValueError:
+                    raise ImageError('Invalid array in image') from None
+                return values
+            case _:
+                raise ImageError(f'Unknown value: {tag!r}')
+
+    def read_frame(self):
+        return_address = self.read_integer()
+        arguments = self.read_sequence(self.read_value)
+        pending = self.read_sequence(self.read_value)
+        return Frame(return_address, arguments, pending)
+
+    def read_string(self):
+        return self._decode(self._read_bytes())
+
+    def read_integer(self):
+        return int.from_bytes(self._read_bytes(), 'little', signed=True)
+
+    def _read_tag(self):
+        return self._unpack(_TAG)[0]
+
+    def _read_bytes(self):
+        length = self._unpack(_COUNT)[0]
+        end = self._offset + length
+        if end > len(self._data):
+            raise ImageError('Truncated image')
+        data = bytes(self._data[self._offset:end])
+        self._offset = end
+        return data
+
+    def _unpack(self, format_):
+        try:
+            values = format_.unpack_from(self._data, self._offset)
+        except struct.error:
+            raise ImageError('Truncated image') from None
+        self._offset += format_.size
+        return values
+
+    def _decode(self, raw):
+        try:
+            return raw.decode('utf8')
+        except UnicodeDecodeError:
+            raise ImageError('Invalid string in image') from None
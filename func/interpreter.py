@@ -0,0 +1,83 @@
+from collections import OrderedDict
+
+from .analyser import analyse
+from .compiler import compile_, BUILTINS
+from .modules import load_program, ModuleCache
+from .parser import parse
+from .runtime import VirtualMachine
+from .tokeniser import tokenise
+
+
+class Interpreter:
+    """Runs Func programs repeatedly, paying only for execution once warm.
+
+    Programs compiled from source are kept by source, and files by the key
+    their module cache gives the program, so a file is verified and copied
+    only when it changes. A single virtual machine is reset and reused for
+    every run. Output is returned as UTF-8 bytes, or passed line by line
+    to a sink if one is given.
+
+    Natives must be registered before the interpreter is created. An
+    interpreter must not be used from several threads at once.
+    """
+
+    def __init__(self, *, cache=None, cache_size=1024):
+        self._names = frozenset(BUILTINS)
+        self._module_cache = cache or ModuleCache()
+        self._programs = OrderedDict()
+        self._cache_size = cache_size
+        self._machine = _SinkMachine()
+
+    def run_source(self, source, sink=None):
+        return self._run(self.compile_source(source), sink)
+
+    def run_file(self, path, sink=None):
+        loaded = load_program(path, self._module_cache)
+        if (program := self._get(loaded.key)) is None:
+            program = loaded.runnable()
+            self._put(loaded.key, program)
+        return self._run(program, sink)
+
+    def compile_source(self, source):
+        if (program := self._get(source)) is not None:
+            return program
+        module = analyse(parse(tokenise(source)), self._names)
+        program = compile_(module)
+        self._put(source, program)
+        return program
+
+    def _get(self, key):
+        programs = self._programs
+        if (program := programs.get(key)) is not None:
+            programs.move_to_end(key)
+        return program
+
+    def _put(self, key, program):
+        programs = self._programs
+        programs[key] = program
+        if len(programs) > self._cache_size:
+            programs.popitem(last=False)
+
+    def _run(self, program, sink):
+        lines = None
+        if sink is None:
+            lines = []
+            sink = lines.append
+        machine = self._machine
+        machine.reset(program)
+        machine.sink = sink
+        try:
+            machine.run()
+        finally:
+            machine.sink = None
+        if lines is not None:
+            return ''.join(f'{line}\n' for line in lines).encode('utf8')
+
+class _SinkMachine(VirtualMachine):
+
+    def __init__(self):
+        super().__init__([])
+        self.sink = None
+
+    def _print(self, string):
+        self.sink(string)
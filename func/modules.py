@@ -0,0 +1,260 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+import hashlib
+import os
+from pathlib import Path
+import threading
+
+from . import analysed, syntax
+from .compiler import compile_ as compile_stack, BUILTINS
+from .engines import get_engine
+from .analyser import analyse
+from .parser import parse
+from .tokeniser import tokenise
+from .verifier import verify
+
+
+def compile_file(path, cache=None, *, workers=None, engine='stack',
+        branch_profile=None):
+    compiled = load_program(path, cache, workers=workers, engine=engine,
+        branch_profile=branch_profile)
+    return compiled.runnable()
+
+def load_program(path, cache=None, *, workers=None, engine='stack',
+        branch_profile=None):
+    """Compile a file, or fetch it from the cache, along with its cache key.
+
+    Stack programs are verified once, when they are compiled. The program is
+    the one held by the cache, so run the copy that runnable returns.
+    """
+    compile_ = get_engine(engine).compile
+    cache = cache or _DEFAULT_CACHE
+    units, order = _load(path, cache, workers)
+    if branch_profile is not None:
+        if engine != 'stack':
+            raise ValueError('Branch profiles support only the stack engine')
+        # Laid out programs depend on the profile, so they are not cached.
+        program = compile_stack(_link(units, order, cache), branch_profile)
+        verify(program)
+        return CompiledProgram(None, program)
+    key = (engine, *(units[path].digest for path in order))
+    if (compiled := cache.get_program(key)) is None:
+        program = compile_(_link(units, order, cache))
+        if engine == 'stack':
+            verify(program)
+        compiled = CompiledProgram(key, program)
+        cache.put_program(key, compiled)
+    return compiled
+
+def load_module(path, cache=None, *, workers=None):
+    """Analyse a file and everything it imports into a single module."""
+    cache = cache or _DEFAULT_CACHE
+    units, order = _load(path, cache, workers)
+    return _link(units, order, cache)
+
+class ModuleError(Exception):
+    pass
+
+@dataclass(frozen=True)
+class CompiledProgram:
+    key: tuple | None
+    program: list
+
+    def runnable(self):
+        """Return a copy of the program to run.
+
+        Running a program quickens it in place, and this one is shared by
+        everything that loaded it from the cache.
+        """
+        return self.program.copy()
+
+class ModuleCache:
+    """Analysed modules keyed by a digest of their source.
+
+    Entries are kept in memory and, if a directory is given, pickled there so
+    that later processes can reuse them. Linked programs are kept in memory
+    only, keyed by the engine and the digests of all the modules they were
+    built from. In memory, at most cache_size of each are kept, dropping the
+    least recently used. A cache can be shared between threads.
+    """
+
+    def __init__(self, directory=None, *, cache_size=1024):
+        self._directory = None if directory is None else Path(directory)
+        self._artifacts = _LruCache(cache_size)
+        self._programs = _LruCache(cache_size)
+
+    def get_program(self, key):
+        return self._programs.get(key)
+
+    def put_program(self, key, compiled):
+        self._programs.put(key, compiled)
+
+    def get(self, digest):
+        if (artifact := self._artifacts.get(digest)) is not None:
+            return artifact
+        if self._directory is None:
+            return None
+        import pickle
+        try:
+            with open(self._path(digest), 'rb') as file:
+                artifact = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        self._artifacts.put(digest, artifact)
+        return artifact
+
+    def put(self, digest, artifact):
+        self._artifacts.put(digest, artifact)
+        if self._directory is None:
+            return
+        import pickle
+        self._directory.mkdir(parents=True, exist_ok=True)
+        with open(self._path(digest), 'wb') as file:
+            pickle.dump(artifact, file)
+
+    def _path(self, digest):
+        return self._directory / f'{digest}.pickle'
+
+class _LruCache:
+
+    def __init__(self, size):
+        self._size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if (value := self._entries.get(key)) is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+
+_DEFAULT_CACHE = ModuleCache()
+
+@dataclass
+class _Artifact:
+    imports: list[str]
+    visible: frozenset[str]
+    module: analysed.Module
+
+@dataclass
+class _Unit:
+    path: Path
+    source: str
+    digest: str
+    imports: list[Path]
+    artifact: _Artifact | None
+    parsed: syntax.Module | None = None
+
+def _load(path, cache, workers):
+    root = Path(path).resolve()
+    units = _load_units(root, cache, workers)
+    return units, _order_units(units, root)
+
+def _load_units(root, cache, workers):
+    units = {}
+    frontier = [root]
+    while frontier:
+        loaded = [_read_unit(path, cache) for path in frontier]
+        missing = [unit for unit in loaded if unit.artifact is None]
+        sources = [unit.source for unit in missing]
+        parsed_modules = _parse_sources(sources, workers)
+        for unit, parsed in zip(missing, parsed_modules):
+            unit.parsed = parsed
+        frontier = []
+        for unit in loaded:
+            names = (unit.parsed.imports if unit.artifact is None
+                else unit.artifact.imports)
+            unit.imports = [unit.path.with_name(f'{name}{_SUFFIX}')
+                for name in names]
+            units[unit.path] = unit
+            frontier.extend(path for path in unit.imports
+                if path not in units and path not in frontier)
+    return units
+
+_SUFFIX = '.func'
+
+def _read_unit(path, cache):
+    with open(path) as file:
+        source = file.read()
+    digest = _digest(source)
+    return _Unit(path, source, digest, [], cache.get(digest))
+
+def _digest(source):
+    hash_ = hashlib.sha256(_CACHE_VERSION)
+    hash_.update(source.encode('utf8'))
+    return hash_.hexdigest()
+
+_CACHE_VERSION = b'1'
+
+def _parse_sources(sources, workers):
+    workers = workers or os.cpu_count() or 1
+    parallel = (workers > 1 and len(sources) > 1
+        and sum(map(len, sources)) >= _PARALLEL_THRESHOLD)
+    if not parallel:
+        return list(map(_parse_source, sources))
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(min(workers, len(sources))) as executor:
+        return list(executor.map(_parse_source, sources))
+
+# Below this many characters, starting worker processes costs more than
+# parsing sequentially.
+_PARALLEL_THRESHOLD = 1 << 16
+
+def _parse_source(source):
+    return parse(tokenise(source))
+
+def _order_units(units, root):
+    order = []
+    _visit_unit(units, root, [], order)
+    return order
+
+def _visit_unit(units, path, chain, order):
+    if path in order:
+        return
+    if path in chain:
+        cycle = ' -> '.join(
+            unit_path.stem for unit_path in [*chain[chain.index(path):], path])
+        raise ModuleError(f'Import cycle: {cycle}')
+    chain.append(path)
+    for dependency in units[path].imports:
+        _visit_unit(units, dependency, chain, order)
+    chain.pop()
+    order.append(path)
+
+def _link(units, order, cache):
+    bindings = {}
+    owners = {}
+    exports = {}
+    root = order[-1]
+    for path in order:
+        unit = units[path]
+        visible = frozenset().union(
+            *(exports[dependency] for dependency in unit.imports))
+        artifact = _get_artifact(unit, visible, cache)
+        names = [name for name in artifact.module.bindings
+            if path == root or name != 'main']
+        for name in names:
+            if (owner := owners.get(name)) is not None:
+                raise ModuleError(f"Binding '{name}' is defined by both "
+                    f"{owner.stem} and {path.stem}")
+            owners[name] = path
+            bindings[name] = artifact.module.bindings[name]
+        exports[path] = frozenset(names)
+    return analysed.Module(bindings)
+
+def _get_artifact(unit, visible, cache):
+    artifact = unit.artifact
+    if artifact is not None and artifact.visible == visible:
+        return artifact
+    parsed = unit.parsed or _parse_source(unit.source)
+    module = analyse(parsed, visible | BUILTINS.keys())
+    artifact = _Artifact(parsed.imports, visible, module)
+    cache.put(unit.digest, artifact)
+    return artifact
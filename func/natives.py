@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from array import array
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from .compiler import BUILTINS
+from .functions import Builtin
+from .opcodes import Opcode
+from .typechecker import function_type, ARRAY, INTEGER, NOTHING, STRING
+
+
+def register_native(name, function, parameters, result=None):
+    if name in BUILTINS:
+        raise ValueError(f"Builtin already defined: '{name}'")
+    parameters = tuple(parameters)
+    if not parameters:
+        raise ValueError(f"Native takes no parameters: '{name}'")
+    for type_ in parameters:
+        _check_marshallable(type_)
+    if result is not None:
+        _check_marshallable(result)
+    index = len(NATIVES)
+    NATIVES.append(Native(name, function, parameters, result))
+    arity = len(parameters)
+    types = [_TYPES[type_] for type_ in (*parameters, result)]
+    BUILTINS[name] = Builtin([Opcode.CALL_NATIVE, index, arity], arity,
+        has_result=result is not None, type=function_type(*types))
+
+def _check_marshallable(type_):
+    if type_ not in _MARSHALLABLE_TYPES:
+        raise TypeError(f'Unsupported native type: {type_}')
+
+@dataclass(frozen=True)
+class Native:
+    name: str
+    function: Callable
+    parameters: tuple[type, ...]
+    result: type | None
+
+NATIVES = []
+
+_MARSHALLABLE_TYPES = {int, str, array}
+
+_TYPES = {
+    int: INTEGER,
+    str: STRING,
+    array: ARRAY,
+    None: NOTHING,
+}
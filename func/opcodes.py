@@ -9,3 +9,115 @@ class Opcode(Enum):
     JUMP = auto()
     JUMP_IF = auto()
     INTEGER_TO_STRING = auto()
+    CONCAT = auto()
+    CALL_NATIVE = auto()
+    LOAD = auto()
+    FUNCTION = auto()
+    CALL = auto()
+    APPLY = auto()
+    RETURN = auto()
+    RANGE = auto()
+    MAP_ADD = auto()
+    ZIP_ADD = auto()
+    SUM = auto()
+    SET_CONSTANT = auto()
+    MAP_ADD_UNCHECKED = auto()
+    ZIP_ADD_UNCHECKED = auto()
+    SUM_UNCHECKED = auto()
+    JUMP_IF_NOT = auto()
+    FOLD = auto()
+    ZIP_WITH = auto()
+
+class RegisterOpcode(Enum):
+    FRAME = auto()
+    INTEGER = auto()
+    STRING = auto()
+    MOVE = auto()
+    PRINT = auto()
+    ADD = auto()
+    ADD_INTEGER = auto()
+    JUMP = auto()
+    JUMP_IF = auto()
+    INTEGER_TO_STRING = auto()
+    CONCAT = auto()
+    CALL_NATIVE = auto()
+    FUNCTION = auto()
+    CALL = auto()
+    APPLY = auto()
+    RETURN = auto()
+    RANGE = auto()
+    MAP_ADD = auto()
+    ZIP_ADD = auto()
+    SUM = auto()
+    FOLD = auto()
+    ZIP_WITH = auto()
+
+def decode(program):
+    address = 0
+    while address < len(program):
+        opcode = program[address]
+        start = address + 1
+        end = start + _count_operands(opcode, program[start:start + 1])
+        if end > len(program):
+            raise ValueError(f'Truncated instruction at {address}: {opcode}')
+        yield address, opcode, program[start:end]
+        address = end
+
+def _count_operands(opcode, first_operand):
+    match opcode, first_operand:
+        case Opcode.SET, [length]:
+            return 1 + length
+        case Opcode.SET_CONSTANT, [constant]:
+            return 1 + len(constant.raw)
+    try:
+        return OPERAND_COUNTS[opcode]
+    except KeyError:
+        raise ValueError(f'Unknown opcode: {opcode}') from None
+
+OPERAND_COUNTS = {
+    Opcode.PUSH: 1,
+    Opcode.PRINT: 0,
+    Opcode.ADD: 0,
+    Opcode.JUMP: 1,
+    Opcode.JUMP_IF: 1,
+    Opcode.INTEGER_TO_STRING: 0,
+    Opcode.CONCAT: 1,
+    Opcode.CALL_NATIVE: 2,
+    Opcode.LOAD: 1,
+    Opcode.FUNCTION: 2,
+    Opcode.CALL: 2,
+    Opcode.APPLY: 1,
+    Opcode.RETURN: 0,
+    Opcode.RANGE: 0,
+    Opcode.MAP_ADD: 0,
+    Opcode.ZIP_ADD: 0,
+    Opcode.SUM: 0,
+    Opcode.MAP_ADD_UNCHECKED: 0,
+    Opcode.ZIP_ADD_UNCHECKED: 0,
+    Opcode.SUM_UNCHECKED: 0,
+    Opcode.JUMP_IF_NOT: 1,
+    Opcode.FOLD: 0,
+    Opcode.ZIP_WITH: 0,
+    RegisterOpcode.FRAME: 1,
+    RegisterOpcode.INTEGER: 2,
+    RegisterOpcode.STRING: 2,
+    RegisterOpcode.MOVE: 2,
+    RegisterOpcode.PRINT: 1,
+    RegisterOpcode.ADD: 3,
+    RegisterOpcode.ADD_INTEGER: 3,
+    RegisterOpcode.JUMP: 1,
+    RegisterOpcode.JUMP_IF: 2,
+    RegisterOpcode.INTEGER_TO_STRING: 2,
+    RegisterOpcode.CONCAT: 3,
+    RegisterOpcode.CALL_NATIVE: 4,
+    RegisterOpcode.FUNCTION: 3,
+    RegisterOpcode.CALL: 4,
+    RegisterOpcode.APPLY: 4,
+    RegisterOpcode.RETURN: 1,
+    RegisterOpcode.RANGE: 2,
+    RegisterOpcode.MAP_ADD: 3,
+    RegisterOpcode.ZIP_ADD: 3,
+    RegisterOpcode.SUM: 2,
+    RegisterOpcode.FOLD: 4,
+    RegisterOpcode.ZIP_WITH: 4,
+}
@@ -17,9 +17,34 @@ def parse_expression(tokens):
     tokens = _Tokens(tokens)
     return _parse_expression(tokens)
 
+def parse_statement(tokens):
+    tokens = _Tokens(tokens)
+    statement = _parse_statement(tokens)
+    tokens.expect(_EndOfSource.kind)
+    return statement
+
+def _parse_statement(tokens):
+    expression = _parse_expression(tokens)
+    match expression:
+        case Identifier(name) if (
+                tokens.peek().kind == ConstantTokenKind.EQUALS):
+            tokens.get_next()
+            value = _parse_expression(tokens)
+            return Binding(name, value)
+        case _:
+            return expression
+
 def _parse_module(tokens):
+    imports = list(_parse_imports(tokens))
     bindings = list(_parse_module_bindings(tokens))
-    return Module(bindings)
+    return Module(bindings, imports)
+
+def _parse_imports(tokens):
+    while tokens.peek().kind == ConstantTokenKind.IMPORT:
+        tokens.get_next()
+        yield tokens.expect(ValueTokenKind.IDENTIFIER).value
+        if tokens.peek() is not _END_OF_SOURCE:
+            tokens.expect(ConstantTokenKind.NEWLINE)
 
 def _parse_module_bindings(tokens):
     first = True
@@ -186,6 +211,8 @@ _TOKEN_KIND_DESCRIPTIONS = {
         'an opening bracket',
     ConstantTokenKind.CLOSE_BRACKET:
         'a closing bracket',
+    ConstantTokenKind.IMPORT:
+        'an import',
     _EndOfSource.kind:
         'end-of-source',
 }
@@ -0,0 +1,157 @@
+from dataclasses import dataclass, field
+
+from .branches import BranchProfile, save_branch_profile
+from .compiler import (
+    attribute_units,
+    compile_with_branches,
+    compile_with_ranges,
+)
+from .modules import load_module
+from .opcodes import Opcode
+from .runtime import VirtualMachine
+
+
+def profile_heap_file(path, output=None, cache=None):
+    program, symbols, ranges = compile_with_ranges(load_module(path, cache))
+    return profile_heap(program, symbols, output, ranges)
+
+def profile_heap(program, symbols=None, output=None, ranges=()):
+    """Run a stack program, recording every heap allocation it makes.
+
+    Allocations are attributed to the instruction that made them and to
+    the binding that instruction was compiled into, found as
+    measure_sizes() does.
+    """
+    profile = HeapProfile(
+        attribute_units(len(program), symbols or {0: 'main'}, ranges))
+    machine = _ProfilingVirtualMachine(program, output, profile)
+    machine.run()
+    return profile
+
+@dataclass
+class AllocationSite:
+    address: int
+    opcode: Opcode
+    binding: str
+    allocations: int = 0
+    bytes: int = 0
+
+@dataclass
+class HeapProfile:
+    """Heap allocations by site, and the largest the heap grew.
+
+    The heap is never freed while a program runs, so every allocation stays
+    live and the peak is the size of the heap when the program finishes.
+    Arrays are kept outside the heap, so they count as allocations but not
+    towards the peak.
+    """
+    # The binding each unit of the program was compiled from.
+    bindings: list[str] = field(repr=False)
+    sites: dict[int, AllocationSite] = field(default_factory=dict)
+    allocations: int = 0
+    allocated_bytes: int = 0
+    peak_bytes: int = 0
+
+    def record(self, address, opcode, size, heap_size):
+        if (site := self.sites.get(address)) is None:
+            site = AllocationSite(address, opcode, self.bindings[address])
+            self.sites[address] = site
+        site.allocations += 1
+        site.bytes += size
+        self.allocations += 1
+        self.allocated_bytes += size
+        self.peak_bytes = max(self.peak_bytes, heap_size)
+
+    def ranked_sites(self):
+        return sorted(self.sites.values(),
+            key=lambda site: (-site.bytes, site.address))
+
+def format_heap_profile(profile):
+    return '\n'.join(_format_heap_profile(profile))
+
+def _format_heap_profile(profile):
+    yield f'{"allocations":<20}{profile.allocations:>12}'
+    yield f'{"allocated bytes":<20}{profile.allocated_bytes:>12}'
+    yield f'{"peak heap bytes":<20}{profile.peak_bytes:>12}'
+    yield ''
+    yield (f'{"address":>8}  {"opcode":<20}{"binding":<24}'
+        f'{"allocations":>12}{"bytes":>12}{"share":>8}')
+    # Empty arrays are allocations of no bytes.
+    total = profile.allocated_bytes or 1
+    for site in profile.ranked_sites():
+        share = site.bytes / total
+        yield (f'{site.address:>8}  {site.opcode.name:<20}{site.binding:<24}'
+            f'{site.allocations:>12}{site.bytes:>12}{share:>8.0%}')
+
+def record_branches_file(path, profile_path, output=None, cache=None):
+    program, branches = compile_with_branches(load_module(path, cache))
+    profile = record_branches(program, branches, output)
+    save_branch_profile(profile, profile_path)
+    return profile
+
+def record_branches(program, branches, output=None):
+    """Run a stack program, counting how each of its if-elses goes.
+
+    The branches map the address of each conditional jump to the key of its
+    if-else, as returned by compile_with_branches().
+    """
+    profile = BranchProfile()
+    machine = _BranchRecordingVirtualMachine(
+        program, output, branches, profile)
+    machine.run()
+    return profile
+
+class _ProfilingVirtualMachine(VirtualMachine):
+
+    def __init__(self, program, output, profile):
+        super().__init__(program, output)
+        self._profile = profile
+        self._instruction = None
+
+    def run(self):
+        while self._peek() is not None:
+            self._step()
+
+    def _step(self):
+        # Folds and zips run other instructions before they finish, so the
+        # instruction is kept here as well as on the machine.
+        instruction = self._instruction = self._program_pointer, self._peek()
+        super()._step()
+        if instruction[1] in _ARRAY_ALLOCATIONS:
+            values = self._stack[-1]
+            self._profile.record(*instruction,
+                len(values) * values.itemsize, len(self._heap))
+
+    def _store_string(self, raw, string):
+        address = super()._store_string(raw, string)
+        heap_size = len(self._heap)
+        self._profile.record(*self._instruction, heap_size - address,
+            heap_size)
+        return address
+
+# Opcodes that leave a new array on top of the stack.
+_ARRAY_ALLOCATIONS = {
+    Opcode.RANGE,
+    Opcode.MAP_ADD,
+    Opcode.ZIP_ADD,
+    Opcode.MAP_ADD_UNCHECKED,
+    Opcode.ZIP_ADD_UNCHECKED,
+    Opcode.ZIP_WITH,
+}
+
+class _BranchRecordingVirtualMachine(VirtualMachine):
+
+    def __init__(self, program, output, branches, profile):
+        super().__init__(program, output)
+        self._branches = branches
+        self._profile = profile
+
+    def run(self):
+        while self._peek() is not None:
+            self._step()
+
+    def _step(self):
+        if (key := self._branches.get(self._program_pointer)) is not None:
+            # The condition is on top of the stack.
+            self._profile.record(key, self._stack[-1] != 0)
+        super()._step()
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+from .analysed import *
+from .compiler import BUILTINS
+from .functions import (
+    dereference,
+    get_arity,
+    get_main,
+    resolve_addresses,
+    unwind_call,
+    Builtin,
+    CompilationError,
+    Functions,
+)
+from .opcodes import Opcode, RegisterOpcode, OPERAND_COUNTS
+from .typechecker import check_types
+
+
+def compile_registers(module):
+    check_types(module, BUILTINS)
+    bindings = {**module.bindings, **BUILTINS}
+    main = get_main(bindings)
+    functions = _Functions(bindings)
+    builder = _Builder(bindings, functions)
+    result = _compile_operand(main, builder)
+    if functions:
+        builder.emit(RegisterOpcode.RETURN, result)
+    return functions.link(builder.finish())
+
+def _compile_into(expression, target, builder):
+    match builder.dereference(expression):
+        case Integer(value):
+            builder.emit(RegisterOpcode.INTEGER, target, value)
+        case String(parts):
+            _compile_string(parts, target, builder)
+        case IfElse() as if_else:
+            _compile_if_else(if_else, target, builder)
+        case Call() as call:
+            _compile_call(call, target, builder)
+        case Parameter(name):
+            builder.emit(RegisterOpcode.MOVE, target, builder.lookup(name))
+        case Lambda() | Builtin() as function:
+            _compile_function_value(function, target, builder)
+        case _:
+            raise CompilationError(
+                f'Unsupported expression type: {expression}')
+
+def _compile_operand(expression, builder):
+    """Return a register holding the value, allocating one if needed."""
+    expression = builder.dereference(expression)
+    if isinstance(expression, Parameter):
+        return builder.lookup(expression.name)
+    register = builder.allocate()
+    _compile_into(expression, register, builder)
+    return register
+
+def _compile_block(expressions, builder):
+    """Compile the values into consecutive registers and return the first."""
+    first = builder.allocate(len(expressions))
+    for register, expression in enumerate(expressions, first):
+        _compile_into(expression, register, builder)
+    return first
+
+def _compile_string(parts, target, builder):
+    if all(isinstance(part, str) for part in parts):
+        builder.emit(RegisterOpcode.STRING, target, ''.join(parts))
+        return
+    mark = builder.mark()
+    first = builder.allocate(len(parts))
+    for register, part in enumerate(parts, first):
+        match part:
+            case str() as content:
+                builder.emit(RegisterOpcode.STRING, register, content)
+            case Expression() as expression:
+                _compile_into(expression, register, builder)
+            case _:
+                raise CompilationError(f'Unsupported string part: {part}')
+    builder.emit(RegisterOpcode.CONCAT, target, first, len(parts))
+    builder.release(mark)
+
+def _compile_if_else(if_else, target, builder):
+    mark = builder.mark()
+    condition = _compile_operand(if_else.condition, builder)
+    builder.release(mark)
+    jump_if = builder.emit(RegisterOpcode.JUMP_IF, condition, None)
+    _compile_into(if_else.false, target, builder)
+    jump = builder.emit(RegisterOpcode.JUMP, None)
+    builder.patch_jump(jump_if)
+    _compile_into(if_else.true, target, builder)
+    builder.patch_jump(jump)
+
+def _compile_call(call, target, builder):
+    head, arguments = unwind_call(call, builder.bindings, builder.function)
+    arity = get_arity(head)
+    mark = builder.mark()
+    if arity is None or len(arguments) < arity:
+        first = _compile_block(arguments, builder)
+        function = _compile_operand(head, builder)
+        builder.emit(RegisterOpcode.APPLY,
+            target, function, first, len(arguments))
+    else:
+        _compile_saturated_call(head, arguments[:arity], target, builder)
+        if extra := arguments[arity:]:
+            first = _compile_block(extra, builder)
+            builder.emit(RegisterOpcode.APPLY,
+                target, target, first, len(extra))
+    builder.release(mark)
+
+def _compile_saturated_call(head, arguments, target, builder):
+    match head:
+        case Builtin([Opcode.CALL_NATIVE, index, count]):
+            first = _compile_block(arguments, builder)
+            builder.emit(RegisterOpcode.CALL_NATIVE,
+                target, index, first, count)
+        case Builtin([Opcode.ADD]) if (
+                addend := _find_integer(arguments, builder)) is not None:
+            other, value = addend
+            source = _compile_operand(other, builder)
+            builder.emit(RegisterOpcode.ADD_INTEGER, target, source, value)
+        case Builtin([opcode]):
+            sources = [_compile_operand(argument, builder)
+                for argument in arguments]
+            _emit_builtin(opcode, target, sources, builder)
+        case Builtin(code):
+            raise CompilationError(f'Unsupported builtin code: {code}')
+        case Lambda() as lambda_:
+            function = builder.get_function(lambda_)
+            first = builder.allocate(function.arity)
+            registers = iter(range(first, first + function.arity))
+            for name, register in zip(function.free_parameters, registers):
+                builder.emit(RegisterOpcode.MOVE,
+                    register, builder.lookup(name))
+            for argument, register in zip(arguments, registers):
+                _compile_into(argument, register, builder)
+            builder.emit(RegisterOpcode.CALL,
+                target, function, first, function.arity)
+
+def _find_integer(arguments, builder):
+    first, second = arguments
+    match [builder.dereference(argument) for argument in arguments]:
+        case [_, Integer(value)]:
+            return first, value
+        case [Integer(value), _]:
+            return second, value
+    return None
+
+def _emit_builtin(opcode, target, sources, builder):
+    register_opcode = _BUILTIN_OPCODES[opcode]
+    if opcode in _RESULTLESS:
+        builder.emit(register_opcode, *sources)
+    else:
+        builder.emit(register_opcode, target, *sources)
+
+_BUILTIN_OPCODES = {
+    Opcode.PRINT: RegisterOpcode.PRINT,
+    Opcode.ADD: RegisterOpcode.ADD,
+    Opcode.INTEGER_TO_STRING: RegisterOpcode.INTEGER_TO_STRING,
+    Opcode.RANGE: RegisterOpcode.RANGE,
+    Opcode.MAP_ADD: RegisterOpcode.MAP_ADD,
+    Opcode.ZIP_ADD: RegisterOpcode.ZIP_ADD,
+    Opcode.SUM: RegisterOpcode.SUM,
+    Opcode.FOLD: RegisterOpcode.FOLD,
+    Opcode.ZIP_WITH: RegisterOpcode.ZIP_WITH,
+}
+
+_RESULTLESS = {
+    Opcode.PRINT,
+}
+
+def _compile_function_value(expression, target, builder):
+    function = builder.get_function(expression)
+    builder.emit(RegisterOpcode.FUNCTION, target, function, function.arity)
+    if free_parameters := function.free_parameters:
+        mark = builder.mark()
+        first = builder.allocate(len(free_parameters))
+        for register, name in enumerate(free_parameters, first):
+            builder.emit(RegisterOpcode.MOVE, register, builder.lookup(name))
+        builder.emit(RegisterOpcode.APPLY,
+            target, target, first, len(free_parameters))
+        builder.release(mark)
+
+class _Builder:
+    """Emits the code of one function body and allocates its registers.
+
+    Parameters occupy the first registers. Temporaries are allocated above
+    them and released in stack order, so the register file of a frame is
+    only as large as its deepest expression.
+    """
+
+    def __init__(self, bindings, functions, function=None, parameters=()):
+        self.bindings = bindings
+        self.function = function
+        self._functions = functions
+        self._environment = {name: index
+            for index, name in enumerate(parameters)}
+        self._code = []
+        self._next_register = len(self._environment)
+        self._size = self._next_register
+
+    def emit(self, *units):
+        start = len(self._code)
+        self._code.extend(units)
+        return start
+
+    def patch_jump(self, start):
+        # The offset is always the last operand and is relative to the end
+        # of the jump instruction.
+        end = start + 1 + OPERAND_COUNTS[self._code[start]]
+        self._code[end - 1] = len(self._code) - end
+
+    def lookup(self, name):
+        try:
+            return self._environment[name]
+        except KeyError:
+            raise CompilationError(f'Unbound parameter: {name}')
+
+    def allocate(self, count=1):
+        first = self._next_register
+        self._next_register += count
+        self._size = max(self._size, self._next_register)
+        return first
+
+    def mark(self):
+        return self._next_register
+
+    def release(self, mark):
+        self._next_register = mark
+
+    def dereference(self, expression):
+        return dereference(expression, self.bindings, self.function)
+
+    def get_function(self, expression):
+        return self._functions.get(expression, self.function)
+
+    def finish(self):
+        # Code is preceded by the size of the register file it needs. The
+        # FRAME instruction itself is never executed.
+        return [RegisterOpcode.FRAME, self._size, *self._code]
+
+class _Functions(Functions):
+
+    def __init__(self, bindings):
+        super().__init__()
+        self._bindings = bindings
+
+    def link(self, program):
+        while self._pending:
+            function = self._pending.popleft()
+            body = self._compile_body(function)
+            function.address = len(program) + 2
+            program.extend(body)
+        return resolve_addresses(program)
+
+    def _compile_body(self, function):
+        names = [*function.free_parameters, *function.parameters]
+        builder = _Builder(self._bindings, self, function, names)
+        match function.expression:
+            case Builtin([Opcode.CALL_NATIVE, index, count]):
+                result = builder.allocate()
+                builder.emit(RegisterOpcode.CALL_NATIVE,
+                    result, index, 0, count)
+            case Builtin([opcode]):
+                result = builder.allocate()
+                sources = range(function.arity)
+                _emit_builtin(opcode, result, sources, builder)
+            case Builtin(code):
+                raise CompilationError(f'Unsupported builtin code: {code}')
+            case Lambda():
+                result = _compile_operand(function.body, builder)
+        builder.emit(RegisterOpcode.RETURN, result)
+        return builder.finish()
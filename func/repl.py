@@ -1,44 +1,70 @@
-from .runtime import execute
-from .compiler import compile_, BUILTINS
-from .analysed import Expression, Module
+import sys
+
+from .runtime import PersistentMachine
+from .compiler import IncrementalCompiler, BUILTINS
 from .analyser import analyse_expression
-from .parser import parse_binding, parse_expression, ParseError
-from .tokeniser import tokenise, TokeniseError
+from .syntax import Binding
+from .parser import parse_statement
+from .tokeniser import tokenise
+from .typechecker import TypeEnvironment
 
 
 def repl():
-    bindings = BUILTINS.copy()
+    session = _Session()
     while (line := _get_next_line()) is not None:
         try:
-            match _process_line(line, bindings):
-                case (name, value):
-                    bindings[name] = value
-                case Expression() as expression:
-                    _execute(expression, bindings)
-                case other:
-                    raise TypeError(f'Unknown: {other}')
+            session.process_line(line)
         except Exception as exception:
             print(f'Error: {exception}')
 
+def run_batch(input_=None, output=None):
+    input_ = sys.stdin if input_ is None else input_
+    session = _Session(output)
+    for line in _read_lines(input_):
+        if not line or line.isspace():
+            continue
+        try:
+            session.process_line(line)
+        except Exception as exception:
+            print(f'Error: {exception}', file=output)
+
 def _get_next_line():
     try:
         return input('>>> ')
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, EOFError):
         return None
 
-def _process_line(line, bindings):
-    tokens = list(tokenise(line))
-    try:
-        syntax_binding = parse_binding(iter(tokens))
-    except ParseError:
-        syntax_expression = parse_expression(iter(tokens))
-        return analyse_expression(syntax_expression, bindings)
-    else:
-        name = syntax_binding.name
-        value = analyse_expression(syntax_binding.value, bindings)
-        return (name, value)
-
-def _execute(main, bindings):
-    module = Module({'main': main, **bindings})
-    program = compile_(module)
-    execute(program)
+def _read_lines(input_):
+    remainder = ''
+    while chunk := input_.read(_CHUNK_SIZE):
+        lines = (remainder + chunk).split('\n')
+        remainder = lines.pop()
+        for line in lines:
+            yield line.removesuffix('\r')
+    yield remainder.removesuffix('\r')
+
+_CHUNK_SIZE = 1 << 16
+
+class _Session:
+
+    def __init__(self, output=None):
+        program = []
+        self._compiler = IncrementalCompiler(program)
+        self._types = TypeEnvironment(BUILTINS)
+        self._machine = PersistentMachine(program, output)
+
+    def process_line(self, line):
+        tokens = tokenise(line)
+        match parse_statement(tokens):
+            case Binding(name, value):
+                value = self._analyse(value)
+                self._types.define(name, value)
+                self._compiler.define(name, value)
+            case statement:
+                expression = self._analyse(statement)
+                self._types.check_expression(expression)
+                address = self._compiler.compile(expression)
+                self._machine.run(address)
+
+    def _analyse(self, expression):
+        return analyse_expression(expression, self._compiler.names)
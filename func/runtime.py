@@ -1,36 +1,130 @@
 from array import array
+from dataclasses import dataclass, field
+import operator
 
-from .opcodes import Opcode
+from .natives import NATIVES
+from .opcodes import Opcode, RegisterOpcode
 
 
-def execute(program):
-    machine = _VirtualMachine(program)
+def execute(program, output=None, statistics=None):
+    """Run a stack program.
+
+    Programs must be lists, because instructions are quickened in place as
+    they run. A quickened program can be run again, but not by two machines
+    at once, so concurrent runs need a copy each.
+    """
+    if statistics is None:
+        machine = VirtualMachine(program, output)
+    else:
+        machine = _MeasuringVirtualMachine(program, output, statistics)
+    machine.run()
+
+def execute_registers(program, output=None, statistics=None):
+    if statistics is None:
+        machine = _RegisterMachine(program, output)
+    else:
+        machine = _MeasuringRegisterMachine(program, output, statistics)
     machine.run()
 
-class _VirtualMachine:
+def preinitialise(program):
+    machine = VirtualMachine(program)
+    machine.run_until_side_effect()
+    return machine.image()
+
+def resume(image, output=None):
+    machine = VirtualMachine(image.program, output)
+    machine.restore(image)
+    machine.run()
+
+class PersistentMachine:
+
+    def __init__(self, program, output=None):
+        self._machine = VirtualMachine(program, output)
 
-    def __init__(self, program):
+    def run(self, address):
+        self._machine.run_from(address)
+
+@dataclass
+class Image:
+    program: list
+    program_pointer: int
+    stack: list
+    frames: list
+    heap: array
+    # The names of the natives that CALL_NATIVE indexes into, since indices
+    # are only valid in the process that registered them.
+    natives: list[str] = field(default_factory=list)
+
+async def execute_async(program, sink=None, *, interval=1000):
+    if interval < 1:
+        raise ValueError(f'Interval must be at least 1, got: {interval}')
+    machine = _AsyncVirtualMachine(program, sink or _print_sink)
+    await machine.run_async(interval)
+
+async def _print_sink(string):
+    print(string)
+
+class VirtualMachine:
+
+    def __init__(self, program, output=None):
         self._program = program
+        self._output = output
         self._program_pointer = 0
         self._stack = []
+        self._frames = []
         self._heap = array('B')
+        self._strings = {}
 
     def run(self):
         while (opcode := self._next()) is not None:
             self._advance(opcode)
 
+    def run_from(self, address):
+        self._program_pointer = address
+        self._stack.clear()
+        self._frames.clear()
+        self.run()
+
+    def reset(self, program):
+        self._program = program
+        self._program_pointer = 0
+        self._stack.clear()
+        self._frames.clear()
+        del self._heap[:]
+        self._strings.clear()
+
+    def run_until_side_effect(self):
+        while (opcode := self._peek()) not in _SIDE_EFFECTS:
+            self._program_pointer += 1
+            self._advance(opcode)
+
+    def image(self):
+        return Image(
+            self._program[:],
+            self._program_pointer,
+            self._stack.copy(),
+            self._frames.copy(),
+            self._heap[:],
+            [native.name for native in NATIVES])
+
+    def restore(self, image):
+        self._program_pointer = image.program_pointer
+        self._stack = image.stack.copy()
+        self._frames = image.frames.copy()
+        self._heap = image.heap[:]
+        self._strings = {}
+
     def _advance(self, opcode):
         match opcode:
             case Opcode.PUSH:
                 value = self._next()
                 self._push(value)
             case Opcode.SET:
-                address = len(self._heap)
-                length = self._next()
-                self._heap.append(length)
-                for _ in range(length):
-                    value = self._next()
-                    self._heap.append(value)
+                self._quicken_set()
+            case Opcode.SET_CONSTANT:
+                constant = self._next()
+                self._program_pointer += len(constant.raw)
+                address = self._store_string(constant.raw, constant.string)
                 self._push(address)
             case Opcode.ADD:
                 first = self._pop()
@@ -45,26 +139,199 @@ class _VirtualMachine:
                 jump = self._next()
                 if condition != 0:
                     self._program_pointer += jump
+            case Opcode.JUMP_IF_NOT:
+                condition = self._pop()
+                jump = self._next()
+                if condition == 0:
+                    self._program_pointer += jump
+            case Opcode.CONCAT:
+                count = self._next()
+                strings = [self._get_string(self._pop()) for _ in range(count)]
+                string = ''.join(strings)
+                raw = string.encode('utf8')
+                address = self._store_string(raw, string)
+                self._push(address)
             case Opcode.PRINT:
                 address = self._pop()
-                length = self._heap[address]
-                start = address + 1
-                end = start + length
-                raw = bytes(self._heap[start:end])
-                string = raw.decode('utf8')
-                print(string)
+                string = self._get_string(address)
+                self._print(string)
             case Opcode.INTEGER_TO_STRING:
                 number = self._pop()
-                address = len(self._heap)
                 string = str(number)
                 raw = string.encode('utf8')
-                length = len(raw)
-                self._heap.append(length)
-                self._heap.extend(raw)
+                address = self._store_string(raw, string)
                 self._push(address)
+            case Opcode.CALL_NATIVE:
+                native = NATIVES[self._next()]
+                count = self._next()
+                values = self._pop_many(count)
+                arguments = map(self._unmarshal, values, native.parameters)
+                result = native.function(*arguments)
+                if native.result is not None:
+                    self._push(self._marshal(result, native))
+            case Opcode.LOAD:
+                index = self._next()
+                self._push(self._frames[-1].arguments[index])
+            case Opcode.FUNCTION:
+                address = self._next()
+                arity = self._next()
+                self._push(Function(address, arity))
+            case Opcode.CALL:
+                address = self._next()
+                count = self._next()
+                arguments = self._pop_many(count)
+                self._call(address, arguments)
+            case Opcode.APPLY:
+                count = self._next()
+                function = self._pop()
+                arguments = self._pop_many(count)
+                self._apply(function, arguments)
+            case Opcode.RETURN:
+                self._return()
+            case Opcode.RANGE:
+                count = self._pop()
+                self._push(array(ARRAY_TYPE, range(count)))
+            case Opcode.MAP_ADD:
+                addend = self._pop()
+                values = self._pop_array()
+                self._push(_map_add(addend, values))
+            case Opcode.ZIP_ADD:
+                first = self._pop_array()
+                second = self._pop_array()
+                self._push(_zip_add(first, second))
+            case Opcode.SUM:
+                values = self._pop_array()
+                self._push(sum(values))
+            case Opcode.MAP_ADD_UNCHECKED:
+                addend = self._pop()
+                values = self._pop()
+                self._push(_map_add(addend, values))
+            case Opcode.ZIP_ADD_UNCHECKED:
+                first = self._pop()
+                second = self._pop()
+                self._push(_zip_add(first, second))
+            case Opcode.SUM_UNCHECKED:
+                self._push(sum(self._pop()))
+            case Opcode.FOLD:
+                function = self._pop()
+                initial = self._pop()
+                values = self._pop_array()
+                self._push(self._fold(function, initial, values))
+            case Opcode.ZIP_WITH:
+                function = self._pop()
+                first = self._pop_array()
+                second = self._pop_array()
+                self._push(self._zip_with(function, first, second))
             case _:
                 raise ValueError(f'Unknown opcode: {opcode}')
 
+    def _step(self):
+        self._advance(self._next())
+
+    def _fold(self, function, initial, values):
+        result = initial
+        for value in values:
+            result = self._call_function(function, [result, value])
+        return result
+
+    def _zip_with(self, function, first, second):
+        _check_lengths('zip', first, second)
+        return _make_array([self._call_function(function, [x, y])
+            for x, y in zip(first, second)])
+
+    def _call_function(self, function, arguments):
+        """Apply a function value from within an instruction, running it
+        until it has returned its result."""
+        depth = len(self._frames)
+        self._apply(function, arguments)
+        self._run_frames(depth)
+        return self._pop()
+
+    def _run_frames(self, depth):
+        while len(self._frames) > depth:
+            self._step()
+
+    def _apply(self, function, arguments):
+        match function:
+            case PartialApplication(partial_function, held_arguments):
+                function = partial_function
+                arguments = [*held_arguments, *arguments]
+            case Function():
+                pass
+            case _:
+                raise ExecutionError(f'Expected a function, got: {function}')
+        arity = function.arity
+        if len(arguments) < arity:
+            self._push(PartialApplication(function, arguments))
+        else:
+            self._call(function.address, arguments[:arity], arguments[arity:])
+
+    def _call(self, address, arguments, pending=()):
+        frame = Frame(self._program_pointer, arguments, pending)
+        self._frames.append(frame)
+        self._program_pointer = address
+
+    def _return(self):
+        if not self._frames:
+            self._program_pointer = len(self._program)
+            return
+        frame = self._frames.pop()
+        self._program_pointer = frame.return_address
+        if pending := frame.pending:
+            self._apply(self._pop(), pending)
+
+    def _quicken_set(self):
+        # Rewrites the caller's program, which must therefore be a list.
+        operand_pointer = self._program_pointer
+        length = self._next()
+        start = self._program_pointer
+        raw = bytes(self._program[start:start + length])
+        constant = Constant(raw, raw.decode('utf8'))
+        self._program[operand_pointer - 1] = Opcode.SET_CONSTANT
+        self._program[operand_pointer] = constant
+        self._program_pointer = operand_pointer
+        self._advance(Opcode.SET_CONSTANT)
+
+    def _store_string(self, raw, string):
+        address = len(self._heap)
+        self._heap.extend(len(raw).to_bytes(_LENGTH_SIZE, 'little'))
+        self._heap.extend(raw)
+        self._strings[address] = string
+        return address
+
+    def _get_string(self, address):
+        string = self._strings.get(address)
+        if string is None:
+            string = self._load_string(address)
+        return string
+
+    def _load_string(self, address):
+        start = address + _LENGTH_SIZE
+        length = int.from_bytes(self._heap[address:start], 'little')
+        end = start + length
+        raw = bytes(self._heap[start:end])
+        return raw.decode('utf8')
+
+    def _unmarshal(self, value, type_):
+        if type_ is str:
+            return self._get_string(value)
+        if type_ is array:
+            return self._check_array(value)
+        return value
+
+    def _marshal(self, value, native):
+        type_ = native.result
+        if not isinstance(value, type_) or (
+                type_ is array and value.typecode != ARRAY_TYPE):
+            raise ExecutionError(f"Native '{native.name}' returned "
+                f'{value!r}, expected {type_.__name__}')
+        if type_ is str:
+            return self._store_string(value.encode('utf8'), value)
+        return value
+
+    def _print(self, string):
+        print(string, file=self._output)
+
     def _next(self):
         try:
             value = self._program[self._program_pointer]
@@ -73,8 +340,340 @@ class _VirtualMachine:
         self._program_pointer += 1
         return value
 
+    def _peek(self):
+        try:
+            return self._program[self._program_pointer]
+        except IndexError:
+            return None
+
     def _push(self, value):
         self._stack.append(value)
 
     def _pop(self):
         return self._stack.pop()
+
+    def _pop_many(self, count):
+        return [self._pop() for _ in range(count)]
+
+    def _pop_array(self):
+        return self._check_array(self._pop())
+
+    def _check_array(self, value):
+        if not isinstance(value, array):
+            raise ExecutionError(f'Expected an array, got: {value}')
+        return value
+
+class ExecutionError(Exception):
+    pass
+
+ARRAY_TYPE = 'q'
+
+def _map_add(addend, values):
+    return _make_array(map(addend.__add__, values))
+
+def _zip_add(first, second):
+    _check_lengths('add', first, second)
+    return _make_array(map(operator.add, first, second))
+
+def _check_lengths(action, first, second):
+    if len(first) != len(second):
+        raise ExecutionError(f'Cannot {action} arrays of different lengths: '
+            f'{len(first)} and {len(second)}')
+
+def _make_array(values):
+    try:
+        return array(ARRAY_TYPE, values)
+    except OverflowError:
+        raise ExecutionError('Array element out of range') from None
+
+_LENGTH_SIZE = 4
+
+# Natives are host code, so they must run when an image is resumed rather
+# than when it is taken. Folds and zips run whole functions within a single
+# instruction, so they are treated as side effects too.
+_SIDE_EFFECTS = {
+    None,
+    Opcode.PRINT,
+    Opcode.CALL_NATIVE,
+    Opcode.FOLD,
+    Opcode.ZIP_WITH,
+}
+
+@dataclass(frozen=True)
+class Function:
+    address: int
+    arity: int
+
+@dataclass(frozen=True)
+class PartialApplication:
+    function: Function
+    arguments: list
+
+@dataclass(frozen=True)
+class Frame:
+    return_address: int
+    arguments: list
+    pending: list
+
+@dataclass(frozen=True)
+class Constant:
+    raw: bytes
+    string: str
+
+class _AsyncVirtualMachine(VirtualMachine):
+
+    def __init__(self, program, sink):
+        super().__init__(program)
+        self._sink = sink
+        self._pending = []
+
+    async def run_async(self, interval):
+        import asyncio
+        countdown = interval
+        while (opcode := self._next()) is not None:
+            self._advance(opcode)
+            if self._pending:
+                await self._flush()
+            countdown -= 1
+            if countdown == 0:
+                countdown = interval
+                await asyncio.sleep(0)
+
+    def _print(self, string):
+        self._pending.append(string)
+
+    async def _flush(self):
+        pending = self._pending
+        self._pending = []
+        for string in pending:
+            await self._sink(string)
+
+class _MeasuringVirtualMachine(VirtualMachine):
+
+    def __init__(self, program, output, statistics):
+        super().__init__(program, output)
+        self._statistics = statistics
+        self._instructions = 0
+        self._peak_stack = 0
+
+    def run(self):
+        statistics = self._statistics
+        try:
+            while self._peek() is not None:
+                self._step()
+        finally:
+            statistics.instructions += self._instructions
+            statistics.peak_stack = max(
+                statistics.peak_stack, self._peak_stack)
+            statistics.peak_heap = max(statistics.peak_heap, len(self._heap))
+
+    def _step(self):
+        super()._step()
+        self._instructions += 1
+        self._peak_stack = max(self._peak_stack, len(self._stack))
+
+class _RegisterMachine(VirtualMachine):
+    """Runs programs built by the register compiler.
+
+    Each frame owns a list of registers, starting with its arguments. The
+    number of registers a function needs is the operand of the FRAME
+    instruction just before its code.
+    """
+
+    def __init__(self, program, output=None):
+        super().__init__(program, output)
+        self._registers = [None] * program[1]
+        self._program_pointer = 2
+
+    def _advance(self, opcode):
+        registers = self._registers
+        match opcode:
+            case RegisterOpcode.FRAME:
+                raise ExecutionError('Fell through into a function body')
+            case RegisterOpcode.INTEGER:
+                target = self._next()
+                registers[target] = self._next()
+            case RegisterOpcode.STRING:
+                target = self._next()
+                string = self._next()
+                raw = string.encode('utf8')
+                registers[target] = self._store_string(raw, string)
+            case RegisterOpcode.MOVE:
+                target = self._next()
+                registers[target] = registers[self._next()]
+            case RegisterOpcode.ADD:
+                target = self._next()
+                first = registers[self._next()]
+                second = registers[self._next()]
+                registers[target] = first + second
+            case RegisterOpcode.ADD_INTEGER:
+                target = self._next()
+                source = registers[self._next()]
+                registers[target] = source + self._next()
+            case RegisterOpcode.JUMP:
+                jump = self._next()
+                self._program_pointer += jump
+            case RegisterOpcode.JUMP_IF:
+                condition = registers[self._next()]
+                jump = self._next()
+                if condition != 0:
+                    self._program_pointer += jump
+            case RegisterOpcode.CONCAT:
+                target = self._next()
+                first = self._next()
+                count = self._next()
+                strings = [self._get_string(address)
+                    for address in registers[first:first + count]]
+                string = ''.join(strings)
+                raw = string.encode('utf8')
+                registers[target] = self._store_string(raw, string)
+            case RegisterOpcode.PRINT:
+                string = self._get_string(registers[self._next()])
+                self._print(string)
+            case RegisterOpcode.INTEGER_TO_STRING:
+                target = self._next()
+                string = str(registers[self._next()])
+                raw = string.encode('utf8')
+                registers[target] = self._store_string(raw, string)
+            case RegisterOpcode.CALL_NATIVE:
+                target = self._next()
+                native = NATIVES[self._next()]
+                first = self._next()
+                count = self._next()
+                values = registers[first:first + count]
+                arguments = map(self._unmarshal, values, native.parameters)
+                result = native.function(*arguments)
+                if native.result is not None:
+                    registers[target] = self._marshal(result, native)
+            case RegisterOpcode.FUNCTION:
+                target = self._next()
+                address = self._next()
+                arity = self._next()
+                registers[target] = Function(address, arity)
+            case RegisterOpcode.CALL:
+                target = self._next()
+                address = self._next()
+                first = self._next()
+                count = self._next()
+                arguments = registers[first:first + count]
+                self._call(address, arguments, target)
+            case RegisterOpcode.APPLY:
+                target = self._next()
+                function = registers[self._next()]
+                first = self._next()
+                count = self._next()
+                arguments = registers[first:first + count]
+                self._apply(function, arguments, target)
+            case RegisterOpcode.RETURN:
+                self._return(registers[self._next()])
+            case RegisterOpcode.RANGE:
+                target = self._next()
+                count = registers[self._next()]
+                registers[target] = array(ARRAY_TYPE, range(count))
+            case RegisterOpcode.MAP_ADD:
+                target = self._next()
+                addend = registers[self._next()]
+                values = self._check_array(registers[self._next()])
+                registers[target] = _map_add(addend, values)
+            case RegisterOpcode.ZIP_ADD:
+                target = self._next()
+                first = self._check_array(registers[self._next()])
+                second = self._check_array(registers[self._next()])
+                registers[target] = _zip_add(first, second)
+            case RegisterOpcode.SUM:
+                target = self._next()
+                values = self._check_array(registers[self._next()])
+                registers[target] = sum(values)
+            case RegisterOpcode.FOLD:
+                target = self._next()
+                function = registers[self._next()]
+                initial = registers[self._next()]
+                values = self._check_array(registers[self._next()])
+                registers[target] = self._fold(function, initial, values)
+            case RegisterOpcode.ZIP_WITH:
+                target = self._next()
+                function = registers[self._next()]
+                first = self._check_array(registers[self._next()])
+                second = self._check_array(registers[self._next()])
+                registers[target] = self._zip_with(function, first, second)
+            case _:
+                raise ValueError(f'Unknown opcode: {opcode}')
+
+    def _apply(self, function, arguments, target):
+        match function:
+            case PartialApplication(partial_function, held_arguments):
+                function = partial_function
+                arguments = [*held_arguments, *arguments]
+            case Function():
+                pass
+            case _:
+                raise ExecutionError(f'Expected a function, got: {function}')
+        arity = function.arity
+        if len(arguments) < arity:
+            self._registers[target] = PartialApplication(function, arguments)
+        else:
+            self._call(function.address,
+                arguments[:arity], target, arguments[arity:])
+
+    def _call_function(self, function, arguments):
+        # The result is returned into a scratch register past the frame's
+        # own, which is dropped again once it has been read.
+        registers = self._registers
+        registers.append(None)
+        depth = len(self._frames)
+        self._apply(function, arguments, len(registers) - 1)
+        self._run_frames(depth)
+        return registers.pop()
+
+    def _call(self, address, arguments, target, pending=()):
+        frame = _RegisterFrame(
+            self._program_pointer, self._registers, target, pending)
+        self._frames.append(frame)
+        size = self._program[address - 1]
+        self._registers = arguments + [None] * (size - len(arguments))
+        self._program_pointer = address
+
+    def _return(self, value):
+        if not self._frames:
+            self._program_pointer = len(self._program)
+            return
+        frame = self._frames.pop()
+        self._program_pointer = frame.return_address
+        self._registers = frame.registers
+        if pending := frame.pending:
+            self._apply(value, pending, frame.target)
+        else:
+            self._registers[frame.target] = value
+
+@dataclass(frozen=True)
+class _RegisterFrame:
+    return_address: int
+    registers: list
+    target: int
+    pending: list
+
+class _MeasuringRegisterMachine(_RegisterMachine):
+
+    def __init__(self, program, output, statistics):
+        super().__init__(program, output)
+        self._statistics = statistics
+        self._instructions = 0
+        self._peak_registers = 0
+
+    def run(self):
+        statistics = self._statistics
+        try:
+            while self._peek() is not None:
+                self._step()
+        finally:
+            statistics.instructions += self._instructions
+            statistics.peak_stack = max(
+                statistics.peak_stack, self._peak_registers)
+            statistics.peak_heap = max(statistics.peak_heap, len(self._heap))
+
+    def _step(self):
+        super()._step()
+        self._instructions += 1
+        registers = len(self._registers) + sum(
+            len(frame.registers) for frame in self._frames)
+        self._peak_registers = max(self._peak_registers, registers)
@@ -0,0 +1,112 @@
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields, asdict, is_dataclass
+import time
+
+from .opcodes import Opcode, RegisterOpcode, decode
+from .engines import get_engine
+from .compiler import BUILTINS
+from .analyser import analyse
+from .modules import load_module
+from .parser import parse
+from .tokeniser import tokenise
+
+
+@dataclass
+class Statistics:
+    stage_seconds: dict[str, float] = field(default_factory=dict)
+    tokens: int | None = 0
+    syntax_nodes: int | None = 0
+    analysed_nodes: int = 0
+    program_length: int = 0
+    constants: int = 0
+    constant_bytes: int = 0
+    instructions: int = 0
+    peak_stack: int = 0
+    peak_heap: int = 0
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds[name] = time.perf_counter() - start
+
+def measure_file(path, output=None, engine='stack', cache=None):
+    """Run a file and the modules it imports, measuring each stage.
+
+    Loading reads, tokenises, parses and analyses every module that is not
+    in the cache as a single stage, so tokens and syntax nodes are not
+    counted.
+    """
+    statistics = Statistics(tokens=None, syntax_nodes=None)
+    with statistics.stage('load'):
+        module = load_module(path, cache)
+    return _measure_module(module, output, engine, statistics)
+
+def measure_source(source, output=None, engine='stack'):
+    statistics = Statistics()
+    with statistics.stage('tokenise'):
+        tokens = list(tokenise(source))
+    statistics.tokens = len(tokens)
+    with statistics.stage('parse'):
+        syntax = parse(iter(tokens))
+    statistics.syntax_nodes = count_nodes(syntax)
+    with statistics.stage('analyse'):
+        module = analyse(syntax, BUILTINS)
+    return _measure_module(module, output, engine, statistics)
+
+def _measure_module(module, output, engine, statistics):
+    engine = get_engine(engine)
+    statistics.analysed_nodes = count_nodes(module)
+    with statistics.stage('compile'):
+        program = engine.compile(module)
+    statistics.program_length = len(program)
+    _count_constants(program, statistics)
+    with statistics.stage('execute'):
+        engine.execute(program, output, statistics)
+    return statistics
+
+def count_nodes(node):
+    count = 0
+    pending = [node]
+    while pending:
+        match pending.pop():
+            case list() as items:
+                pending.extend(items)
+            case dict() as mapping:
+                pending.extend(mapping.values())
+            case value if is_dataclass(value):
+                count += 1
+                pending.extend(getattr(value, field_.name)
+                    for field_ in fields(value))
+    return count
+
+def _count_constants(program, statistics):
+    for _, opcode, operands in decode(program):
+        match opcode, operands:
+            case Opcode.SET, [length, *_]:
+                statistics.constants += 1
+                statistics.constant_bytes += length
+            case RegisterOpcode.STRING, [_, string]:
+                statistics.constants += 1
+                statistics.constant_bytes += len(string.encode('utf8'))
+
+def format_statistics(statistics, format_):
+    match format_:
+        case 'json':
+            import json
+            return json.dumps(asdict(statistics), indent=4)
+        case 'text':
+            return '\n'.join(_format_text(statistics))
+        case _:
+            raise ValueError(f'Unknown statistics format: {format_}')
+
+def _format_text(statistics):
+    for stage, seconds in statistics.stage_seconds.items():
+        yield f'{stage + " time":<20}{seconds * 1000:>12.3f} ms'
+    for field_ in fields(statistics)[1:]:
+        if (value := getattr(statistics, field_.name)) is None:
+            continue
+        name = field_.name.replace('_', ' ')
+        yield f'{name:<20}{value:>12}'
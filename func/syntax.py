@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass
 class Module:
     bindings: list[Binding]
+    imports: list[str] = field(default_factory=list)
 
 @dataclass
 class Binding:
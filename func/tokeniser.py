@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import re
+import sys
 from enum import Enum
 
 from .tokens import (
@@ -24,8 +25,14 @@ def _tokenise_with(source):
                 raise TokeniseError(f'Unexpected character: {value!r}')
             case _RawTokenKind.IGNORED:
                 continue
-            case _RawTokenKind.IDENTIFIER if kind := _KEYWORDS.get(value):
-                yield ConstantToken(kind)
+            case _RawTokenKind.IDENTIFIER:
+                # Interned names are shared by every later stage, so that
+                # looking them up compares them by identity.
+                value = sys.intern(value)
+                if kind := _KEYWORDS.get(value):
+                    yield ConstantToken(kind)
+                else:
+                    yield ValueToken(ValueTokenKind.IDENTIFIER, value)
             case _:
                 kind_name = raw_kind.name
                 yield _make_token(kind_name, value)
@@ -45,6 +52,7 @@ _KEYWORDS = {
     'if': ConstantTokenKind.IF,
     'then': ConstantTokenKind.THEN,
     'else': ConstantTokenKind.ELSE,
+    'import': ConstantTokenKind.IMPORT,
 }
 
 class TokeniseError(Exception):
@@ -102,7 +110,7 @@ def _tokenise_until_brackets_balanced(source):
             case ConstantTokenKind.OPEN_BRACKET:
                 bracket_depth += 1
             case ConstantTokenKind.CLOSE_BRACKET:
-                if bracket_depth <= 1:
+                if bracket_depth == 0:
                     break
                 bracket_depth -= 1
         yield token
@@ -17,6 +17,7 @@ class ConstantTokenKind(Enum):
     IF = auto()
     THEN = auto()
     ELSE = auto()
+    IMPORT = auto()
     STRING_DELIMITER = auto()
     STRING_EXPRESSION_ESCAPE_START = auto()
     STRING_EXPRESSION_ESCAPE_END = auto()
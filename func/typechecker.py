@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from .analysed import *
+
+
+def check_types(module, builtins):
+    """Infer a type for every binding of a module.
+
+    Bindings are generalised, so a binding such as 'identity = \\x -> x' can
+    be used at different types. Builtins must carry their types. Ill-typed
+    modules raise TypeCheckError.
+    """
+    checker = _Checker(module.bindings, builtins)
+    return {name: checker.infer_binding(name) for name in module.bindings}
+
+class TypeEnvironment:
+    """The types of bindings defined one at a time, as in the REPL.
+
+    Redefining a binding checks the bindings that use it again. A definition
+    that would leave any binding ill-typed raises TypeCheckError and leaves
+    the environment as it was.
+    """
+
+    def __init__(self, builtins):
+        self._checker = _Checker({}, builtins)
+        self._users = {}
+
+    def define(self, name, value):
+        checker = self._checker
+        stale = self._find_users(name)
+        previous = checker.bindings.get(name)
+        schemes = {stale_name: checker.schemes.pop(stale_name)
+            for stale_name in stale if stale_name in checker.schemes}
+        checker.bindings[name] = value
+        try:
+            for stale_name in stale:
+                checker.infer_binding(stale_name)
+        except TypeCheckError:
+            if previous is None:
+                del checker.bindings[name]
+            else:
+                checker.bindings[name] = previous
+            for stale_name in stale:
+                checker.schemes.pop(stale_name, None)
+            checker.schemes.update(schemes)
+            raise
+        for used in _find_references(value):
+            self._users.setdefault(used, set()).add(name)
+
+    def check_expression(self, expression):
+        """Infer the type of an expression that uses the bindings defined so
+        far."""
+        return self._checker.infer_expression(expression)
+
+    def _find_users(self, name):
+        found = [name]
+        for found_name in found:
+            found.extend(user for user in self._users.get(found_name, ())
+                if user not in found)
+        return found
+
+class TypeCheckError(Exception):
+    pass
+
+class Type:
+
+    def __str__(self):
+        return format_type(self)
+
+@dataclass(frozen=True, eq=False)
+class BasicType(Type):
+    name: str
+
+INTEGER = BasicType('Integer')
+STRING = BasicType('String')
+ARRAY = BasicType('Array')
+# The type of builtins that return nothing, such as print. No other builtin
+# accepts it.
+NOTHING = BasicType('Nothing')
+
+@dataclass(frozen=True)
+class FunctionType(Type):
+    parameter: Type
+    result: Type
+
+@dataclass(eq=False)
+class TypeVariable(Type):
+    instance: Type | None = None
+
+@dataclass(frozen=True)
+class Scheme:
+    variables: tuple[TypeVariable, ...]
+    type: Type
+
+    def __str__(self):
+        return format_type(self.type)
+
+def function_type(*types):
+    """Return the curried type of a function from all but the last type to
+    the last."""
+    *parameters, result = types
+    for parameter in reversed(parameters):
+        result = FunctionType(parameter, result)
+    return result
+
+def format_type(type_, names=None):
+    names = {} if names is None else names
+    match _resolve(type_):
+        case BasicType(name):
+            return name
+        case FunctionType(parameter, result):
+            parameter_text = format_type(parameter, names)
+            if isinstance(_resolve(parameter), FunctionType):
+                parameter_text = f'({parameter_text})'
+            return f'{parameter_text} -> {format_type(result, names)}'
+        case TypeVariable() as variable:
+            if variable not in names:
+                names[variable] = _variable_name(len(names))
+            return names[variable]
+
+def _variable_name(index):
+    letter = chr(ord('a') + index % 26)
+    return letter if index < 26 else f'{letter}{index // 26}'
+
+def _resolve(type_):
+    while isinstance(type_, TypeVariable) and type_.instance is not None:
+        type_ = type_.instance
+    return type_
+
+class _Checker:
+
+    def __init__(self, bindings, builtins):
+        self.bindings = bindings
+        self.schemes = {name: Scheme((), builtin.type)
+            for name, builtin in builtins.items()}
+        # Bindings being inferred have a monomorphic type until they are
+        # finished, so that they can refer to each other.
+        self._pending = {}
+        self._binding = None
+
+    def infer_binding(self, name):
+        if (scheme := self.schemes.get(name)) is not None:
+            return scheme
+        if (type_ := self._pending.get(name)) is not None:
+            return Scheme((), type_)
+        type_ = TypeVariable()
+        self._pending[name] = type_
+        outer_binding, self._binding = self._binding, name
+        try:
+            self._unify(type_, self._infer(self.bindings[name], {}))
+        finally:
+            self._binding = outer_binding
+            del self._pending[name]
+        scheme = self._generalise(type_)
+        if not self._pending or not self._depends_on_pending(type_):
+            self.schemes[name] = scheme
+        return scheme
+
+    def infer_expression(self, expression):
+        return self._infer(expression, {})
+
+    def _infer(self, expression, environment):
+        # Calls and references are the most common nodes, so they are
+        # matched first.
+        match expression:
+            case Call(callable_, argument):
+                return self._infer_call(callable_, argument, environment)
+            case Reference(name):
+                return self._instantiate(self.infer_binding(name))
+            case Parameter(name):
+                return environment[name]
+            case Integer():
+                return INTEGER
+            case String(parts):
+                for part in parts:
+                    if isinstance(part, Expression):
+                        self._unify(STRING, self._infer(part, environment))
+                return STRING
+            case Lambda(parameter, body):
+                parameter_type = TypeVariable()
+                body_type = self._infer(
+                    body, {**environment, parameter: parameter_type})
+                return FunctionType(parameter_type, body_type)
+            case IfElse(condition, true, false):
+                self._unify(INTEGER, self._infer(condition, environment))
+                true_type = self._infer(true, environment)
+                self._unify(true_type, self._infer(false, environment))
+                return true_type
+            case _:
+                raise TypeError(f'Unknown expression: {expression}')
+
+    def _infer_call(self, callable_, argument, environment):
+        callable_type = self._infer(callable_, environment)
+        if isinstance(basic := _resolve(callable_type), BasicType):
+            raise self._error(f'{basic} is not a function')
+        argument_type = self._infer(argument, environment)
+        if isinstance(function := _resolve(callable_type), FunctionType):
+            # Unifying the parameter on its own gives a clearer error.
+            self._unify(function.parameter, argument_type)
+            return function.result
+        result_type = TypeVariable()
+        self._unify(callable_type, FunctionType(argument_type, result_type))
+        return result_type
+
+    def _unify(self, expected, actual):
+        if expected is actual:
+            return
+        pending = [(expected, actual)]
+        while pending:
+            first, second = map(_resolve, pending.pop())
+            if first is second:
+                continue
+            match first, second:
+                case TypeVariable(), _:
+                    self._bind(first, second)
+                case _, TypeVariable():
+                    self._bind(second, first)
+                case FunctionType(), FunctionType():
+                    pending.append((first.result, second.result))
+                    pending.append((first.parameter, second.parameter))
+                case _:
+                    names = {}
+                    raise self._error(
+                        f'expected {format_type(expected, names)}, '
+                        f'got {format_type(actual, names)}')
+
+    def _bind(self, variable, type_):
+        if self._occurs(variable, type_):
+            names = {}
+            variable_name = format_type(variable, names)
+            raise self._error('cannot construct the infinite type '
+                f'{variable_name} = {format_type(type_, names)}')
+        variable.instance = type_
+
+    def _occurs(self, variable, type_):
+        pending = [type_]
+        while pending:
+            match _resolve(pending.pop()):
+                case TypeVariable() as other if other is variable:
+                    return True
+                case FunctionType(parameter, result):
+                    pending.extend((parameter, result))
+        return False
+
+    def _generalise(self, type_):
+        if not self._pending:
+            return Scheme(tuple(_free_variables(type_)), type_)
+        pending = set()
+        for pending_type in self._pending.values():
+            pending |= _free_variables(pending_type)
+        variables = [variable for variable in _free_variables(type_)
+            if variable not in pending]
+        return Scheme(tuple(variables), type_)
+
+    def _depends_on_pending(self, type_):
+        return any(_free_variables(pending_type) & _free_variables(type_)
+            for pending_type in self._pending.values())
+
+    def _instantiate(self, scheme):
+        if not scheme.variables:
+            return scheme.type
+        fresh = {variable: TypeVariable() for variable in scheme.variables}
+        return _substitute(scheme.type, fresh)
+
+    def _error(self, message):
+        if self._binding is None:
+            return TypeCheckError(f'Type error: {message}')
+        return TypeCheckError(f"Type error in '{self._binding}': {message}")
+
+def _find_references(expression):
+    found = set()
+    pending = [expression]
+    while pending:
+        match pending.pop():
+            case Reference(name):
+                found.add(name)
+            case Call(callable_, argument):
+                pending.extend((callable_, argument))
+            case Lambda(_, body):
+                pending.append(body)
+            case IfElse(condition, true, false):
+                pending.extend((condition, true, false))
+            case String(parts):
+                pending.extend(part for part in parts
+                    if isinstance(part, Expression))
+    return found
+
+def _free_variables(type_):
+    found = set()
+    pending = [type_]
+    while pending:
+        match _resolve(pending.pop()):
+            case TypeVariable() as variable:
+                found.add(variable)
+            case FunctionType(parameter, result):
+                pending.extend((parameter, result))
+    return found
+
+def _substitute(type_, substitution):
+    match _resolve(type_):
+        case TypeVariable() as variable:
+            return substitution.get(variable, variable)
+        case FunctionType(parameter, result):
+            return FunctionType(_substitute(parameter, substitution),
+                _substitute(result, substitution))
+        case basic:
+            return basic
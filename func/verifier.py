@@ -0,0 +1,208 @@
+from dataclasses import dataclass
+
+from .natives import NATIVES
+from .opcodes import Opcode, decode
+
+
+def verify(program):
+    """Check a stack program before it runs.
+
+    Every instruction must be complete, every jump must land on an
+    instruction, and every path through a function must keep the stack
+    balanced, returning exactly one value. The result holds the deepest the
+    stack can grow, or None if calls can recurse and there is no bound.
+    """
+    instructions = _decode(program)
+    arities, values = _find_functions(instructions)
+    functions = {address: _verify_function(instructions, address, arity)
+        for address, arity in arities.items()}
+    max_stack_depth = _bound_stack_depth(functions, values)
+    return Verification(max_stack_depth)
+
+@dataclass(frozen=True)
+class Verification:
+    max_stack_depth: int | None
+
+class VerificationError(Exception):
+    pass
+
+@dataclass
+class _Instruction:
+    opcode: Opcode
+    operands: list
+    next_address: int
+
+@dataclass
+class _Function:
+    max_depth: int
+    calls: list[tuple[int, int | None]]
+
+class _Instructions(dict):
+
+    def __init__(self, end):
+        super().__init__()
+        self.end = end
+
+def _decode(program):
+    instructions = _Instructions(len(program))
+    try:
+        for address, opcode, operands in decode(program):
+            next_address = address + 1 + len(operands)
+            instructions[address] = _Instruction(
+                opcode, operands, next_address)
+    except (TypeError, ValueError) as error:
+        raise VerificationError(str(error)) from None
+    return instructions
+
+def _find_functions(instructions):
+    # The main program is entered at zero with no arguments.
+    arities = {0: None}
+    values = set()
+    for instruction in instructions.values():
+        match instruction.opcode, instruction.operands:
+            case (Opcode.FUNCTION | Opcode.CALL) as opcode, [address, arity]:
+                if address not in instructions:
+                    raise VerificationError(
+                        f'Function address is not an instruction: {address}')
+                if arities.setdefault(address, arity) != arity:
+                    raise VerificationError(
+                        f'Inconsistent arity for function at {address}')
+                if opcode is Opcode.FUNCTION:
+                    values.add(address)
+    return arities, values
+
+def _verify_function(instructions, entry, arity):
+    depths = {entry: 0}
+    pending = [entry]
+    max_depth = 0
+    calls = []
+    while pending:
+        address = pending.pop()
+        depth = depths[address]
+        if (instruction := instructions.get(address)) is None:
+            if arity is None and address == instructions.end:
+                # The main program may finish by running off the end.
+                continue
+            raise VerificationError(
+                f'Function at {entry} runs off the end of the program')
+        popped, pushed = _stack_effect(instruction, address, arity)
+        if depth < popped:
+            raise VerificationError(f'Stack underflow at {address}')
+        depth -= popped
+        match instruction.opcode:
+            case Opcode.CALL:
+                calls.append((depth, instruction.operands[0]))
+            case Opcode.APPLY | Opcode.FOLD | Opcode.ZIP_WITH:
+                calls.append((depth, None))
+            case Opcode.RETURN:
+                if arity is not None and depth != 1:
+                    raise VerificationError(f'Function at {entry} returns '
+                        f'{depth} values at {address}, not one')
+                continue
+        depth += pushed
+        max_depth = max(max_depth, depth)
+        for successor in _successors(instruction, address, instructions):
+            if (known := depths.get(successor)) is None:
+                depths[successor] = depth
+                pending.append(successor)
+            elif known != depth:
+                raise VerificationError(f'Stack depths {known} and {depth} '
+                    f'meet at {successor}')
+    return _Function(max_depth, calls)
+
+def _stack_effect(instruction, address, arity):
+    operands = instruction.operands
+    match instruction.opcode:
+        case Opcode.LOAD:
+            index, = operands
+            if arity is None or not 0 <= index < arity:
+                raise VerificationError(
+                    f'Argument index out of range at {address}: {index}')
+            return 0, 1
+        case Opcode.CONCAT:
+            count, = operands
+            return count, 1
+        case Opcode.CALL_NATIVE:
+            index, count = operands
+            if not 0 <= index < len(NATIVES):
+                raise VerificationError(
+                    f'Unknown native at {address}: {index}')
+            return count, int(NATIVES[index].result is not None)
+        case Opcode.CALL:
+            _, count = operands
+            return count, 1
+        case Opcode.APPLY:
+            count, = operands
+            return count + 1, 1
+        case opcode:
+            return _STACK_EFFECTS[opcode]
+
+_STACK_EFFECTS = {
+    Opcode.PUSH: (0, 1),
+    Opcode.SET: (0, 1),
+    Opcode.SET_CONSTANT: (0, 1),
+    Opcode.PRINT: (1, 0),
+    Opcode.ADD: (2, 1),
+    Opcode.JUMP: (0, 0),
+    Opcode.JUMP_IF: (1, 0),
+    Opcode.INTEGER_TO_STRING: (1, 1),
+    Opcode.FUNCTION: (0, 1),
+    Opcode.RETURN: (0, 0),
+    Opcode.RANGE: (1, 1),
+    Opcode.MAP_ADD: (2, 1),
+    Opcode.ZIP_ADD: (2, 1),
+    Opcode.SUM: (1, 1),
+    Opcode.MAP_ADD_UNCHECKED: (2, 1),
+    Opcode.ZIP_ADD_UNCHECKED: (2, 1),
+    Opcode.SUM_UNCHECKED: (1, 1),
+    Opcode.JUMP_IF_NOT: (1, 0),
+    Opcode.FOLD: (3, 1),
+    Opcode.ZIP_WITH: (3, 1),
+}
+
+def _successors(instruction, address, instructions):
+    next_address = instruction.next_address
+    match instruction.opcode:
+        case Opcode.JUMP:
+            return [_jump_target(instruction, address, instructions)]
+        case Opcode.JUMP_IF | Opcode.JUMP_IF_NOT:
+            target = _jump_target(instruction, address, instructions)
+            return [next_address, target]
+        case _:
+            return [next_address]
+
+def _jump_target(instruction, address, instructions):
+    target = instruction.next_address + instruction.operands[-1]
+    # Jumping to the end of the program finishes it.
+    if target not in instructions and target != instructions.end:
+        raise VerificationError(
+            f'Jump at {address} does not land on an instruction: {target}')
+    return target
+
+def _bound_stack_depth(functions, values):
+    """Find the deepest stack over all chains of calls from main.
+
+    Applying a function value is assumed to reach any function that is ever
+    used as a value. Any cycle in the resulting call graph leaves the depth
+    unbounded.
+    """
+    bounds = {}
+    active = set()
+    def bound(address):
+        if address in bounds:
+            return bounds[address]
+        if address in active:
+            return None
+        active.add(address)
+        function = functions[address]
+        deepest = function.max_depth
+        for depth, target in function.calls:
+            for callee in values if target is None else [target]:
+                if (callee_bound := bound(callee)) is None:
+                    active.discard(address)
+                    return None
+                deepest = max(deepest, depth + callee_bound)
+        active.discard(address)
+        bounds[address] = deepest
+        return deepest
+    return bound(0)
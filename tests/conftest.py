@@ -1,6 +1,9 @@
 import pytest
 import unittest.mock
 
+from func.compiler import BUILTINS
+from func.natives import NATIVES
+
 
 @pytest.fixture
 def mocker():
@@ -8,6 +11,14 @@ def mocker():
     yield mocker
     mocker.close()
 
+@pytest.fixture
+def isolated_natives():
+    """Let a test register natives, removing them when it finishes."""
+    count = len(NATIVES)
+    with unittest.mock.patch.dict(BUILTINS):
+        yield
+    del NATIVES[count:]
+
 class _Mocker:
 
     def __init__(self):
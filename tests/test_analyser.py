@@ -106,3 +106,39 @@ def test_unbound_name(source, name):
     syntax = _get_syntax(source)
     with pytest.raises(AnalysisError, match=f"Unbound name: '{name}'"):
         analyse(syntax)
+
+def test_identical_subexpressions_are_shared():
+    syntax = _get_syntax('''\
+main = add (add 1 2) (add 1 2)
+other = add 1 2
+first = λx -> '\\(x)!'
+second = λx -> '\\(x)!'
+third = λy -> '\\(y)!'\
+''')
+    bindings = analyse(syntax, ['add']).bindings
+    main = bindings['main']
+    assert main.argument is main.callable_.argument is bindings['other']
+    assert bindings['first'] is bindings['second']
+    assert bindings['first'] is not bindings['third']
+    assert bindings['third'] == Lambda('y', String([Parameter('y'), '!']))
+
+def test_different_subexpressions_are_not_shared():
+    syntax = _get_syntax("a = 1\nb = '1'\nc = x\nd = λx -> x\nx = 2")
+    bindings = analyse(syntax).bindings
+    assert len({id(value) for value in bindings.values()}) == 5
+
+def test_open_subexpressions_are_not_shared():
+    syntax = _get_syntax('first = λx -> λy -> add x y\n'
+        'second = λy -> λx -> add x y')
+    bindings = analyse(syntax, ['add']).bindings
+    first = bindings['first'].body.body
+    second = bindings['second'].body.body
+    assert first == second
+    assert first is not second
+    assert first.callable_.callable_ is second.callable_.callable_
+
+def test_shadowed_parameters():
+    syntax = _get_syntax('f = λx -> λx -> x\ng = λy -> λx -> x')
+    bindings = analyse(syntax).bindings
+    assert bindings['f'] == Lambda('x', Lambda('x', Parameter('x')))
+    assert bindings['f'].body is bindings['g'].body
@@ -0,0 +1,55 @@
+import pytest
+
+import func.batch
+from func.analyser import AnalysisError
+from func.batch import execute_many, run_files, Batch
+from func.tokeniser import TokeniseError
+
+
+def test_execute_many():
+    sources = [
+        "main = print 'Hello'",
+        'main = print (integer_to_string (add 40 2))',
+        "main = print if 0 then 'Yes' else 'No'",
+    ] * 5
+    results = execute_many(sources, workers=2)
+    outputs = [result.output for result in results]
+    assert outputs == ['Hello\n', '42\n', 'No\n'] * 5
+    assert all(result.error is None for result in results)
+
+@pytest.mark.parametrize('source, error_type', [
+    ('main = print name', AnalysisError),
+    ('main = !', TokeniseError),
+])
+def test_execute_many_captures_errors(source, error_type):
+    [result] = execute_many([source], workers=1)
+    assert result.output == ''
+    assert isinstance(result.error, error_type)
+
+def test_run_files():
+    paths = [
+        'examples/the_answer.func',
+        'examples/missing.func',
+        'examples/hello_world.func',
+    ]
+    first, missing, last = run_files(paths, workers=2)
+    assert first.output == '42\n'
+    assert isinstance(missing.error, FileNotFoundError)
+    assert last.output == 'Hello, world!\n'
+
+def test_batch_is_reused():
+    sources = ["main = print 'Hello'"] * 3
+    with Batch(workers=2) as batch:
+        first = batch.execute_many(sources)
+        second = batch.execute_many(sources)
+        files = batch.run_files(['examples/the_answer.func'])
+    assert [result.output for result in first + second] == ['Hello\n'] * 6
+    assert files[0].output == '42\n'
+    with pytest.raises(RuntimeError):
+        batch.execute_many(sources)
+
+def test_module_functions_share_a_batch():
+    execute_many(["main = print 'Hello'"], workers=1)
+    batch = func.batch._SHARED_BATCHES[1]
+    run_files(['examples/the_answer.func'], workers=1)
+    assert func.batch._SHARED_BATCHES[1] is batch
@@ -0,0 +1,84 @@
+from io import StringIO
+
+import pytest
+
+import func
+from benchmarks.__main__ import (
+    compare,
+    measure_stages,
+    run_benchmarks,
+    STAGES,
+)
+from benchmarks.generators import GENERATORS
+from benchmarks.stress import check, fit_exponent, measure
+
+
+@pytest.mark.parametrize('name, size, expected_output', [
+    ('many_bindings', 5, '5\n'),
+    ('deep_nesting', 5, '5\n'),
+    ('long_strings', 300, 'abcdefghij' * 60 + '\n'),
+    ('long_application_chains', 5, '7\n'),
+    ('many_literals', 3, 'literal 0literal 1literal 2\n'),
+])
+def test_generated_programs_run(name, size, expected_output):
+    source = GENERATORS[name](size)
+    output = StringIO()
+    func.run_source(source, output)
+    assert output.getvalue() == expected_output
+
+def test_measure_stages():
+    timings = measure_stages("main = print 'Hi'", repeat=2)
+    assert list(timings) == STAGES
+    assert all(seconds >= 0 for seconds in timings.values())
+
+def test_compare():
+    baseline = {'benchmarks': {'a': {'parse': 0.010, 'execute': 0.010}}}
+    results = {'benchmarks': {
+        'a': {'parse': 0.011, 'execute': 0.020},
+        'b': {'parse': 1.0},
+    }}
+    regressions = compare(results, baseline, tolerance=0.5)
+    assert regressions == [('a', 'execute', 0.010, 0.020)]
+
+def test_compare_calibrated():
+    baseline = {'calibration': 0.001,
+        'benchmarks': {'a': {'parse': 0.010, 'execute': 0.010}}}
+    results = {'calibration': 0.002,
+        'benchmarks': {'a': {'parse': 0.025, 'execute': 0.035}}}
+    regressions = compare(results, baseline, tolerance=0.5)
+    assert regressions == [('a', 'execute', 0.020, 0.035)]
+
+def test_run_named_benchmarks():
+    results = run_benchmarks(1, {'deep_nesting[10]'})
+    assert list(results['benchmarks']) == ['deep_nesting[10]']
+    assert results['calibration'] > 0
+
+@pytest.mark.parametrize('values, expected', [
+    ([3, 6, 12, 24], 1),
+    ([1, 4, 16, 64], 2),
+    ([5, 5, 5, 5], 0),
+])
+def test_fit_exponent(values, expected):
+    assert fit_exponent([1, 2, 4, 8], values) == pytest.approx(expected)
+
+def test_check():
+    exponents = {
+        ('a', 'parse', 'time'): 1.2,
+        ('a', 'compile', 'time'): 1.4,
+        ('b', 'compile', 'time'): 1.9,
+        ('b', 'compile', 'memory'): 2.5,
+    }
+    bounds = {
+        ('b', 'compile', 'time'): 2.0,
+    }
+    violations = check(exponents, bounds, slack=0.3)
+    assert violations == [
+        ('a', 'compile', 'time', 1.0, 1.4),
+        ('b', 'compile', 'memory', 1.0, 2.5),
+    ]
+
+def test_stress_measure():
+    source = GENERATORS['many_literals'](3)
+    measurement = measure(source, repeat=1)
+    assert list(measurement) == STAGES
+    assert all(measurement[stage]['memory'] > 0 for stage in STAGES)
@@ -0,0 +1,110 @@
+from io import StringIO
+
+import pytest
+
+import func
+from func.analyser import analyse
+from func.branches import (
+    BranchProfile,
+    load_branch_profile,
+    save_branch_profile,
+)
+from func.compiler import BUILTINS, compile_, compile_with_branches
+from func.opcodes import Opcode, decode
+from func.parser import parse
+from func.profiler import record_branches, record_branches_file
+from func.tokeniser import tokenise
+from func.verifier import verify
+
+
+_SOURCE = ("main = print (pick 0 (pick 1 (pick 0 (describe 2))))\n"
+    "pick = \\flag -> \\s -> if flag then '\\(s)!' else '\\(s)?'\n"
+    "describe = \\n -> if n then (if add n 0 then 'many' else 'one') "
+    "else 'none'")
+
+def _analyse(source):
+    return analyse(parse(tokenise(source)), BUILTINS)
+
+def _run(program):
+    output = StringIO()
+    func.execute(program, output)
+    return output.getvalue()
+
+def test_compile_with_branches():
+    program, branches = compile_with_branches(_analyse(_SOURCE))
+    assert sorted(branches.values()) == ['describe:0', 'describe:1', 'pick:0']
+    for address, key in branches.items():
+        assert Opcode(program[address]) == Opcode.JUMP_IF
+
+def test_record_branches():
+    program, branches = compile_with_branches(_analyse(_SOURCE))
+    output = StringIO()
+    profile = record_branches(program, branches, output)
+    assert output.getvalue() == 'many?!?\n'
+    assert profile.counts == {
+        'describe:0': [1, 0],
+        'describe:1': [1, 0],
+        'pick:0': [1, 2],
+    }
+
+@pytest.mark.parametrize('counts', [
+    {},
+    {'pick:0': [1, 2], 'describe:0': [1, 0], 'describe:1': [1, 0]},
+    {'pick:0': [2, 1], 'describe:0': [0, 1], 'describe:1': [0, 1]},
+    {'pick:0': [1, 1], 'describe:0': [1, 0]},
+])
+def test_laid_out_programs_run_unchanged(counts):
+    module = _analyse(_SOURCE)
+    program = compile_(module, BranchProfile(counts))
+    verify(program)
+    assert _run(program) == _run(compile_(module)) == 'many?!?\n'
+
+def test_cold_branches_follow_return():
+    module = _analyse(
+        "main = print (if add 0 1 then 'hot' else 'cold')")
+    profile = BranchProfile({'main:0': [5, 0]})
+    instructions = list(decode(compile_(module, profile)))
+    opcodes = [opcode for _, opcode, _ in instructions]
+    assert opcodes == [
+        Opcode.PUSH,
+        Opcode.PUSH,
+        Opcode.ADD,
+        Opcode.JUMP_IF_NOT,
+        Opcode.SET,
+        Opcode.PRINT,
+        Opcode.PUSH,
+        Opcode.RETURN,
+        Opcode.SET,
+        Opcode.JUMP,
+    ]
+    assert _run(compile_(module, profile)) == 'hot\n'
+    assert _run(compile_(module, BranchProfile({'main:0': [0, 5]}))) == 'hot\n'
+
+def test_prefers_true():
+    profile = BranchProfile({'a:0': [3, 1], 'a:1': [1, 3], 'a:2': [2, 2]})
+    assert profile.prefers_true('a:0') is True
+    assert profile.prefers_true('a:1') is False
+    assert profile.prefers_true('a:2') is None
+    assert profile.prefers_true('b:0') is None
+
+def test_save_and_load_branch_profile(tmp_path):
+    path = tmp_path / 'branches.json'
+    profile = BranchProfile({'main:0': [3, 1]})
+    save_branch_profile(profile, path)
+    assert load_branch_profile(path) == profile
+
+def test_record_and_use_branch_profile(tmp_path, capsys):
+    path = tmp_path / 'main.func'
+    path.write_text(_SOURCE)
+    profile_path = tmp_path / 'branches.json'
+    record_branches_file(path, profile_path)
+    assert load_branch_profile(profile_path).counts['pick:0'] == [1, 2]
+    func.run_file(path, branch_profile=load_branch_profile(profile_path))
+    assert capsys.readouterr().out == 'many?!?\n' * 2
+
+def test_branch_profile_requires_stack_engine(tmp_path):
+    path = tmp_path / 'main.func'
+    path.write_text(_SOURCE)
+    with pytest.raises(ValueError):
+        func.compile_file(path, engine='register',
+            branch_profile=BranchProfile())
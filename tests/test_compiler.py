@@ -33,6 +33,8 @@ from func.analysed import *
             Opcode.ADD,
             Opcode.INTEGER_TO_STRING,
             Opcode.PRINT,
+            Opcode.PUSH,
+            0,
         ]
     ),
     (
@@ -59,6 +61,8 @@ from func.analysed import *
             Opcode.ADD,
             Opcode.INTEGER_TO_STRING,
             Opcode.PRINT,
+            Opcode.PUSH,
+            0,
         ]
     ),
     (
@@ -70,6 +74,8 @@ from func.analysed import *
             4,
             *b'FUNC',
             Opcode.PRINT,
+            Opcode.PUSH,
+            0,
         ]
     ),
     (
@@ -80,6 +86,8 @@ from func.analysed import *
             Opcode.SET,
             0,
             Opcode.PRINT,
+            Opcode.PUSH,
+            0,
         ]
     ),
     (
@@ -137,11 +145,78 @@ from func.analysed import *
         [
             Opcode.PUSH,
             3,
+            Opcode.CALL,
+            10,
+            1,
+            Opcode.INTEGER_TO_STRING,
+            Opcode.PRINT,
+            Opcode.PUSH,
+            0,
+            Opcode.RETURN,
             Opcode.PUSH,
             10,
+            Opcode.LOAD,
+            0,
             Opcode.ADD,
-            Opcode.INTEGER_TO_STRING,
+            Opcode.RETURN,
+        ]
+    ),
+    (
+        Module({
+            'main': Call(Reference('apply'),
+                Call(Reference('add'), Integer(1))),
+            'apply': Lambda('f', Call(Parameter('f'), Integer(2))),
+        }),
+        [
+            Opcode.PUSH,
+            1,
+            Opcode.FUNCTION,
+            11,
+            2,
+            Opcode.APPLY,
+            1,
+            Opcode.CALL,
+            17,
+            1,
+            Opcode.RETURN,
+            Opcode.LOAD,
+            1,
+            Opcode.LOAD,
+            0,
+            Opcode.ADD,
+            Opcode.RETURN,
+            Opcode.PUSH,
+            2,
+            Opcode.LOAD,
+            0,
+            Opcode.APPLY,
+            1,
+            Opcode.RETURN,
+        ]
+    ),
+    (
+        Module({
+            'main': Call(
+                Reference('print'),
+                String(['Hi ', Reference('name'), '!'])
+            ),
+            'name': String(['Bo']),
+        }),
+        [
+            Opcode.SET,
+            1,
+            *b'!',
+            Opcode.SET,
+            2,
+            *b'Bo',
+            Opcode.SET,
+            3,
+            *b'Hi ',
+            Opcode.CONCAT,
+            3,
             Opcode.PRINT,
+            Opcode.PUSH,
+            0,
         ]
     ),
 ])
@@ -172,6 +247,8 @@ def test_identifier_dereferencing(module):
         3,
         Opcode.INTEGER_TO_STRING,
         Opcode.PRINT,
+        Opcode.PUSH,
+        0,
     ]
     test_success(module, expected)
 
@@ -188,3 +265,12 @@ def test_identifier_dereferencing(module):
 def test_no_main_binding(module):
     with pytest.raises(CompilationError, match='No main binding defined'):
         compile_(module)
+
+def test_identical_functions_are_compiled_once():
+    module = Module({
+        'main': Call(Reference('first'), Reference('second')),
+        'first': (identity := Lambda('x', Parameter('x'))),
+        'second': identity,
+    })
+    program = compile_(module)
+    assert program.count(Opcode.RETURN) == 2
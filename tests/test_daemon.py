@@ -0,0 +1,53 @@
+from io import StringIO
+import threading
+import time
+
+import pytest
+
+from func.daemon import run_remote, serve, RemoteError
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    path = tmp_path / 'func.sock'
+    thread = threading.Thread(target=serve, args=(path,), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not path.exists():
+        assert time.monotonic() < deadline, 'The daemon did not start'
+        time.sleep(0.01)
+    return path
+
+def test_run_remote(socket_path):
+    output = StringIO()
+    run_remote(socket_path, 'examples/the_answer.func', output)
+    assert output.getvalue() == '42\n'
+
+def test_run_remote_repeatedly(socket_path, tmp_path):
+    path = tmp_path / 'greeting.func'
+    for name in ['Ada', 'Alan', 'Alan']:
+        path.write_text(f"main = print 'Hello, {name}'")
+        output = StringIO()
+        run_remote(socket_path, path, output)
+        assert output.getvalue() == f'Hello, {name}\n'
+
+def test_concurrent_runs(socket_path, tmp_path):
+    # Runs quicken their program, so each must have its own copy.
+    path = tmp_path / 'greeting.func'
+    path.write_text("main = print (twice 'a')\ntwice = \\s -> '\\(s)\\(s)'")
+    outputs = []
+    def run():
+        for _ in range(20):
+            output = StringIO()
+            run_remote(socket_path, path, output)
+            outputs.append(output.getvalue())
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert outputs == ['aa\n'] * 80
+
+def test_run_remote_error(socket_path):
+    with pytest.raises(RemoteError, match='missing.func'):
+        run_remote(socket_path, 'examples/missing.func', StringIO())
@@ -0,0 +1,125 @@
+from io import StringIO
+
+import func
+from func.analyser import analyse
+from func.compiler import (
+    BUILTINS,
+    compile_,
+    compile_with_ranges,
+    compile_with_symbols,
+    BindingRange,
+)
+from func.disassembler import disassemble, disassemble_file, measure_sizes
+from func.opcodes import Opcode
+from func.parser import parse
+from func.tokeniser import tokenise
+
+
+_SOURCE = ("main = print (if add 0 1 then greeting else "
+    "integer_to_string (twice (add 3) 1))\n"
+    "greeting = 'Hello'\n"
+    "twice = \\f -> \\x -> f (f x)")
+
+def _compile(source):
+    return compile_with_symbols(analyse(parse(tokenise(source)), BUILTINS))
+
+def test_compile_with_symbols():
+    program, symbols = _compile(_SOURCE)
+    assert program == compile_(analyse(parse(tokenise(_SOURCE)), BUILTINS))
+    assert symbols == {0: 'main', 33: 'add', 39: 'twice'}
+
+def test_anonymous_functions():
+    _, symbols = _compile('main = print (integer_to_string '
+        '((\\f -> f 1) (\\x -> add x 2)))')
+    assert sorted(symbols.values()) == ['<lambda>', '<lambda>', 'main']
+
+def test_disassemble():
+    program, symbols = _compile(_SOURCE)
+    assert disassemble(program, symbols).splitlines() == [
+        'main:',
+        '       0  PUSH                1',
+        '       2  PUSH                0',
+        '       4  ADD',
+        '       5  JUMP_IF             -> L22',
+        '       7  PUSH                1',
+        '       9  PUSH                3',
+        '      11  FUNCTION            add@33 2',
+        '      14  APPLY               1',
+        '      16  CALL                twice@39 2',
+        '      19  INTEGER_TO_STRING',
+        '      20  JUMP                -> L29',
+        'L22:',
+        "      22  SET                 'Hello'",
+        'L29:',
+        '      29  PRINT',
+        '      30  PUSH                0',
+        '      32  RETURN',
+        'add:',
+        '      33  LOAD                1',
+        '      35  LOAD                0',
+        '      37  ADD',
+        '      38  RETURN',
+        'twice:',
+        '      39  LOAD                1',
+        '      41  LOAD                0',
+        '      43  APPLY               1',
+        '      45  LOAD                0',
+        '      47  APPLY               1',
+        '      49  RETURN',
+    ]
+
+def test_disassemble_jump_to_end():
+    program = [Opcode.PUSH, 1, Opcode.JUMP_IF, 1, Opcode.PRINT]
+    assert disassemble(program).splitlines() == [
+        'main:',
+        '       0  PUSH                1',
+        '       2  JUMP_IF             -> L5',
+        '       4  PRINT',
+        'L5:',
+    ]
+
+def test_disassemble_quickened_program():
+    program = func.compile_source("main = print 'Hello'")
+    func.execute(program, StringIO())
+    assert program[0] == Opcode.SET_CONSTANT
+    assert disassemble(program).splitlines() == [
+        'main:',
+        "       0  SET_CONSTANT        'Hello'",
+        '       7  PRINT',
+        '       8  PUSH                0',
+    ]
+
+def test_measure_sizes():
+    program, symbols = _compile(_SOURCE)
+    sizes = measure_sizes(program, symbols)
+    assert sizes.bindings == {'main': 33, 'add': 6, 'twice': 11}
+    assert sizes.opcodes['SET'] == 7
+    assert sizes.instructions['LOAD'] == 5
+    assert sizes.opcodes['LOAD'] == 10
+    assert sizes.total == len(program)
+
+def test_compile_with_ranges():
+    module = analyse(parse(tokenise(_SOURCE)), BUILTINS)
+    program, symbols, ranges = compile_with_ranges(module)
+    assert (program, symbols) == compile_with_symbols(module)
+    assert ranges == [BindingRange(22, 29, 'greeting')]
+
+def test_measure_sizes_of_inlined_bindings():
+    module = analyse(parse(tokenise(
+        'main = print (integer_to_string (add x y))\n'
+        'x = add y 1\n'
+        'y = 20')), BUILTINS)
+    sizes = measure_sizes(*compile_with_ranges(module))
+    assert sizes.bindings == {'main': 5, 'x': 3, 'y': 4}
+
+def test_disassemble_file(tmp_path):
+    path = tmp_path / 'main.func'
+    path.write_text("import greetings\nmain = print greeting")
+    (tmp_path / 'greetings.func').write_text("greeting = 'Hello'")
+    output = StringIO()
+    disassemble_file(path, output)
+    rows = [line.split() for line in output.getvalue().splitlines()]
+    assert ['0', 'SET', "'Hello'"] in rows
+    assert ['greeting', '7', '70%'] in rows
+    assert ['main', '3', '30%'] in rows
+    assert ['total', '10'] in rows
@@ -74,6 +74,85 @@ add10 = \\x -> add x 10
 ''',
         '17\n'
     ),
+    (
+'''
+main = print (integer_to_string (sum (range 101)))
+''',
+        '5050\n'
+    ),
+    (
+'''
+main = print (integer_to_string (sum (zip_add numbers (map_add 10 numbers))))
+numbers = range 4
+''',
+        '52\n'
+    ),
+    (
+'''
+main = print 'The answer is \\(integer_to_string (add 40 2)), \\(name).'
+name = 'Deep Thought'
+''',
+        'The answer is 42, Deep Thought.\n'
+    ),
+    (
+'''
+main = print (integer_to_string (add3 1 2 3))
+add3 = \\x -> \\y -> \\z -> add x (add y z)
+''',
+        '6\n'
+    ),
+    (
+'''
+main = print (integer_to_string (double 21))
+double = \\x -> add x x
+''',
+        '42\n'
+    ),
+    (
+'''
+main = print (integer_to_string (twice add5 (twice (add 1) 0)))
+twice = \\f -> \\x -> f (f x)
+add5 = add 5
+''',
+        '12\n'
+    ),
+    (
+'''
+main = print (greet 'Hello' 'World')
+greet = \\greeting -> \\name -> '\\(greeting), \\(name)!'
+''',
+        'Hello, World!\n'
+    ),
+    (
+'''
+main = print (integer_to_string (adder 40 2))
+adder = \\x -> (\\y -> add x y)
+''',
+        '42\n'
+    ),
+    (
+'''
+main = print (integer_to_string (choose 0 10))
+choose = \\flag -> if flag then add 1 else (\\x -> add x x)
+''',
+        '20\n'
+    ),
+    (
+'''
+main = print (integer_to_string (call_with choose))
+call_with = \\f -> f 1 10
+choose = \\flag -> if flag then add 1 else (\\x -> add x x)
+''',
+        '11\n'
+    ),
+    (
+'''
+main = print (integer_to_string (compose (add 1) (const 40) 0))
+compose = \\f -> \\g -> \\x -> f (g x)
+const = \\x -> \\ignored -> add x 1
+''',
+        '42\n'
+    ),
 ])
 def test_run(capsys, raw_source, expected_output):
     source = _extract_source(raw_source)
@@ -81,6 +160,65 @@ def test_run(capsys, raw_source, expected_output):
     captured = capsys.readouterr()
     assert captured.out == expected_output
 
+@pytest.mark.parametrize('engine', ['stack', 'register'])
+@pytest.mark.parametrize('source, message', [
+    (
+        'main = print (integer_to_string (sum (zip_add (range 2) (range 3))))',
+        'Cannot add arrays of different lengths: 2 and 3',
+    ),
+    (
+        'main = print (integer_to_string (sum (map_add big (range 2))))\n'
+            'big = 9223372036854775807',
+        'Array element out of range',
+    ),
+    (
+        'main = print (integer_to_string '
+            '(sum (zip_with add (range 2) (range 3))))',
+        'Cannot zip arrays of different lengths: 2 and 3',
+    ),
+])
+def test_array_errors(engine, source, message):
+    with pytest.raises(func.runtime.ExecutionError, match=message):
+        func.run_source(source, engine=engine)
+
+@pytest.mark.parametrize('engine', ['stack', 'register'])
+def test_resultless_call_as_value(capsys, tmp_path, engine):
+    path = tmp_path / 'main.func'
+    path.write_text(
+        'main = f (print (integer_to_string 1))\nf = \\x -> x')
+    func.run_file(path, cache=func.ModuleCache(), engine=engine)
+    assert capsys.readouterr().out == '1\n'
+
+@pytest.mark.parametrize('engine', ['stack', 'register'])
+@pytest.mark.parametrize('source, expected_output', [
+    ('main = print (integer_to_string (fold add 0 (range 5)))', '10\n'),
+    (
+        'main = print (integer_to_string (total 10))\n'
+            'total = \\k -> fold (\\a -> \\x -> add a (add x k)) 0 (range 3)',
+        '33\n',
+    ),
+    (
+        'main = print (integer_to_string (fold nested 0 (range 4)))\n'
+            'nested = \\a -> \\n -> add a (fold add 0 (range n))',
+        '4\n',
+    ),
+    (
+        'main = print (integer_to_string (sum (zip_with weigh xs ys)))\n'
+            'ys = map_add 1 xs\n'
+            'weigh = \\x -> \\y -> add x (add y y)\n'
+            'xs = range 3',
+        '15\n',
+    ),
+    (
+        'main = print (integer_to_string '
+            '(sum (zip_with add (range 0) (range 0))))',
+        '0\n',
+    ),
+])
+def test_fold_and_zip_with(capsys, engine, source, expected_output):
+    func.run_source(source, engine=engine)
+    assert capsys.readouterr().out == expected_output
+
 def _extract_source(raw_source):
     if raw_source[0] != '\n':
         raise ValueError('Raw source should start with a newline')
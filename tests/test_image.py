@@ -0,0 +1,112 @@
+from array import array
+
+import pytest
+
+import func
+from func.compiler import Opcode
+from func.image import save_image, load_image, ImageError
+from func.runtime import (
+    Constant,
+    Frame,
+    Function,
+    Image,
+    PartialApplication,
+    preinitialise,
+)
+
+
+@pytest.mark.parametrize('file_name, expected_output', [
+    ('the_answer.func', '42\n'),
+    ('hello_world.func', 'Hello, world!\n'),
+    ('conditional.func', 'Okay\n'),
+])
+def test_snapshot_round_trip(capsys, tmp_path, file_name, expected_output):
+    image_path = tmp_path / 'program.image'
+    func.snapshot_file(f'examples/{file_name}', image_path)
+    func.run_image(image_path)
+    func.run_image(image_path)
+    captured = capsys.readouterr()
+    assert captured.out == expected_output * 2
+
+def test_preinitialise_stops_at_first_side_effect():
+    program = [
+        Opcode.PUSH,
+        40,
+        Opcode.PUSH,
+        2,
+        Opcode.ADD,
+        Opcode.INTEGER_TO_STRING,
+        Opcode.PRINT,
+    ]
+    image = preinitialise(program)
+    assert image.program_pointer == 6
+    assert image.stack == [0]
+    assert image.heap.tobytes() == b'\x02\x00\x00\x0042'
+
+def test_snapshot_defers_folds(capsys, tmp_path):
+    source_path = tmp_path / 'main.func'
+    source_path.write_text('main = print (integer_to_string '
+        "(fold (\\a -> \\x -> add a (size (print 'x'))) 0 (range 2)))\n"
+        'size = \\ignored -> 1')
+    image_path = tmp_path / 'main.image'
+    func.snapshot_file(source_path, image_path)
+    assert capsys.readouterr().out == ''
+    func.run_image(image_path)
+    assert capsys.readouterr().out == 'x\nx\n2\n'
+
+def test_image_file_round_trip(tmp_path):
+    path = tmp_path / 'program.image'
+    image = preinitialise([Opcode.SET, 2, *b'Hi', Opcode.PRINT])
+    save_image(image, path)
+    assert load_image(path) == image
+
+def test_image_values_round_trip(tmp_path):
+    path = tmp_path / 'program.image'
+    function = Function(4, 2)
+    image = Image(
+        [Opcode.SET_CONSTANT, Constant(b'Hi', 'Hi'), *b'Hi', Opcode.PRINT],
+        4,
+        [-1, 2 ** 100, function, PartialApplication(function, [7]),
+            array('q', [1, -2, 3])],
+        [Frame(5, [0, array('q')], [function])],
+        array('B', b'\x02\x00\x00\x00Hi'))
+    save_image(image, path)
+    assert load_image(path) == image
+
+def test_truncated_image(tmp_path):
+    path = tmp_path / 'program.image'
+    image = preinitialise([Opcode.SET, 2, *b'Hi', Opcode.PRINT])
+    save_image(image, path)
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ImageError, match='Truncated image'):
+        load_image(path)
+
+@pytest.mark.parametrize('content, message', [
+    (b'', 'Empty image'),
+    (b'FU', 'Truncated image header'),
+    (b'NOPE\x01\x00' + bytes(8), 'Not a Func image'),
+    (b'FUNC\x07\x00' + bytes(8), 'Unsupported image version: 7'),
+    (b'FUNC\x02\x00' + bytes(8), 'Unsupported image version: 2'),
+])
+def test_invalid_image(tmp_path, content, message):
+    path = tmp_path / 'program.image'
+    path.write_bytes(content)
+    with pytest.raises(ImageError, match=message):
+        load_image(path)
+
+@pytest.mark.parametrize('image, message', [
+    (Image([Opcode.ADD], 0, [], [], array('B')),
+        'Invalid program: Stack underflow at 0'),
+    (Image([Opcode.PUSH, 1], 1, [], [], array('B')),
+        'Program pointer is not an instruction: 1'),
+    (Image([Opcode.PUSH, 1], 0, [], [Frame(7, [], [])], array('B')),
+        'Return address is not an instruction: 7'),
+    (Image([Opcode.PUSH, 1], 0, [PartialApplication(Function(0, 2),
+            [Function(1, 1)])], [], array('B')),
+        'Function address is not an instruction: 1'),
+])
+def test_restored_programs_are_verified(tmp_path, image, message):
+    path = tmp_path / 'program.image'
+    save_image(image, path)
+    with pytest.raises(ImageError, match=message):
+        load_image(path)
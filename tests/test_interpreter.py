@@ -0,0 +1,89 @@
+import pytest
+
+import func
+from func.interpreter import Interpreter
+from func.natives import register_native
+from func.typechecker import TypeCheckError
+
+
+_TWICE = 'twice = \\f -> \\x -> f (f x)'
+
+def test_run_source():
+    interpreter = Interpreter()
+    output = interpreter.run_source("main = print 'Héllo'")
+    assert output == 'Héllo\n'.encode('utf8')
+
+def test_run_source_with_sink():
+    interpreter = Interpreter()
+    lines = []
+    result = interpreter.run_source(
+        "main = print (twice (\\s -> '\\(s)!') 'Hi')\n" + _TWICE, lines.append)
+    assert result is None
+    assert lines == ['Hi!!']
+
+def test_repeated_runs():
+    interpreter = Interpreter()
+    sources = [
+        "main = print 'Hello'",
+        'main = print (integer_to_string (add 40 2))',
+        'main = print (integer_to_string (twice (twice (add 1)) 1))\n'
+            f'{_TWICE}',
+        "main = print '\\(integer_to_string (sum (range 4)))!'",
+    ]
+    expected = [b'Hello\n', b'42\n', b'5\n', b'6!\n']
+    for _ in range(3):
+        assert [interpreter.run_source(source) for source in sources] == (
+            expected)
+
+def test_compiled_programs_are_cached():
+    interpreter = Interpreter()
+    source = "main = print 'Hello'"
+    assert interpreter.compile_source(source) is (
+        interpreter.compile_source(source))
+
+def test_cache_size():
+    interpreter = Interpreter(cache_size=2)
+    sources = [f'main = print (integer_to_string {index})'
+        for index in range(3)]
+    first, *_ = [interpreter.compile_source(source) for source in sources]
+    assert interpreter.compile_source(sources[0]) is not first
+
+def test_run_file():
+    interpreter = Interpreter()
+    assert interpreter.run_file('examples/the_answer.func') == b'42\n'
+    assert interpreter.run_file('examples/hello_world.func') == (
+        b'Hello, world!\n')
+
+def test_file_programs_are_cached(tmp_path, monkeypatch):
+    path = tmp_path / 'main.func'
+    path.write_text("main = print 'Hello'")
+    interpreter = Interpreter()
+    calls = []
+    verify = func.modules.verify
+    monkeypatch.setattr(func.modules, 'verify',
+        lambda program: calls.append(program) or verify(program))
+    assert interpreter.run_file(path) == b'Hello\n'
+    assert interpreter.run_file(path) == b'Hello\n'
+    assert len(calls) == 1
+    path.write_text("main = print 'Bye'")
+    assert interpreter.run_file(path) == b'Bye\n'
+    assert len(calls) == 2
+
+@pytest.mark.usefixtures('isolated_natives')
+def test_errors_leave_the_interpreter_usable():
+    def fail(message):
+        raise ValueError(message)
+    register_native('fail', fail, (str,), int)
+    interpreter = Interpreter()
+    with pytest.raises(TypeCheckError):
+        interpreter.run_source('main = print 1')
+    lines = []
+    with pytest.raises(ValueError, match='Oops'):
+        interpreter.run_source(
+            "main = print (if fail 'Oops' then 'a' else 'b')",
+            lines.append)
+    assert lines == []
+    assert interpreter.run_source("main = print 'b'") == b'b\n'
+
+def test_lazy_attribute():
+    assert func.Interpreter is Interpreter
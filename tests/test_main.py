@@ -1,3 +1,4 @@
+import pytest
 import testing
 
 from pathlib import Path
@@ -6,7 +7,8 @@ import func.__main__ as func_main
 
 
 def test_run_repl(mocker):
-    repl = mocker.patch('func.__main__.repl')
+    mocker.patch('sys.stdin.isatty', return_value=True)
+    repl = mocker.patch('func.repl.repl')
     with testing.raises(SystemExit, message=''):
         func_main.main()
     repl.assert_called_with()
@@ -19,6 +21,44 @@ def test_run_with_file(mocker):
         func_main.main()
     run_file.assert_called_with(Path(path))
 
+def test_run_with_cache(mocker):
+    mocker.patch('sys.argv', ['', '--file', 'a.func', '--cache', 'cache'])
+    run_file = mocker.patch('func.__main__.run_file')
+    module_cache = mocker.patch('func.__main__.ModuleCache')
+    with testing.raises(SystemExit, message=''):
+        func_main.main()
+    module_cache.assert_called_with(Path('cache'))
+    run_file.assert_called_with(
+        Path('a.func'), cache=module_cache.return_value)
+
+def test_serve(mocker):
+    mocker.patch('sys.argv', ['', '--serve', 'func.sock'])
+    serve = mocker.patch('func.daemon.serve')
+    with testing.raises(SystemExit, message=''):
+        func_main.main()
+    serve.assert_called_with(Path('func.sock'), None)
+
+def test_connect(mocker):
+    mocker.patch('sys.argv',
+        ['', '--file', 'a.func', '--connect', 'func.sock'])
+    run_remote = mocker.patch('func.daemon.run_remote')
+    with testing.raises(SystemExit, message=''):
+        func_main.main()
+    run_remote.assert_called_with(Path('func.sock'), Path('a.func'))
+
+def test_connect_requires_file(mocker):
+    mocker.patch('sys.argv', ['', '--connect', 'func.sock'])
+    with testing.raises(SystemExit, message='2'):
+        func_main.main()
+
+def test_run_with_engine(mocker):
+    mocker.patch('sys.argv',
+        ['', '--file', 'a.func', '--engine', 'register'])
+    run_file = mocker.patch('func.__main__.run_file')
+    with testing.raises(SystemExit, message=''):
+        func_main.main()
+    run_file.assert_called_with(Path('a.func'), engine='register')
+
 def test_run_with_file_raises_exception(mocker):
     error_message = 'An error message'
     mocker.patch('sys.argv', ['', '--file', 'PATH'])
@@ -26,3 +66,176 @@ def test_run_with_file_raises_exception(mocker):
         side_effect=Exception(error_message))
     with testing.raises(SystemExit, message=f'Error: {error_message}'):
         func_main.main()
+
+def test_snapshot_file(mocker):
+    mocker.patch('sys.argv',
+        ['', '--file', 'program.func', '--snapshot', 'program.image'])
+    snapshot_file = mocker.patch('func.__main__.snapshot_file')
+    with testing.raises(SystemExit, message=''):
+        func_main.main()
+    snapshot_file.assert_called_with(
+        Path('program.func'), Path('program.image'))
+
+def test_snapshot_requires_file(mocker):
+    mocker.patch('sys.argv', ['', '--snapshot', 'program.image'])
+    snapshot_file = mocker.patch('func.__main__.snapshot_file')
+    with testing.raises(SystemExit, message='2'):
+        func_main.main()
+    snapshot_file.assert_not_called()
+
+def test_image_with_file(mocker):
+    mocker.patch('sys.argv',
+        ['', '--image', 'program.image', '--file', 'program.func'])
+    with testing.raises(SystemExit, message='2'):
+        func_main.main()
+
+def test_run_with_image(mocker):
+    mocker.patch('sys.argv', ['', '--image', 'program.image'])
+    run_image = mocker.patch('func.__main__.run_image')
+    with testing.raises(SystemExit, message=''):
+        func_main.main()
+    run_image.assert_called_with(Path('program.image'))
+
+@pytest.mark.parametrize('arguments', [
+    ['--snapshot', 'a.image'],
+    ['--connect', 'func.sock'],
+])
+def test_stack_only_options(mocker, arguments):
+    mocker.patch('sys.argv',
+        ['', '--file', 'a.func', '--engine', 'register', *arguments])
+    with testing.raises(SystemExit, message='2'):
+        func_main.main()
+
+@pytest.mark.parametrize('arguments', [
+    ['--file', 'a.func', '--connect', 'func.sock'],
+    ['--image', 'a.image'],
+])
+def test_cache_invalid_options(mocker, arguments):
+    mocker.patch('sys.argv', ['', *arguments, '--cache', 'cache'])
+    with testing.raises(SystemExit, message='2'):
+        func_main.main()
+
+@pytest.mark.parametrize('arguments, target, expected_arguments', [
+    (['--snapshot', 'a.image'], 'func.__main__.snapshot_file',
+        [Path('a.image')]),
+    (['--stats'], 'func.__main__.run_with_statistics', ['text']),
+    (['--disassemble'], 'func.disassembler.disassemble_file', []),
+    (['--profile-heap'], 'func.__main__.run_with_heap_profile',
+        [Path('-')]),
+    (['--record-branches', 'b.json'], 'func.profiler.record_branches_file',
+        [Path('b.json')]),
+])
+def test_options_with_cache(mocker, arguments, target, expected_arguments):
+    mocker.patch('sys.argv',
+        ['', '--file', 'a.func', '--cache', 'cache', *arguments])
+    function = mocker.patch(target)
+    module_cache = mocker.patch('func.__main__.ModuleCache')
+    with testing.raises(SystemExit, message=''):
+        func_main.main()
+    function.assert_called_with(Path('a.func'), *expected_arguments,
+        cache=module_cache.return_value)
+
+@pytest.mark.parametrize('arguments, is_terminal', [
+    (['--batch'], True),
+    ([], False),
+])
+def test_run_batch(mocker, arguments, is_terminal):
+    mocker.patch('sys.argv', ['', *arguments])
+    mocker.patch('sys.stdin.isatty', return_value=is_terminal)
+    repl = mocker.patch('func.repl.repl')
+    run_batch = mocker.patch('func.repl.run_batch')
+    with testing.raises(SystemExit, message=''):
+        func_main.main()
+    run_batch.assert_called_with()
+    repl.assert_not_called()
+
+@pytest.mark.parametrize('arguments, format_', [
+    (['--stats'], 'text'),
+    (['--stats', 'json'], 'json'),
+])
+def test_run_with_statistics(mocker, arguments, format_):
+    mocker.patch('sys.argv', ['', '--file', 'program.func', *arguments])
+    measure_file = mocker.patch('func.stats.measure_file')
+    format_statistics = mocker.patch('func.stats.format_statistics',
+        return_value='')
+    with testing.raises(SystemExit, message=''):
+        func_main.main()
+    measure_file.assert_called_with(Path('program.func'))
+    format_statistics.assert_called_with(measure_file.return_value, format_)
+
+def test_statistics_requires_file(mocker):
+    mocker.patch('sys.argv', ['', '--stats'])
+    with testing.raises(SystemExit, message='2'):
+        func_main.main()
+
+def test_disassemble(mocker):
+    mocker.patch('sys.argv', ['', '--file', 'a.func', '--disassemble'])
+    disassemble_file = mocker.patch('func.disassembler.disassemble_file')
+    with testing.raises(SystemExit, message=''):
+        func_main.main()
+    disassemble_file.assert_called_with(Path('a.func'))
+
+@pytest.mark.parametrize('arguments', [
+    ['--disassemble'],
+    ['--file', 'a.func', '--disassemble', '--engine', 'register'],
+])
+def test_disassemble_invalid_options(mocker, arguments):
+    mocker.patch('sys.argv', ['', *arguments])
+    with testing.raises(SystemExit, message='2'):
+        func_main.main()
+
+@pytest.mark.parametrize('arguments, report', [
+    (['--profile-heap'], Path('-')),
+    (['--profile-heap', 'heap.txt'], Path('heap.txt')),
+])
+def test_profile_heap(mocker, arguments, report):
+    mocker.patch('sys.argv', ['', '--file', 'a.func', *arguments])
+    run_with_heap_profile = mocker.patch(
+        'func.__main__.run_with_heap_profile')
+    with testing.raises(SystemExit, message=''):
+        func_main.main()
+    run_with_heap_profile.assert_called_with(Path('a.func'), report)
+
+def test_profile_heap_requires_file(mocker):
+    mocker.patch('sys.argv', ['', '--profile-heap'])
+    with testing.raises(SystemExit, message='2'):
+        func_main.main()
+
+def test_record_branches(mocker):
+    mocker.patch('sys.argv',
+        ['', '--file', 'a.func', '--record-branches', 'branches.json'])
+    record_branches_file = mocker.patch('func.profiler.record_branches_file')
+    with testing.raises(SystemExit, message=''):
+        func_main.main()
+    record_branches_file.assert_called_with(
+        Path('a.func'), Path('branches.json'))
+
+def test_run_with_branch_profile(mocker):
+    mocker.patch('sys.argv',
+        ['', '--file', 'a.func', '--branch-profile', 'branches.json'])
+    run_with_branch_profile = mocker.patch(
+        'func.__main__.run_with_branch_profile')
+    with testing.raises(SystemExit, message=''):
+        func_main.main()
+    run_with_branch_profile.assert_called_with(
+        Path('a.func'), Path('branches.json'))
+
+@pytest.mark.parametrize('arguments', [
+    ['--record-branches', 'branches.json'],
+    ['--branch-profile', 'branches.json'],
+    ['--file', 'a.func', '--branch-profile', 'branches.json',
+        '--engine', 'register'],
+    *(['--file', 'a.func', '--branch-profile', 'branches.json', *other]
+        for other in [
+            ['--snapshot', 'a.image'],
+            ['--connect', 'socket'],
+            ['--stats'],
+            ['--disassemble'],
+            ['--profile-heap'],
+            ['--record-branches', 'other.json'],
+        ]),
+])
+def test_branch_profile_invalid_options(mocker, arguments):
+    mocker.patch('sys.argv', ['', *arguments])
+    with testing.raises(SystemExit, message='2'):
+        func_main.main()
@@ -0,0 +1,136 @@
+from io import StringIO
+
+import pytest
+
+import func.modules
+from func.analyser import AnalysisError
+from func.modules import compile_file, load_program, ModuleCache, ModuleError
+from func.runtime import execute
+
+
+@pytest.fixture
+def write(tmp_path):
+    def write(name, source):
+        path = tmp_path / f'{name}.func'
+        path.write_text(source)
+        return path
+    return write
+
+@pytest.fixture
+def parse_spy(mocker):
+    return mocker.patch('func.modules._parse_source',
+        wraps=func.modules._parse_source)
+
+def run(path, cache=None, **keywords):
+    output = StringIO()
+    execute(compile_file(path, cache or ModuleCache(), **keywords), output)
+    return output.getvalue()
+
+def test_import(write):
+    write('numbers', 'answer = add 40 two\ntwo = 2')
+    write('strings', 'import numbers\nshow = \\x -> integer_to_string x')
+    path = write('main',
+        'import numbers\nimport strings\nmain = print (show answer)')
+    assert run(path) == '42\n'
+
+def test_shared_dependency_is_loaded_once(write, parse_spy):
+    write('base', 'one = 1')
+    write('left', 'import base\nleft = add one 1')
+    write('right', 'import base\nright = add one 2')
+    path = write('main', 'import left\nimport right\n'
+        'main = print (integer_to_string (add left right))')
+    assert run(path) == '5\n'
+    assert parse_spy.call_count == 4
+
+def test_imported_main_is_not_exported(write):
+    write('library', "main = print 'Library'\ngreeting = 'Hello'")
+    path = write('main', 'import library\nmain = print greeting')
+    assert run(path) == 'Hello\n'
+
+def test_imports_are_not_transitive(write):
+    write('base', 'one = 1')
+    write('middle', 'import base\ntwo = add one one')
+    path = write('main',
+        'import middle\nmain = print (integer_to_string one)')
+    with pytest.raises(AnalysisError, match="Unbound name: 'one'"):
+        run(path)
+
+def test_duplicate_bindings(write):
+    write('first', 'value = 1')
+    write('second', 'value = 2')
+    path = write('main', "import first\nimport second\nmain = print 'Hi'")
+    with pytest.raises(ModuleError,
+            match="Binding 'value' is defined by both first and second"):
+        run(path)
+
+def test_import_cycle(write):
+    write('first', 'import second\none = 1')
+    write('second', 'import first\ntwo = 2')
+    path = write('main', "import first\nmain = print 'Hi'")
+    with pytest.raises(ModuleError,
+            match='Import cycle: first -> second -> first'):
+        run(path)
+
+def test_missing_module(write):
+    path = write('main', "import missing\nmain = print 'Hi'")
+    with pytest.raises(FileNotFoundError):
+        run(path)
+
+def test_changed_leaf_is_recompiled_alone(write, parse_spy):
+    leaf = write('leaf', "text = 'Before'")
+    write('middle', 'import leaf\nshout = \\x -> \'\\(x)!\'')
+    path = write('main',
+        'import leaf\nimport middle\nmain = print (shout text)')
+    cache = ModuleCache()
+    assert run(path, cache) == 'Before!\n'
+    assert parse_spy.call_count == 3
+    leaf.write_text("text = 'After'")
+    assert run(path, cache) == 'After!\n'
+    assert parse_spy.call_count == 4
+
+def test_changed_exports_reanalyse_dependents(write):
+    leaf = write('leaf', 'value = 1')
+    path = write('main', 'import leaf\nmain = print (integer_to_string value)')
+    cache = ModuleCache()
+    assert run(path, cache) == '1\n'
+    leaf.write_text('other = 1')
+    with pytest.raises(AnalysisError, match="Unbound name"):
+        run(path, cache)
+
+def test_cache_size(write, parse_spy):
+    first = write('first', "main = print 'First'")
+    second = write('second', "main = print 'Second'")
+    cache = ModuleCache(cache_size=1)
+    assert run(first, cache) == 'First\n'
+    assert run(second, cache) == 'Second\n'
+    assert run(second, cache) == 'Second\n'
+    assert parse_spy.call_count == 2
+    assert run(first, cache) == 'First\n'
+    assert parse_spy.call_count == 3
+
+def test_disk_cache(write, tmp_path, parse_spy):
+    write('leaf', "text = 'Cached'")
+    path = write('main', 'import leaf\nmain = print text')
+    directory = tmp_path / 'cache'
+    assert run(path, ModuleCache(directory)) == 'Cached\n'
+    assert len(list(directory.iterdir())) == 2
+    assert run(path, ModuleCache(directory)) == 'Cached\n'
+    assert parse_spy.call_count == 2
+
+def test_parallel_parsing(write, mocker):
+    mocker.patch('func.modules._PARALLEL_THRESHOLD', 0)
+    write('first', 'one = 1')
+    write('second', 'two = 2')
+    path = write('main', 'import first\nimport second\n'
+        'main = print (integer_to_string (add one two))')
+    assert run(path, workers=2) == '3\n'
+
+def test_cached_programs_are_run_from_copies(write):
+    path = write('main', "main = print 'Hello'")
+    cache = ModuleCache()
+    compiled = load_program(path, cache)
+    original = compiled.program.copy()
+    runnable = compiled.runnable()
+    execute(runnable, StringIO())
+    assert runnable != original
+    assert load_program(path, cache).program == original
@@ -0,0 +1,139 @@
+from array import array
+
+import pytest
+
+import func
+from func.compiler import BUILTINS, compile_, Opcode
+from func.analysed import *
+from func.image import ImageError
+from func.natives import register_native, NATIVES
+from func.typechecker import TypeCheckError
+
+
+pytestmark = pytest.mark.usefixtures('isolated_natives')
+
+def test_compile_native_call():
+    register_native('repeat', lambda string, count: string * count,
+        (str, int), str)
+    module = Module({
+        'main': Call(
+            Reference('print'),
+            Call(Call(Reference('repeat'), String(['ab'])), Integer(3))
+        ),
+    })
+    expected = [
+        Opcode.PUSH,
+        3,
+        Opcode.SET,
+        2,
+        *b'ab',
+        Opcode.CALL_NATIVE,
+        0,
+        2,
+        Opcode.PRINT,
+        Opcode.PUSH,
+        0,
+    ]
+    assert compile_(module) == expected
+
+@pytest.mark.parametrize('source, expected_output', [
+    (
+        "main = print (repeat 'ab' 3)",
+        'ababab\n'
+    ),
+    (
+        'main = print (integer_to_string (maximum (range 7)))',
+        '6\n'
+    ),
+    (
+        "main = print (repeat (repeat 'x' 2) (maximum (range 3)))",
+        'xxxx\n'
+    ),
+])
+def test_run_native(capsys, source, expected_output):
+    register_native('repeat', lambda string, count: string * count,
+        (str, int), str)
+    register_native('maximum', max, (array,), int)
+    func.run_source(source)
+    captured = capsys.readouterr()
+    assert captured.out == expected_output
+
+def test_native_without_result(capsys):
+    calls = []
+    register_native('record', calls.append, (int,))
+    func.run_source('main = record (add 2 3)')
+    captured = capsys.readouterr()
+    assert captured.out == ''
+    assert calls == [5]
+
+def test_snapshot_defers_natives(capsys, tmp_path):
+    calls = []
+    def repeat(string, count):
+        calls.append(string)
+        return string * count
+    register_native('repeat', repeat, (str, int), str)
+    source_path = tmp_path / 'main.func'
+    source_path.write_text("main = print (repeat 'ab' 3)")
+    image_path = tmp_path / 'main.image'
+    func.snapshot_file(source_path, image_path)
+    assert calls == []
+    # Register the native at a different index, as another process might.
+    del NATIVES[-1]
+    del BUILTINS['repeat']
+    register_native('unused', len, (str,), int)
+    register_native('repeat', repeat, (str, int), str)
+    func.run_image(image_path)
+    captured = capsys.readouterr()
+    assert captured.out == 'ababab\n'
+    assert calls == ['ab']
+
+def test_image_with_unregistered_native(tmp_path):
+    register_native('repeat', lambda string, count: string * count,
+        (str, int), str)
+    source_path = tmp_path / 'main.func'
+    source_path.write_text("main = print (repeat 'ab' 3)")
+    image_path = tmp_path / 'main.image'
+    func.snapshot_file(source_path, image_path)
+    del NATIVES[-1]
+    with pytest.raises(ImageError, match="Native not registered: 'repeat'"):
+        func.run_image(image_path)
+
+def test_duplicate_native():
+    with pytest.raises(ValueError, match="Builtin already defined: 'add'"):
+        register_native('add', lambda a, b: a + b, (int, int), int)
+
+def test_native_without_parameters():
+    with pytest.raises(ValueError,
+            match="Native takes no parameters: 'answer'"):
+        register_native('answer', lambda: 42, (), int)
+
+@pytest.mark.parametrize('engine', ['stack', 'register'])
+@pytest.mark.parametrize('result, message', [
+    (None, "Native 'broken' returned None, expected str"),
+    (3, "Native 'broken' returned 3, expected str"),
+])
+def test_native_with_wrong_result(engine, result, message):
+    register_native('broken', lambda string: result, (str,), str)
+    with pytest.raises(func.runtime.ExecutionError, match=message):
+        func.run_source("main = print (broken 'x')", engine=engine)
+
+def test_native_with_wrong_array_type():
+    register_native('floats', lambda count: array('d', [0.5] * count),
+        (int,), array)
+    with pytest.raises(func.runtime.ExecutionError,
+            match="Native 'floats' returned array\\('d'"):
+        func.run_source('main = print (integer_to_string (sum (floats 2)))')
+
+def test_unsupported_native_type():
+    with pytest.raises(TypeError, match='Unsupported native type'):
+        register_native('halve', lambda a: a / 2, (float,), float)
+
+def test_native_types():
+    register_native('repeat', lambda string, count: string * count,
+        (str, int), str)
+    register_native('log', print, (str,))
+    assert str(BUILTINS['repeat'].type) == 'String -> Integer -> String'
+    assert str(BUILTINS['log'].type) == 'String -> Nothing'
+    with pytest.raises(TypeCheckError,
+            match="Type error in 'main': expected Integer, got String"):
+        func.compile_source("main = print (repeat 'ab' 'c')")
@@ -1,6 +1,6 @@
 import pytest
 
-from func.parser import parse, ParseError
+from func.parser import parse, parse_statement, ParseError
 from func.syntax import *
 from func.tokeniser import tokenise
 
@@ -165,6 +165,22 @@ from func.tokeniser import tokenise
             ),
         ])
     ),
+    (
+        'import strings\nimport numbers\nmain = print greeting',
+        Module(
+            [
+                Binding(
+                    'main',
+                    Call(Identifier('print'), Identifier('greeting'))
+                ),
+            ],
+            ['strings', 'numbers']
+        )
+    ),
+    (
+        'import strings',
+        Module([], ['strings'])
+    ),
 ])
 def test_success(source, expected):
     tokens = tokenise(source)
@@ -196,6 +212,9 @@ def test_success(source, expected):
     ('value = λa', 'an arrow', 'end-of-source'),
     ('value = λa ->', 'an expression', 'end-of-source'),
     ('λ', 'an identifier', 'the beginning of a lambda'),
+    ('import', 'an identifier', 'end-of-source'),
+    ('import a b', 'a newline', 'an identifier'),
+    ('a = 1\nimport b', 'an identifier', 'an import'),
     (
         "var = 'hello\\()world'",
         'an expression',
@@ -207,3 +226,25 @@ def test_failure(source, expectation, reality):
     expected_error_message = f'Expected {expectation}, got {reality}'
     with pytest.raises(ParseError, match=expected_error_message):
         parse(tokens)
+
+@pytest.mark.parametrize('source, expected', [
+    ('name', Identifier('name')),
+    ('name = value', Binding('name', Identifier('value'))),
+    ('f x', Call(Identifier('f'), Identifier('x'))),
+    ("x = f 'y'", Binding('x', Call(Identifier('f'), String(['y'])))),
+])
+def test_parse_statement(source, expected):
+    tokens = tokenise(source)
+    actual = parse_statement(tokens)
+    assert actual == expected
+
+@pytest.mark.parametrize('source, expectation, reality', [
+    ('f x = 1', 'end-of-source', 'an equals symbol'),
+    ('x = 1 = 2', 'end-of-source', 'an equals symbol'),
+    ('x =', 'an expression', 'end-of-source'),
+])
+def test_parse_statement_failure(source, expectation, reality):
+    tokens = tokenise(source)
+    expected_error_message = f'Expected {expectation}, got {reality}'
+    with pytest.raises(ParseError, match=expected_error_message):
+        parse_statement(tokens)
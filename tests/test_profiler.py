@@ -0,0 +1,98 @@
+from io import StringIO
+
+from func.analyser import analyse
+from func.compiler import BUILTINS, compile_with_ranges
+from func.opcodes import Opcode
+from func.parser import parse
+from func.profiler import (
+    format_heap_profile,
+    profile_heap,
+    profile_heap_file,
+    AllocationSite,
+)
+from func.tokeniser import tokenise
+
+
+_SOURCE = ("main = print (twice (\\s -> '\\(s)!') greeting)\n"
+    "greeting = 'Hello \\(integer_to_string (add 40 2))'\n"
+    "twice = \\f -> \\x -> f (f x)")
+
+def _profile(source):
+    module = analyse(parse(tokenise(source)), BUILTINS)
+    program, symbols, ranges = compile_with_ranges(module)
+    output = StringIO()
+    profile = profile_heap(program, symbols, output, ranges)
+    return profile, output.getvalue()
+
+def test_profile_heap():
+    profile, output = _profile(_SOURCE)
+    assert output == 'Hello 42!!\n'
+    assert profile.ranked_sites() == [
+        AllocationSite(31, Opcode.CONCAT, '<lambda>', 2, 27),
+        AllocationSite(14, Opcode.CONCAT, 'greeting', 1, 12),
+        AllocationSite(6, Opcode.SET, 'greeting', 1, 10),
+        AllocationSite(26, Opcode.SET, '<lambda>', 2, 10),
+        AllocationSite(5, Opcode.INTEGER_TO_STRING, 'greeting', 1, 6),
+    ]
+    assert profile.allocations == 7
+    assert profile.allocated_bytes == 65
+    assert profile.peak_bytes == 65
+
+def test_profile_array_allocations():
+    profile, output = _profile('main = print (integer_to_string (sum '
+        '(zip_add (map_add 1 numbers) numbers)))\n'
+        'numbers = range 4')
+    assert output == '16\n'
+    assert [(site.opcode, site.binding, site.allocations, site.bytes)
+            for site in profile.ranked_sites()] == [
+        (Opcode.RANGE, 'numbers', 1, 32),
+        (Opcode.RANGE, 'numbers', 1, 32),
+        (Opcode.MAP_ADD_UNCHECKED, 'main', 1, 32),
+        (Opcode.ZIP_ADD_UNCHECKED, 'main', 1, 32),
+        (Opcode.INTEGER_TO_STRING, 'main', 1, 6),
+    ]
+    assert profile.peak_bytes == 6
+
+def test_profile_zip_with():
+    profile, output = _profile('main = print (integer_to_string (sum '
+        "(zip_with (\\x -> \\y -> label x) numbers numbers)))\n"
+        "label = \\x -> (\\ignored -> x) (integer_to_string x)\n"
+        'numbers = range 2')
+    assert output == '1\n'
+    assert [(site.opcode, site.binding, site.allocations, site.bytes)
+            for site in profile.ranked_sites()] == [
+        (Opcode.RANGE, 'numbers', 1, 16),
+        (Opcode.RANGE, 'numbers', 1, 16),
+        (Opcode.ZIP_WITH, 'main', 1, 16),
+        (Opcode.INTEGER_TO_STRING, 'label', 2, 10),
+        (Opcode.INTEGER_TO_STRING, 'main', 1, 5),
+    ]
+
+def test_profile_without_allocations():
+    profile, output = _profile('main = add 1 2')
+    assert profile.sites == {}
+    assert profile.peak_bytes == 0
+    assert format_heap_profile(profile).splitlines()[:3] == [
+        'allocations                    0',
+        'allocated bytes                0',
+        'peak heap bytes                0',
+    ]
+
+def test_format_empty_allocations():
+    profile, _ = _profile('main = sum (range 0)')
+    assert profile.allocated_bytes == 0
+    rows = [line.split() for line in format_heap_profile(profile).splitlines()]
+    assert rows[5][1:] == ['RANGE', 'main', '1', '0', '0%']
+
+def test_format_heap_profile():
+    profile, _ = _profile(_SOURCE)
+    rows = [line.split() for line in format_heap_profile(profile).splitlines()]
+    assert rows[4] == ['address', 'opcode', 'binding', 'allocations', 'bytes',
+        'share']
+    assert rows[5] == ['31', 'CONCAT', '<lambda>', '2', '27', '42%']
+
+def test_profile_heap_file():
+    output = StringIO()
+    profile = profile_heap_file('examples/hello_world.func', output)
+    assert output.getvalue() == 'Hello, world!\n'
+    assert [site.binding for site in profile.ranked_sites()] == ['main']
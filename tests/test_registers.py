@@ -0,0 +1,103 @@
+from io import StringIO
+
+import pytest
+
+import func
+from func.analyser import analyse
+from func.compiler import BUILTINS
+from func.opcodes import RegisterOpcode
+from func.parser import parse
+from func.register_compiler import compile_registers
+from func.stats import measure_source
+from func.tokeniser import tokenise
+from func.typechecker import TypeCheckError
+from benchmarks.generators import GENERATORS
+
+
+_SOURCES = [
+    "main = print 'Hello'",
+    'main = print (integer_to_string (add 40 2))',
+    "main = print (if 0 then 'Yes' else 'No')",
+    "main = print (if add 0 1 then 'Yes' else 'No')",
+    "main = print 'a\\(integer_to_string 1)b\\(text)'\ntext = 'c'",
+    'main = print (integer_to_string (twice (add 3) 1))\n'
+        'twice = \\f -> \\x -> f (f x)',
+    'main = print (integer_to_string (adder 1 2))\n'
+        'adder = \\x -> (\\y -> add x y)',
+    'main = print (integer_to_string (sum (zip_add (range 5) '
+        '(map_add 2 (range 5)))))',
+    'main = print (integer_to_string (apply add 1 2))\n'
+        'apply = \\f -> f',
+    'main = print (integer_to_string (second 1 2))\n'
+        'second = \\x -> \\y -> y',
+    *(generate(10) for generate in GENERATORS.values()),
+]
+
+@pytest.mark.parametrize('source', _SOURCES)
+def test_same_output_as_stack_engine(source):
+    stack_output = StringIO()
+    func.run_source(source, stack_output)
+    register_output = StringIO()
+    func.run_source(source, register_output, engine='register')
+    assert register_output.getvalue() == stack_output.getvalue()
+
+@pytest.mark.parametrize('source', _SOURCES)
+def test_dispatches_no_more_instructions(source):
+    stack = measure_source(source, StringIO())
+    register = measure_source(source, StringIO(), engine='register')
+    assert register.instructions <= stack.instructions
+
+@pytest.mark.parametrize('name', ['deep_nesting', 'long_application_chains'])
+def test_dispatches_fewer_instructions(name):
+    source = GENERATORS[name](50)
+    stack = measure_source(source, StringIO())
+    register = measure_source(source, StringIO(), engine='register')
+    assert register.instructions < 0.75 * stack.instructions
+
+@pytest.mark.parametrize('source, expected', [
+    (
+        "main = print 'Hi'",
+        [
+            RegisterOpcode.FRAME, 2,
+            RegisterOpcode.STRING, 1, 'Hi',
+            RegisterOpcode.PRINT, 1,
+        ]
+    ),
+    (
+        'main = print (integer_to_string (add 1 x))\nx = 2',
+        [
+            RegisterOpcode.FRAME, 4,
+            RegisterOpcode.INTEGER, 3, 1,
+            RegisterOpcode.ADD_INTEGER, 2, 3, 2,
+            RegisterOpcode.INTEGER_TO_STRING, 1, 2,
+            RegisterOpcode.PRINT, 1,
+        ]
+    ),
+    (
+        'main = print (identity (identity text))\n'
+            'identity = \\x -> x\n'
+            "text = 'Hi'",
+        [
+            RegisterOpcode.FRAME, 4,
+            RegisterOpcode.STRING, 3, 'Hi',
+            RegisterOpcode.CALL, 2, 21, 3, 1,
+            RegisterOpcode.CALL, 1, 21, 2, 1,
+            RegisterOpcode.PRINT, 1,
+            RegisterOpcode.RETURN, 0,
+            RegisterOpcode.FRAME, 1,
+            RegisterOpcode.RETURN, 0,
+        ]
+    ),
+])
+def test_compile(source, expected):
+    module = analyse(parse(tokenise(source)), BUILTINS)
+    assert compile_registers(module) == expected
+
+def test_not_a_function():
+    source = 'main = print (apply 1 2)\napply = \\f -> \\x -> f x'
+    with pytest.raises(TypeCheckError, match="Type error in 'main'"):
+        func.run_source(source, StringIO(), engine='register')
+
+def test_unknown_engine():
+    with pytest.raises(ValueError, match='Unknown engine: tree'):
+        func.run_source("main = print 'Hi'", engine='tree')
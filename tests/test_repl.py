@@ -1,6 +1,6 @@
 import pytest
 
-from func.repl import repl
+from func.repl import repl, run_batch
 
 from io import StringIO
 
@@ -10,6 +10,26 @@ from io import StringIO
     (["print 'Hello!'"], 'Hello!\n'),
     (["'Hello there'"], ''),
     (['num = 37', 'print (integer_to_string num)'], '37\n'),
+    (
+        [
+            'x = 1',
+            'f = \\y -> add x y',
+            'g = \\y -> f (f y)',
+            'print (integer_to_string (g 1))',
+            'x = 10',
+            'print (integer_to_string (g 1))',
+            'print (integer_to_string (f 1))',
+        ],
+        '3\n21\n11\n'
+    ),
+    (
+        [
+            "greet = \\name -> print 'Hi \\(name)'",
+            "greet 'A'",
+            "greet 'B'",
+        ],
+        'Hi A\nHi B\n'
+    ),
 ])
 def test_success(capsys, mock_inputs, inputs, expected_output):
     mock_inputs(inputs)
@@ -21,6 +41,12 @@ def test_success(capsys, mock_inputs, inputs, expected_output):
 @pytest.mark.parametrize('inputs, expected_error', [
     (['hello'], "Unbound name: 'hello'\n"),
     (['!'], "Unexpected character: '!'\n"),
+    (['f x = 1'], 'Expected end-of-source, got an equals symbol\n'),
+    (["print 1"], 'Type error: expected String, got Integer\n'),
+    (
+        ["x = 'a'", 'y = add x 1'],
+        "Type error in 'y': expected Integer, got String\n"
+    ),
 ])
 def test_failure(capsys, mock_inputs, inputs, expected_error):
     mock_inputs(inputs)
@@ -29,6 +55,35 @@ def test_failure(capsys, mock_inputs, inputs, expected_error):
     assert captured.out == f'Error: {expected_error}'
     assert captured.err == ''
 
+def test_redefinition_checks_users(capsys, mock_inputs):
+    mock_inputs([
+        'x = 1',
+        'y = add x 1',
+        "x = 'a'",
+        'print (integer_to_string y)',
+    ])
+    repl()
+    assert capsys.readouterr().out == (
+        "Error: Type error in 'y': expected Integer, got String\n2\n")
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 1 << 16])
+@pytest.mark.parametrize('source, expected_output', [
+    ('', ''),
+    ("print 'Hello!'", 'Hello!\n'),
+    ("print 'Hello!'\n", 'Hello!\n'),
+    ("\n\nprint 'A'\r\n  \nprint 'B'", 'A\nB\n'),
+    (
+        'num = 37\nprint (integer_to_string num)\nhello\nsum num\n',
+        "37\nError: Unbound name: 'hello'\n"
+        'Error: Type error: expected Array, got Integer\n'
+    ),
+])
+def test_batch(mocker, chunk_size, source, expected_output):
+    mocker.patch('func.repl._CHUNK_SIZE', chunk_size)
+    output = StringIO()
+    run_batch(StringIO(source), output)
+    assert output.getvalue() == expected_output
+
 
 @pytest.fixture
 def mock_inputs(mocker):
@@ -1,7 +1,9 @@
+import asyncio
+
 import pytest
 
 from func.compiler import Opcode
-from func.runtime import execute
+from func.runtime import execute, execute_async, ExecutionError
 
 
 @pytest.mark.parametrize('program, expected_output', [
@@ -68,3 +70,99 @@ def test_success(capsys, program, expected_output):
     execute(program)
     captured = capsys.readouterr()
     assert captured.out == expected_output
+
+def test_execute_async():
+    program = [
+        Opcode.PUSH,
+        41,
+        Opcode.PUSH,
+        1,
+        Opcode.ADD,
+        Opcode.INTEGER_TO_STRING,
+        Opcode.PRINT,
+    ]
+    lines = []
+    async def sink(string):
+        lines.append(string)
+    asyncio.run(execute_async(program, sink))
+    assert lines == ['42']
+
+@pytest.mark.parametrize('interval, expected_lines', [
+    (1, ['a1', 'b1', 'a2', 'b2']),
+    (1000, ['a1', 'a2', 'b1', 'b2']),
+])
+def test_execute_async_interleaving(interval, expected_lines):
+    lines = []
+    async def sink(string):
+        lines.append(string)
+    def make_program(name):
+        return [
+            Opcode.SET, 2, *f'{name}1'.encode(), Opcode.PRINT,
+            Opcode.SET, 2, *f'{name}2'.encode(), Opcode.PRINT,
+        ]
+    async def run_both():
+        await asyncio.gather(
+            execute_async(make_program('a'), sink, interval=interval),
+            execute_async(make_program('b'), sink, interval=interval))
+    asyncio.run(run_both())
+    assert lines == expected_lines
+
+@pytest.mark.parametrize('interval', [0, -1])
+def test_execute_async_invalid_interval(interval):
+    program = [Opcode.SET, 1, *b'a', Opcode.PRINT]
+    with pytest.raises(ValueError, match='Interval must be at least 1'):
+        asyncio.run(execute_async(program, interval=interval))
+
+def test_quickened_program_can_be_executed_again(capsys):
+    program = [
+        Opcode.PUSH,
+        1,
+        Opcode.JUMP_IF,
+        6,
+        Opcode.SET,
+        2,
+        *b'No',
+        Opcode.JUMP,
+        5,
+        Opcode.SET,
+        3,
+        *b'Yes',
+        Opcode.PRINT,
+    ]
+    length = len(program)
+    execute(program)
+    execute(program)
+    captured = capsys.readouterr()
+    assert captured.out == 'Yes\nYes\n'
+    assert len(program) == length
+    assert program[4] is Opcode.SET
+    assert program[10] is Opcode.SET_CONSTANT
+
+@pytest.mark.parametrize('program', [
+    [Opcode.PUSH, 3, Opcode.SUM],
+    [Opcode.PUSH, 3, Opcode.PUSH, 1, Opcode.MAP_ADD],
+])
+def test_expected_array(program):
+    with pytest.raises(ExecutionError, match='Expected an array, got: 3'):
+        execute(program)
+
+def test_concat(capsys):
+    program = [
+        Opcode.PUSH,
+        7,
+        Opcode.INTEGER_TO_STRING,
+        Opcode.SET,
+        3,
+        *'λ='.encode(),
+        Opcode.CONCAT,
+        2,
+        Opcode.PRINT,
+    ]
+    execute(program)
+    captured = capsys.readouterr()
+    assert captured.out == 'λ=7\n'
+
+def test_apply_non_function():
+    program = [Opcode.PUSH, 1, Opcode.PUSH, 2, Opcode.APPLY, 1]
+    with pytest.raises(ExecutionError, match='Expected a function, got: 2'):
+        execute(program)
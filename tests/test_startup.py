@@ -0,0 +1,37 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import func
+
+
+_ROOT = Path(func.__file__).parent.parent
+
+@pytest.mark.parametrize('module', [
+    'asyncio',
+    'concurrent.futures',
+    'mmap',
+    'multiprocessing',
+    'pickle',
+    'socket',
+    'func.batch',
+    'func.branches',
+    'func.daemon',
+    'func.disassembler',
+    'func.image',
+    'func.profiler',
+    'func.register_compiler',
+    'func.repl',
+    'func.stats',
+])
+def test_command_line_does_not_import(module):
+    code = f'import sys, func.__main__; print({module!r} in sys.modules)'
+    result = subprocess.run([sys.executable, '-c', code], cwd=_ROOT,
+        capture_output=True, text=True, check=True)
+    assert result.stdout == 'False\n'
+
+def test_lazy_attributes():
+    assert func.execute_many is func.batch.execute_many
+    assert func.load_image is func.image.load_image
@@ -0,0 +1,90 @@
+import json
+from io import StringIO
+
+import pytest
+
+from func.modules import ModuleCache
+from func.opcodes import Opcode, decode
+from func.stats import (
+    Statistics,
+    count_nodes,
+    format_statistics,
+    measure_file,
+    measure_source,
+)
+from func.syntax import Module, Binding, Call, Identifier, Integer
+
+
+def test_measure_source():
+    output = StringIO()
+    statistics = measure_source("main = print 'Hello'", output)
+    assert output.getvalue() == 'Hello\n'
+    assert list(statistics.stage_seconds) == [
+        'tokenise', 'parse', 'analyse', 'compile', 'execute']
+    assert statistics.tokens == 6
+    assert statistics.program_length == 10
+    assert statistics.constants == 1
+    assert statistics.constant_bytes == 5
+    assert statistics.instructions == 3
+    assert statistics.peak_stack == 1
+    assert statistics.peak_heap == 9
+
+def test_measure_file():
+    output = StringIO()
+    statistics = measure_file('examples/the_answer.func', output)
+    assert output.getvalue() == '42\n'
+    assert list(statistics.stage_seconds) == ['load', 'compile', 'execute']
+    assert statistics.tokens is None
+    assert statistics.syntax_nodes is None
+    assert statistics.analysed_nodes > 0
+    assert statistics.instructions > 0
+
+def test_measure_file_with_imports(tmp_path):
+    (tmp_path / 'numbers.func').write_text('answer = add 40 2')
+    path = tmp_path / 'main.func'
+    path.write_text(
+        'import numbers\nmain = print (integer_to_string answer)')
+    output = StringIO()
+    cache = ModuleCache()
+    measure_file(path, output, cache=cache)
+    measure_file(path, output, cache=cache)
+    assert output.getvalue() == '42\n42\n'
+
+def test_count_nodes():
+    syntax = Module([
+        Binding('main', Call(Identifier('print'), Integer('1'))),
+    ])
+    assert count_nodes(syntax) == 5
+
+def test_decode():
+    program = [
+        Opcode.SET, 2, 72, 105,
+        Opcode.PUSH, 1,
+        Opcode.CALL, 0, 2,
+        Opcode.ADD,
+    ]
+    assert list(decode(program)) == [
+        (0, Opcode.SET, [2, 72, 105]),
+        (4, Opcode.PUSH, [1]),
+        (6, Opcode.CALL, [0, 2]),
+        (9, Opcode.ADD, []),
+    ]
+
+def test_decode_unknown_opcode():
+    with pytest.raises(ValueError, match='Unknown opcode: 3'):
+        list(decode([3]))
+
+def test_format_json():
+    statistics = Statistics(tokens=3)
+    assert json.loads(format_statistics(statistics, 'json'))['tokens'] == 3
+
+def test_format_text():
+    statistics = Statistics({'parse': 0.002}, tokens=3)
+    lines = format_statistics(statistics, 'text').splitlines()
+    assert lines[0] == 'parse time                 2.000 ms'
+    assert lines[1] == 'tokens                         3'
+
+def test_format_text_skips_uncounted():
+    statistics = Statistics(tokens=None, syntax_nodes=None)
+    lines = format_statistics(statistics, 'text').splitlines()
+    assert lines[0].startswith('analysed nodes')
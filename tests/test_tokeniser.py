@@ -1,3 +1,5 @@
+import sys
+
 import pytest
 
 from func.tokens import (
@@ -79,6 +81,19 @@ from func.tokeniser import *
             ConstantToken(ConstantTokenKind.STRING_DELIMITER),
         ]
     ),
+    (
+        "'\\(f (g))'",
+        [
+            ConstantToken(ConstantTokenKind.STRING_DELIMITER),
+            ConstantToken(ConstantTokenKind.STRING_EXPRESSION_ESCAPE_START),
+            ValueToken(ValueTokenKind.IDENTIFIER, 'f'),
+            ConstantToken(ConstantTokenKind.OPEN_BRACKET),
+            ValueToken(ValueTokenKind.IDENTIFIER, 'g'),
+            ConstantToken(ConstantTokenKind.CLOSE_BRACKET),
+            ConstantToken(ConstantTokenKind.STRING_EXPRESSION_ESCAPE_END),
+            ConstantToken(ConstantTokenKind.STRING_DELIMITER),
+        ]
+    ),
     (
         'if iffley then athens else welse',
         [
@@ -130,3 +145,14 @@ def _expect_tokenise_error(source, expected_error_message):
 def _evaluate_iterable(iterable):
     for _ in iterable:
         pass
+
+def test_identifiers_are_interned():
+    # Built at runtime, so that the name is not interned already.
+    name = ''.join(['na', 'me'])
+    tokens = list(tokenise(f"{name} = \\x -> '\\({name})' {name}"))
+    identifiers = [token.value for token in tokens
+        if token.kind == ValueTokenKind.IDENTIFIER]
+    assert identifiers == ['name', 'x', 'name', 'name']
+    first, _, *others = identifiers
+    assert all(other is first for other in others)
+    assert first is sys.intern('name')
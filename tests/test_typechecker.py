@@ -0,0 +1,138 @@
+from array import array
+
+import pytest
+
+import func
+from func.analysed import Call, Integer, Reference, String
+from func.analyser import analyse
+from func.compiler import BUILTINS
+from func.opcodes import Opcode
+from func.parser import parse
+from func.tokeniser import tokenise
+from func.typechecker import (
+    check_types,
+    format_type,
+    function_type,
+    TypeCheckError,
+    TypeEnvironment,
+    TypeVariable,
+    ARRAY,
+    INTEGER,
+    STRING,
+)
+
+
+def _check(source):
+    module = analyse(parse(tokenise(source)), BUILTINS)
+    types = check_types(module, BUILTINS)
+    return {name: str(scheme) for name, scheme in types.items()}
+
+def test_check_types():
+    assert _check(
+        'main = print (integer_to_string (twice add5 (twice (add 1) 0)))\n'
+        'twice = \\f -> \\x -> f (f x)\n'
+        'add5 = add 5\n'
+        'numbers = map_add 1 (range 3)\n'
+        "greet = \\name -> 'Hello, \\(name)!'\n"
+        'compose = \\f -> \\g -> \\x -> f (g x)\n'
+        'choose = \\flag -> if flag then add 1 else (\\x -> add x x)'
+    ) == {
+        'main': 'Nothing',
+        'twice': '(a -> a) -> a -> a',
+        'add5': 'Integer -> Integer',
+        'numbers': 'Array',
+        'greet': 'String -> String',
+        'compose': '(a -> b) -> (c -> a) -> c -> b',
+        'choose': 'Integer -> Integer -> Integer',
+    }
+
+def test_polymorphic_binding():
+    assert _check(
+        "main = print (identity '\\(integer_to_string (identity 1))')\n"
+        'identity = \\x -> x'
+    ) == {'main': 'Nothing', 'identity': 'a -> a'}
+
+def test_mutually_referring_bindings():
+    assert _check(
+        'main = print (integer_to_string (even 1))\n'
+        'even = \\n -> if n then odd 0 else 1\n'
+        'odd = \\n -> if n then even 0 else 0'
+    ) == {
+        'main': 'Nothing',
+        'even': 'Integer -> Integer',
+        'odd': 'Integer -> Integer',
+    }
+
+@pytest.mark.parametrize('source, message', [
+    ('main = print 1', "Type error in 'main': expected String, got Integer"),
+    ("main = print (add 1 'a')",
+        "Type error in 'main': expected Integer, got String"),
+    ("main = add 1 (print 'a')",
+        "Type error in 'main': expected Integer, got Nothing"),
+    ('main = sum 3', "Type error in 'main': expected Array, got Integer"),
+    ("main = print (if 'a' then 'b' else 'c')",
+        "Type error in 'main': expected Integer, got String"),
+    ("main = print (if 1 then 'b' else 2)",
+        "Type error in 'main': expected String, got Integer"),
+    ("main = print 'a\\(add 1 2)b'",
+        "Type error in 'main': expected String, got Integer"),
+    ('main = 1 2', "Type error in 'main': Integer is not a function"),
+    ('main = apply 1 2\napply = \\f -> \\x -> f x',
+        "Type error in 'main': expected a -> b, got Integer"),
+    ('main = self self\nself = \\x -> x x',
+        "Type error in 'self': cannot construct the infinite type a = a -> b"),
+])
+def test_type_errors(source, message):
+    with pytest.raises(TypeCheckError) as error:
+        _check(source)
+    assert str(error.value) == message
+
+def test_type_environment():
+    environment = TypeEnvironment(BUILTINS)
+    environment.define('x', Integer(1))
+    environment.define('y', Call(Call(Reference('add'), Reference('x')),
+        Integer(1)))
+    with pytest.raises(TypeCheckError,
+            match="Type error in 'y': expected Integer, got String"):
+        environment.define('x', String(['a']))
+    # The failed definition leaves the environment as it was.
+    assert str(environment.check_expression(Reference('y'))) == 'Integer'
+    assert str(environment.check_expression(Reference('x'))) == 'Integer'
+    with pytest.raises(TypeCheckError, match='expected Integer, got String'):
+        environment.check_expression(
+            Call(Reference('integer_to_string'), String([])))
+
+def test_compilation_rejects_ill_typed_programs():
+    with pytest.raises(TypeCheckError):
+        func.compile_source('main = print 1')
+
+@pytest.mark.parametrize('type_, expected', [
+    (INTEGER, 'Integer'),
+    (function_type(INTEGER, STRING, ARRAY), 'Integer -> String -> Array'),
+    (function_type(function_type(INTEGER, STRING), ARRAY),
+        '(Integer -> String) -> Array'),
+    (function_type(variable := TypeVariable(), TypeVariable(), variable),
+        'a -> b -> a'),
+])
+def test_format_type(type_, expected):
+    assert format_type(type_) == expected
+
+def test_typed_programs_skip_array_checks(capsys):
+    program = func.compile_source(
+        'main = print (integer_to_string (sum (zip_add numbers '
+        '(map_add 10 numbers))))\n'
+        'numbers = range 4')
+    assert Opcode.MAP_ADD_UNCHECKED in program
+    assert Opcode.ZIP_ADD_UNCHECKED in program
+    assert Opcode.SUM_UNCHECKED in program
+    assert Opcode.SUM not in program
+    func.execute(program)
+    assert capsys.readouterr().out == '52\n'
+
+def test_unchecked_builtin_values(capsys):
+    program = func.compile_source(
+        'main = print (integer_to_string (apply sum (range 4)))\n'
+        'apply = \\f -> \\x -> f x')
+    assert Opcode.SUM_UNCHECKED in program
+    func.execute(program)
+    assert capsys.readouterr().out == '6\n'
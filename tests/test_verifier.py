@@ -0,0 +1,67 @@
+import pytest
+
+import func
+from func.opcodes import Opcode
+from func.verifier import verify, Verification, VerificationError
+from benchmarks.generators import GENERATORS
+
+
+_TWICE = 'twice = \\f -> \\x -> f (f x)'
+
+
+@pytest.mark.parametrize('source, expected_depth', [
+    ("main = print 'Hello'", 1),
+    ('main = print (integer_to_string (add 40 2))', 2),
+    ("main = print (if add 0 1 then 'Yes' else 'No')", 2),
+    (f'main = print (integer_to_string (twice (add 3) 1))\n{_TWICE}', 3),
+    ('main = print (integer_to_string (fold add 0 (range 5)))', 3),
+    (f'main = print (integer_to_string (twice (twice (add 1)) 1))\n{_TWICE}',
+        None),
+])
+def test_max_stack_depth(source, expected_depth):
+    program = func.compile_source(source)
+    assert verify(program) == Verification(expected_depth)
+
+@pytest.mark.parametrize('name', GENERATORS)
+def test_generated_programs_verify(name):
+    verify(func.compile_source(GENERATORS[name](4)))
+
+def test_verify_quickened_program(capsys):
+    program = func.compile_source("main = print 'Hello'")
+    func.execute(program)
+    assert verify(program) == Verification(1)
+    assert capsys.readouterr().out == 'Hello\n'
+
+@pytest.mark.parametrize('program, message', [
+    ([Opcode.ADD], 'Stack underflow at 0'),
+    ([Opcode.PUSH], 'Truncated instruction at 0'),
+    ([Opcode.SET, 5, 72], 'Truncated instruction at 0'),
+    ([99], 'Unknown opcode: 99'),
+    ([Opcode.JUMP, 5], 'Jump at 0 does not land on an instruction: 7'),
+    ([Opcode.PUSH, 1, Opcode.JUMP, -3],
+        'Jump at 2 does not land on an instruction: 1'),
+    ([Opcode.PUSH, 1, Opcode.JUMP_IF, 2, Opcode.PUSH, 2],
+        'Stack depths 0 and 1 meet at 6'),
+    ([Opcode.PUSH, 1, Opcode.CALL, 5, 1, Opcode.LOAD, 1, Opcode.RETURN],
+        'Argument index out of range at 5: 1'),
+    ([Opcode.PUSH, 1, Opcode.CALL, 5, 1, Opcode.RETURN],
+        'Function at 5 returns 0 values at 5, not one'),
+    ([Opcode.PUSH, 1, Opcode.CALL, 4, 1],
+        'Function address is not an instruction: 4'),
+    ([Opcode.CALL_NATIVE, 1000, 0], 'Unknown native at 0: 1000'),
+])
+def test_invalid_program(program, message):
+    with pytest.raises(VerificationError, match=message):
+        verify(program)
+
+def test_files_are_verified_once(tmp_path, monkeypatch):
+    path = tmp_path / 'main.func'
+    path.write_text("main = print 'Hello'")
+    calls = []
+    monkeypatch.setattr(func.modules, 'verify',
+        lambda program: calls.append(program) or verify(program))
+    cache = func.ModuleCache()
+    func.run_file(path, cache=cache)
+    func.run_file(path, cache=cache)
+    assert len(calls) == 1
+